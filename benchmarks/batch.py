@@ -0,0 +1,89 @@
+"""Throughput de un lote de preguntas: una a la vez (como llamadas a /chat) vs. ``run_batch``.
+
+La búsqueda simulada embebe la pregunta con el mismo modelo de embeddings en
+caché que usa la API, así que se cuentan también las llamadas al proveedor de
+embeddings.
+
+Uso:
+    python -m benchmarks.batch --items 100 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.stubs import StubChatModel, StubEmbeddings, StubRetriever, make_documents
+from src.cache.embedding_cache import CachedEmbeddings
+from src.graph.agent import create_agent_graph, session_config
+from src.graph.batch import BatchItem, BatchReport, initial_state, run_batch
+
+
+class EmbeddingRetriever(StubRetriever):
+    """Retriever simulado que embebe la consulta antes de buscar, como el vector store"""
+
+    embeddings: Embeddings
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        await self.embeddings.aembed_query(query)
+        return await super()._aget_relevant_documents(query, run_manager=run_manager)
+
+
+def make_items(count: int) -> list[BatchItem]:
+    return [
+        BatchItem(
+            id=f"faq-{i}",
+            user_message=f"¿Qué cambia en la pensión con la reforma? Caso {i}",
+            user_data={"nombre": "Ana", "genero": "femenino", "edad": {"anos": 30 + i % 40, "meses": 0}, "nivelEstudios": "media"},
+        )
+        for i in range(count)
+    ]
+
+
+async def setup(args: argparse.Namespace):
+    provider = StubEmbeddings(size=64, latency=args.embedding_latency)
+    embeddings = CachedEmbeddings(provider, model_name="stub")
+    retriever = EmbeddingRetriever(embeddings=embeddings, documents=make_documents(), latency=args.retrieval_latency)
+    agent = await create_agent_graph(retriever, StubChatModel(latency=args.llm_latency))
+    return agent, embeddings, provider
+
+
+async def main(args: argparse.Namespace) -> None:
+    items = make_items(args.items)
+
+    agent, _, provider = await setup(args)
+    start = time.perf_counter()
+    latencies = []
+    for item in items:
+        item_start = time.perf_counter()
+        await agent.ainvoke(initial_state(item), config=session_config(None))
+        latencies.append(time.perf_counter() - item_start)
+    sequential = time.perf_counter() - start
+    sequential_calls = provider.calls
+
+    agent, embeddings, provider = await setup(args)
+    report = BatchReport()
+    async for _ in run_batch(agent, items, embeddings=embeddings, concurrency=args.concurrency, report=report):
+        pass
+    summary = report.summary()
+
+    print(f"\n📊 {args.items} preguntas, concurrencia {args.concurrency}")
+    print(f"  - Una a la vez: {args.items / sequential:.1f} ítems/s, p50 {sorted(latencies)[len(latencies) // 2] * 1000:.0f} ms, "
+          f"{sequential_calls} llamadas de embeddings")
+    print(f"  - run_batch:    {summary['items_per_second']:.1f} ítems/s, p50 {summary['latency_ms']['p50']:.0f} ms, "
+          f"p95 {summary['latency_ms']['p95']:.0f} ms, {provider.calls} llamadas de embeddings")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--retrieval-latency", type=float, default=0.1)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""Ráfaga de sesiones con la misma pregunta: llamadas upstream con y sin coalescencia.
+
+Simula muchas sesiones nuevas que preguntan lo mismo al mismo tiempo (p. ej.
+durante la cobertura de prensa de la reforma) y cuenta las búsquedas y
+llamadas al LLM que llegan a los backends simulados.
+
+Uso:
+    python -m benchmarks.coalescing --sessions 50 --questions 3
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.graph_setup import initial_state
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.cache.coalescing import RequestCoalescer
+from src.config.memory import ChatHistoryStore, get_memory
+from src.config.redis_setup import InMemoryRedis
+from src.graph.agent import create_agent_graph, session_config
+
+QUESTIONS = [
+    "¿Cuánto sube la PGU con la reforma de pensiones?",
+    "¿Qué es el seguro social de la reforma previsional?",
+    "¿Cuándo empieza la cotización adicional del empleador?",
+]
+
+
+async def burst(label: str, coalescer: RequestCoalescer | None, args: argparse.Namespace) -> None:
+    retriever = StubRetriever(documents=make_documents(), latency=args.retrieval_latency)
+    llm = StubChatModel(latency=args.llm_latency)
+    agent = await create_agent_graph(retriever, llm, coalescer=coalescer)
+    store = ChatHistoryStore(InMemoryRedis())
+
+    async def one(i: int) -> None:
+        # Variaciones de mayúsculas y espacios de la misma pregunta
+        question = QUESTIONS[i % args.questions]
+        question = question.upper() if i % 2 else f"  {question} "
+        await agent.ainvoke(initial_state(question), config=session_config(get_memory(store, f"session-{i}")))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22}{retriever.calls:>12}{len(llm.prompts):>14}{elapsed:>12.2f}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"📊 {args.sessions} sesiones, {args.questions} preguntas distintas\n")
+    print(f"{'modo':<22}{'búsquedas':>12}{'llamadas LLM':>14}{'tiempo (s)':>12}")
+    await burst("sin coalescencia", None, args)
+    await burst("búsqueda", RequestCoalescer(), args)
+    coalescer = RequestCoalescer(coalesce_responses=True)
+    await burst("búsqueda + respuesta", coalescer, args)
+    print(f"\n{coalescer.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--retrieval-latency", type=float, default=0.15)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+"""Tamaño del contexto y latencia de respuesta: concatenar todos los chunks vs. empaquetarlos.
+
+Simula una recuperación típica: chunks consecutivos de un mismo artículo (con
+el solape del splitter), copias casi idénticas del artículo en otros medios y
+algunos documentos distintos. El LLM simulado tarda ``--token-latency``
+segundos por token del prompt.
+
+Uso:
+    python -m benchmarks.context_packing --budget 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.stubs import StubChatModel
+from src.graph.agent import create_response_chain
+from src.graph.context import ContextPacker
+from src.tools.tokens import count_tokens
+
+WORDS = (
+    "reforma pensiones cotización empleador seguro social afp pgu ahorro fondo rentabilidad "
+    "jubilación trabajadores mujeres compensación expectativa vida beneficio aporte ley"
+).split()
+
+
+def paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def retrieved_documents(seed: int = 7) -> list[Document]:
+    rng = random.Random(seed)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+    article = "\n\n".join(paragraph(rng, 40) for _ in range(12))
+
+    def chunks_of(url: str, domain: str, text: str) -> list[Document]:
+        return [
+            Document(page_content=chunk, metadata={
+                "title": f"Artículo de {domain}", "url_source": url, "source_domain": domain,
+                "chunk_id": f"{abs(hash(url)) % 10 ** 8}-{i}",
+            })
+            for i, chunk in enumerate(splitter.split_text(text))
+        ]
+
+    original = chunks_of("https://previsionsocial.gob.cl/reforma", "previsionsocial.gob.cl", article)
+    # Copias del mismo artículo en otros medios, con cambios menores
+    copy_a = chunks_of("https://www.latercera.com/reforma", "latercera.com", article.replace("ley", "normativa", 1))
+    copy_b = chunks_of("https://www.biobiochile.cl/reforma", "biobiochile.cl", article.replace("fondo", "fondos", 2))
+    distinct = [
+        chunks_of(f"https://www.chileatiende.gob.cl/ficha-{i}", "chileatiende.gob.cl", paragraph(rng, 150))[0]
+        for i in range(3)
+    ]
+    return [original[1], copy_a[1], original[2], distinct[0], copy_b[2], original[3], distinct[1], distinct[2]]
+
+
+def concatenated_context(documents: list[Document]) -> tuple[str, str]:
+    """Formato anterior: un encabezado por chunk y una referencia por chunk"""
+    entries = []
+    sources = []
+    for i, doc in enumerate(documents, 1):
+        entries.append(f"""
+                [link_{i}]
+                Título: {doc.metadata.get('title', 'Sin título')}
+                Fecha de publicación: {doc.metadata.get('estimated_published_time', 'Fecha no especificada')}
+                Fuente: {doc.metadata.get('source_domain', 'Dominio no especificado')}
+                Contenido:
+                {doc.page_content}
+            """)
+        sources.append(f'<a href="{doc.metadata["url_source"]}" target="_blank">link_{i}</a>')
+    return "\n\n".join(entries), ", ".join(sources)
+
+
+async def measure(context: str, sources: str, args: argparse.Namespace) -> tuple[int, float]:
+    llm = StubChatModel(latency=args.base_latency, token_latency=args.token_latency)
+    respond = create_response_chain(llm)
+    state = {
+        "messages": [HumanMessage(content="¿Qué cambia con la reforma de pensiones?")],
+        "context": context,
+        "sources": sources,
+        "chat_history": "No hay historial previo.",
+        "agent_name": "Alexandra",
+        "user_data": {"nombre": "Ana", "genero": "femenino", "edad": {"anos": 50, "meses": 0}, "nivelEstudios": "universitario"},
+    }
+    start = time.perf_counter()
+    await respond(state, {})
+    return count_tokens(llm.prompts[-1]), time.perf_counter() - start
+
+
+async def main(args: argparse.Namespace) -> None:
+    documents = retrieved_documents()
+    packer = ContextPacker(token_budget=args.budget, dedup_threshold=args.threshold)
+
+    baseline_context, baseline_sources = concatenated_context(documents)
+    start = time.perf_counter()
+    packed = packer.pack(documents)
+    pack_time = time.perf_counter() - start
+
+    baseline_prompt, baseline_time = await measure(baseline_context, baseline_sources, args)
+    packed_prompt, packed_time = await measure(packed.context, packed.sources, args)
+
+    print(f"\n📊 {len(documents)} chunks recuperados, presupuesto de {args.budget} tokens")
+    print(f"  - Concatenado: {count_tokens(baseline_context)} tokens de contexto, {len(documents)} referencias, "
+          f"prompt {baseline_prompt} tokens, respuesta {baseline_time * 1000:.1f} ms")
+    print(f"  - Empaquetado: {packed.tokens} tokens de contexto, {len(packed.urls)} referencias "
+          f"({len(packed.documents)} chunks), prompt {packed_prompt} tokens, respuesta {packed_time * 1000:.1f} ms")
+    print(f"  - Costo del empaquetado: {pack_time * 1000:.2f} ms")
+    print(f"  - Fuentes conservadas: {', '.join(packed.urls)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--base-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.00005)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""Costo por petición de construir el grafo vs. reutilizar el grafo compilado.
+
+Uso:
+    python -m benchmarks.graph_setup --requests 200
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.config.memory import ChatHistoryStore, get_memory
+from src.config.redis_setup import InMemoryRedis
+from src.graph.agent import create_agent_graph, session_config
+
+
+def initial_state(message: str) -> dict:
+    return {
+        "messages": [HumanMessage(content=message)],
+        "agent_name": "Alexandra",
+        "user_data": {
+            "nombre": "Ana",
+            "genero": "femenino",
+            "edad": {"anos": 45, "meses": 0},
+            "nivelEstudios": "universitario",
+        },
+    }
+
+
+store = ChatHistoryStore(InMemoryRedis())
+
+
+def new_memory():
+    # Una sesión nueva por petición, como la memoria por llamada original: el
+    # historial no crece entre fases
+    return get_memory(store, uuid4().hex)
+
+
+async def run(requests: int) -> None:
+    retriever = StubRetriever(documents=make_documents())
+    llm = StubChatModel()
+    message = "¿Cuándo empieza la reforma de pensiones?"
+
+    # Antes: se construye y compila el grafo en cada petición
+    start = time.perf_counter()
+    for _ in range(requests):
+        agent = await create_agent_graph(retriever, llm)
+        await agent.ainvoke(initial_state(message), config=session_config(new_memory()))
+    per_request_build = (time.perf_counter() - start) / requests
+
+    # Solo el costo de construcción, sin ejecutar
+    start = time.perf_counter()
+    for _ in range(requests):
+        await create_agent_graph(retriever, llm)
+    build_only = (time.perf_counter() - start) / requests
+
+    # Después: un único grafo compilado, memoria inyectada por invocación
+    agent = await create_agent_graph(retriever, llm)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await agent.ainvoke(initial_state(message), config=session_config(new_memory()))
+    shared_graph = (time.perf_counter() - start) / requests
+
+    print(f"📊 Peticiones: {requests}")
+    print(f"  - Construcción del grafo:          {build_only * 1000:.3f} ms")
+    print(f"  - Petición con grafo por request:  {per_request_build * 1000:.3f} ms")
+    print(f"  - Petición con grafo compartido:   {shared_graph * 1000:.3f} ms")
+    print(f"  - Ahorro por petición:             {(per_request_build - shared_graph) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
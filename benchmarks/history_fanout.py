@@ -0,0 +1,78 @@
+"""Latencia de un turno con historial: carga secuencial vs. en paralelo con la búsqueda.
+
+- ``secuencial``: se lee el historial de Redis y después se ejecuta el grafo.
+- ``paralelo``: el grafo carga el historial mientras busca el contexto.
+
+La latencia de Redis (``--redis-latency``, por viaje) y la del vector store
+(``--retrieval-latency``) se simulan. El desglose por etapa sale de los
+histogramas de ``/metrics``.
+
+Uso:
+    python -m benchmarks.history_fanout --redis-latency 0.08 --retrieval-latency 0.25
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.graph_setup import initial_state
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.config.memory import ChatHistoryStore, format_chat_history, get_memory
+from src.config.redis_setup import InMemoryRedis
+from src.graph.agent import create_agent_graph, session_config
+from src.observability.metrics import MEMORY_DURATION, NODE_DURATION
+
+QUESTION = "¿Cómo cambia mi pensión con la reforma previsional?"
+STAGES = [("historial", MEMORY_DURATION, "load"), ("retrieve", NODE_DURATION, "retrieve"), ("respond", NODE_DURATION, "respond")]
+
+
+def snapshot() -> dict:
+    return {label: (histogram._series.get((key,)) or [None, 0.0, 0])[1:] for label, histogram, key in STAGES}
+
+
+async def run(agent, store: ChatHistoryStore, turns: int, sequential: bool) -> tuple[float, dict]:
+    before = snapshot()
+    elapsed = 0.0
+    for _ in range(turns):
+        start = time.perf_counter()
+        memory = get_memory(store, "bench-session")
+        state = initial_state(QUESTION)
+        if sequential:
+            state["chat_history"] = format_chat_history(await memory.aload_history())
+        await agent.ainvoke(state, config=session_config(memory))
+        elapsed += time.perf_counter() - start
+        # Mantener el historial del mismo largo en cada turno
+        await store.client.ltrim(store.key("bench-session"), 0, 5)
+    elapsed /= turns
+    after = snapshot()
+    stages = {label: (after[label][0] - before[label][0]) / turns for label in after}
+    return elapsed, stages
+
+
+async def main(args: argparse.Namespace) -> None:
+    store = ChatHistoryStore(InMemoryRedis(latency=args.redis_latency))
+    for i in range(3):
+        await store.append_turn("bench-session", f"Pregunta previa {i}", f"Respuesta previa {i}")
+
+    agent = await create_agent_graph(
+        StubRetriever(documents=make_documents(), latency=args.retrieval_latency),
+        StubChatModel(latency=args.llm_latency),
+    )
+    results = [
+        ("secuencial", *await run(agent, store, args.turns, sequential=True)),
+        ("paralelo", *await run(agent, store, args.turns, sequential=False)),
+    ]
+
+    print(f"\n📊 Redis {args.redis_latency * 1000:.0f} ms por viaje, búsqueda {args.retrieval_latency * 1000:.0f} ms, LLM {args.llm_latency * 1000:.0f} ms ({args.turns} turnos)")
+    print(f"{'modo':<12}{'historial':>11}{'retrieve':>11}{'respond':>11}{'total (ms)':>13}")
+    for label, elapsed, stages in results:
+        print(f"{label:<12}{stages['historial'] * 1000:>11.0f}{stages['retrieve'] * 1000:>11.0f}{stages['respond'] * 1000:>11.0f}{elapsed * 1000:>13.0f}")
+    print("(en modo paralelo, retrieve incluye la carga del historial)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--redis-latency", type=float, default=0.08)
+    parser.add_argument("--retrieval-latency", type=float, default=0.25)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
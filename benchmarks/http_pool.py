@@ -0,0 +1,204 @@
+"""Conexiones y latencia hacia los proveedores: clientes HTTP propios vs. pool compartido.
+
+Levanta un servidor local compatible con la API de OpenAI (``/v1/embeddings`` y
+``/v1/chat/completions``) sobre TLS con un certificado autofirmado, y envía
+ráfagas de turnos (embedding de la consulta + respuesta del LLM) con
+``--concurrency`` turnos simultáneos y ``--idle`` segundos de pausa entre
+ráfagas, como el tráfico real. El servidor cuenta las conexiones que recibe
+(cada una es un handshake TCP + TLS).
+
+- ``por llamada``: un ChatOpenAI y un OpenAIEmbeddings nuevos en cada turno.
+- ``SDK por defecto``: un cliente de cada uno, con el transporte por defecto
+  (pools separados y conexiones en reposo que expiran a los 5 s).
+- ``pool compartido``: ``setup_llm`` y ``setup_embeddings`` con los clientes
+  de ``setup_http_clients``.
+
+Uso:
+    python -m benchmarks.http_pool --bursts 3 --turns 64 --concurrency 32 --idle 6
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+
+from benchmarks.workers import free_port
+
+app = FastAPI()
+connections: set[tuple] = set()
+
+
+@app.middleware("http")
+async def count_connections(request: Request, call_next):
+    # Cada conexión llega desde un puerto de origen distinto
+    connections.add(tuple(request.scope["client"]))
+    return await call_next(request)
+
+
+@app.get("/connections")
+async def connection_count():
+    return {"connections": len(connections)}
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    await asyncio.sleep(float(os.getenv("BENCH_PROVIDER_LATENCY", "0.02")))
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    return {
+        "object": "list",
+        "model": body["model"],
+        "data": [{"object": "embedding", "index": i, "embedding": [0.1] * 8} for i in range(len(inputs))],
+        "usage": {"prompt_tokens": 8, "total_tokens": 8},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(float(os.getenv("BENCH_PROVIDER_LATENCY", "0.02")))
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "La PGU se paga desde los 65 años."}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 20, "completion_tokens": 9, "total_tokens": 29},
+    }
+
+
+def self_signed_certificate(directory: Path) -> tuple[Path, Path]:
+    key, cert = directory / "key.pem", directory / "cert.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return key, cert
+
+
+def sdk_clients(base_url: str):
+    """LLM y embeddings como se creaban antes: cada uno con su transporte por defecto"""
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+    llm = ChatOpenAI(model="bench", base_url=base_url, api_key="bench", max_retries=0)
+    embeddings = OpenAIEmbeddings(model="bench", base_url=base_url, api_key="bench", check_embedding_ctx_length=False, max_retries=0)
+    return llm, embeddings
+
+
+def shared_clients():
+    from src.config.embeddings_setup import setup_embeddings
+    from src.config.llm_setup import setup_llm
+
+    llm, embeddings = setup_llm(), setup_embeddings()
+    # El servidor local no necesita tokenizar; evita descargar el vocabulario de tiktoken
+    embeddings.check_embedding_ctx_length = False
+    return llm, embeddings
+
+
+async def turn(llm, embeddings, i: int) -> float:
+    start = time.perf_counter()
+    await embeddings.aembed_query(f"¿Cómo se calcula la pensión garantizada universal? ({i})")
+    await llm.ainvoke(f"¿Cómo se calcula la pensión garantizada universal? ({i})")
+    return time.perf_counter() - start
+
+
+async def run(mode: str, base_url: str, server: httpx.AsyncClient, args: argparse.Namespace) -> dict:
+    before = (await server.get("/connections")).json()["connections"]
+    llm = embeddings = None
+    if mode == "SDK por defecto":
+        llm, embeddings = sdk_clients(base_url)
+    elif mode == "pool compartido":
+        llm, embeddings = shared_clients()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            if mode == "por llamada":
+                per_call = sdk_clients(base_url)
+                latencies.append(await turn(*per_call, i))
+                await per_call[0].root_async_client.close()
+                await per_call[1].async_client._client.close()
+            else:
+                latencies.append(await turn(llm, embeddings, i))
+
+    start = time.perf_counter()
+    for burst in range(args.bursts):
+        if burst:
+            await asyncio.sleep(args.idle)
+        await asyncio.gather(*(one(burst * args.turns + i) for i in range(args.turns)))
+    elapsed = time.perf_counter() - start - args.idle * (args.bursts - 1)
+
+    if mode == "pool compartido":
+        from src.config.http_clients import close_http_clients, setup_http_clients
+
+        print(f"  - Métricas del pool compartido: {setup_http_clients().stats()['async']}")
+        await close_http_clients()
+    latencies.sort()
+    return {
+        "connections": (await server.get("/connections")).json()["connections"] - before,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "turns_per_s": len(latencies) / elapsed,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        key, cert = self_signed_certificate(Path(tmp))
+        # httpx confía en el certificado autofirmado a través de SSL_CERT_FILE
+        os.environ.update({
+            "SSL_CERT_FILE": str(cert),
+            "OPENAI_MODEL": "bench", "OPENAI_API_KEY": "bench",
+            "OPENAI_EMBEDDING_MODEL": "bench", "OPENAI_EMBEDDING_API_KEY": "bench",
+            "EMBEDDING_CACHE_BACKEND": "none",
+        })
+        port = free_port()
+        base_url = f"https://127.0.0.1:{port}/v1"
+        os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_EMBEDDING_BASE_URL"] = base_url
+        server_process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks.http_pool:app", "--port", str(port), "--log-level", "warning",
+             # Como los balanceadores de los proveedores, mantener las conexiones en reposo más de 5 s
+             "--timeout-keep-alive", "75", "--ssl-keyfile", str(key), "--ssl-certfile", str(cert)],
+            env={**os.environ, "BENCH_PROVIDER_LATENCY": str(args.provider_latency)},
+        )
+        try:
+            async with httpx.AsyncClient(base_url=f"https://127.0.0.1:{port}", verify=str(cert)) as server:
+                for _ in range(100):
+                    try:
+                        await server.get("/connections")
+                        break
+                    except httpx.TransportError:
+                        await asyncio.sleep(0.1)
+
+                results = []
+                for mode in ("por llamada", "SDK por defecto", "pool compartido"):
+                    print(f"🔄 {mode}...")
+                    results.append((mode, await run(mode, base_url, server, args)))
+        finally:
+            server_process.terminate()
+            server_process.wait()
+
+    total = args.bursts * args.turns
+    print(f"\n📊 {args.bursts} ráfagas de {args.turns} turnos (concurrencia {args.concurrency}, {args.idle:g} s entre ráfagas), "
+          f"proveedor {args.provider_latency * 1000:.0f} ms, 2 peticiones por turno")
+    print(f"{'clientes':<18}{'conexiones TLS':>16}{'por turno':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}{'turnos/s':>10}")
+    for mode, r in results:
+        print(f"{mode:<18}{r['connections']:>16}{r['connections'] / total:>11.2f}{r['p50'] * 1000:>10.1f}{r['p95'] * 1000:>10.1f}{r['turns_per_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--idle", type=float, default=6.0)
+    parser.add_argument("--provider-latency", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
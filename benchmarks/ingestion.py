@@ -0,0 +1,65 @@
+"""Throughput de la ingesta (chunks/s) con un embedder simulado y snapshot local.
+
+La segunda ejecución reutiliza el manifiesto y solo embebe los chunks que cambiaron.
+
+Uso:
+    python -m benchmarks.ingestion --documents 500 --latency 0.2 --concurrency 1 4 8
+"""
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+
+from benchmarks.stubs import StubEmbeddings
+from src.ingestion.pipeline import IngestionPipeline, LocalSnapshotSink
+from src.ingestion.sources import SourceDocument
+
+PARAGRAPH = (
+    "La reforma de pensiones crea un seguro social financiado con cotización del empleador, "
+    "aumenta la Pensión Garantizada Universal y modifica el funcionamiento de las AFP. "
+)
+
+
+async def synthetic_sources(count: int, revision: int = 0):
+    for i in range(count):
+        # Una de cada diez páginas cambia entre revisiones
+        suffix = f" Revisión {revision}." if i % 10 == 0 else ""
+        yield SourceDocument(
+            url=f"https://previsionsocial.gob.cl/pagina-{i}",
+            title=f"Página {i}",
+            text=(PARAGRAPH * 20) + suffix,
+        )
+
+
+async def run_once(root: Path, embeddings: StubEmbeddings, args, concurrency: int, revision: int):
+    pipeline = IngestionPipeline(
+        embeddings=embeddings,
+        sink=LocalSnapshotSink(str(root / "index"), embeddings),
+        manifest_path=root / "manifest.json",
+        embedding_model="stub",
+        batch_size=args.batch_size,
+        concurrency=concurrency,
+    )
+    return await pipeline.run(synthetic_sources(args.documents, revision))
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"📊 Documentos: {args.documents}, lote: {args.batch_size}, latencia por llamada: {args.latency * 1000:.0f} ms\n")
+    print(f"{'concurrencia':<14}{'ejecución':<14}{'chunks':>8}{'embebidos':>11}{'tiempo (s)':>12}{'chunks/s':>10}")
+
+    for concurrency in args.concurrency:
+        with tempfile.TemporaryDirectory() as tmp:
+            embeddings = StubEmbeddings(size=args.dimensions, latency=args.latency)
+            for label, revision in (("completa", 0), ("incremental", 1)):
+                stats = await run_once(Path(tmp), embeddings, args, concurrency, revision)
+                print(f"{concurrency:<14}{label:<14}{stats.chunks:>8}{stats.embedded:>11}{stats.elapsed:>12.2f}{stats.chunks_per_second:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""Latencia y recall del índice local: búsqueda exacta vs. IVF aproximado.
+
+Usa un corpus sintético con clusters (o un snapshot real con ``--snapshot``).
+
+Uso:
+    python -m benchmarks.local_index --rows 100000 --dimensions 1536
+    python -m benchmarks.local_index --snapshot data/local_index
+"""
+import argparse
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.vectorstores.local_index import LocalVectorStore, normalize_rows
+
+
+def synthetic_store(rows: int, dimensions: int, clusters: int, seed: int = 0) -> LocalVectorStore:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    vectors = normalize_rows(centers[labels] + 0.5 * rng.standard_normal((rows, dimensions)).astype(np.float32))
+    documents = [Document(page_content=str(i)) for i in range(rows)]
+    return LocalVectorStore(DeterministicFakeEmbedding(size=dimensions), vectors=vectors, documents=documents)
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.snapshot:
+        store = LocalVectorStore.load(args.snapshot, DeterministicFakeEmbedding(size=1), mmap=True)
+    else:
+        store = synthetic_store(args.rows, args.dimensions, args.clusters)
+
+    rng = np.random.default_rng(1)
+    # Consultas cercanas a documentos existentes, como preguntas sobre el corpus
+    sample = rng.choice(len(store.documents), size=args.queries, replace=False)
+    queries = normalize_rows(np.asarray(store.vectors[sample]) + 0.1 * rng.standard_normal((args.queries, store.vectors.shape[1])).astype(np.float32))
+
+    start = time.perf_counter()
+    store.build_ivf(n_lists=args.lists, nprobe=args.nprobe)
+    build_time = time.perf_counter() - start
+
+    print(f"📊 Corpus: {len(store.documents)} vectores x {store.vectors.shape[1]} dimensiones, k={args.k}")
+    print(f"  - Construcción IVF ({len(store.ivf.centroids)} listas): {build_time:.2f} s\n")
+
+    exact_ids = []
+    start = time.perf_counter()
+    for query in queries:
+        exact_ids.append(store.search_vectors(query, k=args.k, exact=True)[0][0])
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    start = time.perf_counter()
+    store.search_vectors(queries, k=args.k, exact=True)
+    batch_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"{'modo':<28}{'ms/consulta':>12}{'recall@k':>10}")
+    print(f"{'exacto (1 consulta)':<28}{exact_ms:>12.3f}{1.0:>10.3f}")
+    print(f"{'exacto (lote)':<28}{batch_ms:>12.3f}{1.0:>10.3f}")
+
+    for nprobe in args.nprobe_levels:
+        store.ivf.nprobe = nprobe
+        hits = 0
+        start = time.perf_counter()
+        for query, expected in zip(queries, exact_ids):
+            found = store.search_vectors(query, k=args.k, exact=False)[0][0]
+            hits += len(set(found) & set(expected))
+        ivf_ms = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"{f'IVF nprobe={nprobe}':<28}{ivf_ms:>12.3f}{hits / (len(queries) * args.k):>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", help="ruta de un snapshot del índice local")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--nprobe-levels", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    main(parser.parse_args())
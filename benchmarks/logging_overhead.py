@@ -0,0 +1,96 @@
+"""Latencia bajo carga concurrente según cómo se escriben los registros.
+
+El destino simula un log driver de contenedor lento: cada escritura bloquea
+``--write-latency`` segundos. Se compara:
+
+- ``síncrono``: todo se escribe desde el event loop, con la salida detallada
+  del grafo activa (como los ``print`` de cada nodo y ``debug=True``).
+- ``cola INFO``: ``setup_logging`` con su handler de cola y nivel INFO.
+
+Uso:
+    python -m benchmarks.logging_overhead --sessions 64 --write-latency 0.0005
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import time
+
+from benchmarks.graph_setup import initial_state
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.config.memory import ChatHistoryStore, get_memory
+from src.config.redis_setup import InMemoryRedis
+from src.graph.agent import create_agent_graph, session_config
+from src.observability.logs import setup_logging, shutdown_logging
+
+
+class SlowStream:
+    """Stream cuyo ``write`` bloquea, como un pipe con contrapresión"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        time.sleep(self.latency)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+async def load(args: argparse.Namespace) -> tuple[float, float, float]:
+    agent = await create_agent_graph(
+        StubRetriever(documents=make_documents(), latency=args.retrieval_latency),
+        StubChatModel(latency=args.llm_latency),
+    )
+    store = ChatHistoryStore(InMemoryRedis())
+    latencies = []
+
+    async def one(i: int) -> None:
+        start = time.perf_counter()
+        await agent.ainvoke(initial_state("¿Qué cambia con la reforma de pensiones?"), config=session_config(get_memory(store, f"s-{i}")))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return args.sessions / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def main(args: argparse.Namespace) -> None:
+    results = []
+    logger = logging.getLogger("src")
+
+    # Antes: escritura síncrona con la salida detallada activa
+    sink = SlowStream(args.write_latency)
+    logger.handlers[:] = [logging.StreamHandler(sink)]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    with contextlib.redirect_stdout(sink):
+        results.append(("síncrono", await load(args), sink.writes))
+
+    # Después: handler de cola no bloqueante con nivel INFO
+    sink = SlowStream(args.write_latency)
+    setup_logging(sink)
+    logger.setLevel(logging.INFO)
+    with contextlib.redirect_stdout(sink):
+        results.append(("cola INFO", await load(args), None))
+    shutdown_logging()
+
+    print(f"\n📊 {args.sessions} sesiones concurrentes, {args.write_latency * 1e6:.0f} µs por escritura")
+    print(f"{'modo':<12}{'chats/s':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'escrituras':>12}")
+    for label, (throughput, p50, p99), writes in results:
+        writes = writes if writes is not None else sink.writes
+        print(f"{label:<12}{throughput:>10.1f}{p50 * 1000:>12.1f}{p99 * 1000:>12.1f}{writes:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--write-latency", type=float, default=0.0005)
+    parser.add_argument("--retrieval-latency", type=float, default=0.1)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
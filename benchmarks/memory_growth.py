@@ -0,0 +1,78 @@
+"""Tamaño del prompt y latencia según el largo de la sesión: historial completo vs. resumen.
+
+El LLM simulado tarda ``--token-latency`` segundos por token del prompt, así
+que la latencia crece con el historial que se pega en el prompt.
+
+Uso:
+    python -m benchmarks.memory_growth --turns 40 --budget 1500 --max-turns 6
+"""
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.stubs import StubChatModel
+from src.config.memory import ChatHistoryStore, HistorySummarizer, format_chat_history, get_memory
+from src.config.redis_setup import InMemoryRedis
+from src.graph.agent import create_response_chain
+from src.tools.tokens import count_tokens
+
+ANSWER = (
+    "La reforma de pensiones aumenta la **Pensión Garantizada Universal** y agrega una cotización "
+    "adicional del empleador. ## Aspectos clave - El aumento es gradual. - Se crea un seguro social. "
+) * 4
+SUMMARY = "El usuario consultó por la reforma de pensiones, la PGU y la cotización del empleador. " * 3
+
+
+async def run_session(mode: str, args: argparse.Namespace) -> dict[int, tuple[int, float, float]]:
+    summarizer = None
+    if mode == "summary":
+        summarizer = HistorySummarizer(StubChatModel(answer=SUMMARY, latency=args.summary_latency), args.budget, args.max_turns)
+    memory = get_memory(ChatHistoryStore(InMemoryRedis(), summarizer=summarizer), "benchmark")
+    llm = StubChatModel(answer=ANSWER, latency=args.base_latency, token_latency=args.token_latency)
+    respond = create_response_chain(llm)
+
+    results = {}
+    for turn in range(1, args.turns + 1):
+        question = f"Pregunta {turn}: ¿cómo me afecta la reforma si tengo 50 años?"
+        state = {
+            "messages": [HumanMessage(content=question)],
+            "chat_history": format_chat_history(await memory.aload_history()),
+            "agent_name": "Alexandra",
+            "user_data": {"nombre": "Ana", "genero": "femenino", "edad": {"anos": 50, "meses": 0}, "nivelEstudios": "universitario"},
+        }
+        start = time.perf_counter()
+        await respond(state, {})
+        respond_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await memory.asave_turn(question, ANSWER)
+        save_time = time.perf_counter() - start
+        results[turn] = (count_tokens(llm.prompts[-1]), respond_time, save_time)
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"📊 Presupuesto: {args.budget} tokens, {args.max_turns} turnos literales\n")
+    print(f"{'turno':>6}{'modo':>10}{'tokens prompt':>16}{'respuesta (ms)':>17}{'guardar (ms)':>15}")
+    buffer = await run_session("buffer", args)
+    summary = await run_session("summary", args)
+    for turn in args.report:
+        if turn > args.turns:
+            continue
+        for label, results in (("buffer", buffer), ("summary", summary)):
+            tokens, respond_time, save_time = results[turn]
+            print(f"{turn:>6}{label:>10}{tokens:>16}{respond_time * 1000:>17.1f}{save_time * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--max-turns", type=int, default=6)
+    parser.add_argument("--base-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.00005)
+    parser.add_argument("--summary-latency", type=float, default=0.3)
+    parser.add_argument("--report", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""Prueba de carga de la memoria: ``get_memory`` síncrono por petición vs. pool asíncrono.
+
+Cada sesión concurrente guarda ``--turns`` turnos y se mide la latencia de cada
+turno (guardar + leer historial + renovar TTL).
+
+Uso:
+    python -m benchmarks.memory_store --redis-url redis://localhost:6379/0
+    python -m benchmarks.memory_store --stand-in --latency 0.001
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from src.config.memory import ChatHistoryStore, get_memory
+from src.config.redis_setup import InMemoryRedis
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label: str, samples: list[float], elapsed: float) -> None:
+    print(f"{label}")
+    print(f"  - Turnos:     {len(samples)} en {elapsed:.2f} s ({len(samples) / elapsed:.0f} turnos/s)")
+    print(f"  - p50:        {percentile(samples, 50) * 1000:.2f} ms")
+    print(f"  - p99:        {percentile(samples, 99) * 1000:.2f} ms")
+    print(f"  - media:      {statistics.mean(samples) * 1000:.2f} ms")
+
+
+def legacy_turn(redis_url: str, session_id: str) -> None:
+    """Camino anterior: cliente nuevo, ping bloqueante y memoria nueva en cada turno"""
+    import redis
+    from langchain.memory import ConversationBufferMemory
+    from langchain_community.chat_message_histories import RedisChatMessageHistory
+
+    redis.from_url(redis_url).ping()
+    memory = ConversationBufferMemory(
+        memory_key="chat_history",
+        chat_memory=RedisChatMessageHistory(session_id=session_id, url=redis_url, key_prefix="bench:", ttl=3600),
+        return_messages=True,
+    )
+    memory.save_context({"input": "¿Qué es la PGU?"}, {"output": "La Pensión Garantizada Universal..."})
+    memory.load_memory_variables({})
+
+
+async def run_legacy(redis_url: str, sessions: int, turns: int) -> None:
+    samples: list[float] = []
+
+    async def session() -> None:
+        session_id = f"bench-{uuid.uuid4()}"
+        for _ in range(turns):
+            start = time.perf_counter()
+            legacy_turn(redis_url, session_id)  # bloquea el event loop, como en /chat
+            samples.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    report("🐢 get_memory por petición (síncrono)", samples, time.perf_counter() - start)
+
+
+async def run_pooled(store: ChatHistoryStore, sessions: int, turns: int) -> None:
+    samples: list[float] = []
+
+    async def session() -> None:
+        memory = get_memory(store, f"bench-{uuid.uuid4()}")
+        for _ in range(turns):
+            start = time.perf_counter()
+            await memory.asave_turn("¿Qué es la PGU?", "La Pensión Garantizada Universal...")
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    report("🚀 ChatHistoryStore con pool asíncrono", samples, time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"📊 Sesiones concurrentes: {args.sessions}, turnos por sesión: {args.turns}\n")
+    if args.stand_in:
+        client = InMemoryRedis(latency=args.latency)
+        await run_pooled(ChatHistoryStore(client, key_prefix="bench:"), args.sessions, args.turns)
+        print(f"  - Viajes a Redis por turno: {client.round_trips / (args.sessions * args.turns):.1f}")
+        return
+
+    from redis.asyncio import Redis
+
+    await run_legacy(args.redis_url, args.sessions, args.turns)
+    client = Redis.from_url(args.redis_url, max_connections=args.sessions)
+    await run_pooled(ChatHistoryStore(client, key_prefix="bench:"), args.sessions, args.turns)
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--stand-in", action="store_true", help="usar InMemoryRedis en vez de un servidor Redis")
+    parser.add_argument("--latency", type=float, default=0.001, help="latencia simulada por viaje con --stand-in")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,153 @@
+"""Costo por petición de la validación de host y CORS.
+
+Se llama directamente a la pila ASGI (sin servidor ni red) con una
+aplicación vacía, para aislar el costo de los middlewares:
+
+- ``antes``: ``validate_host`` como middleware HTTP, que vuelve a leer
+  ``CORS_ORIGINS`` en cada petición, y el CORS que construye un ``Request``.
+- ``después``: ``HostValidationMiddleware`` y ``CORSMiddlewareWithErrorHandling``
+  con una ``CORSPolicy`` calculada al iniciar.
+
+También verifica que los subdominios de ``*.dominio`` se aceptan.
+
+Uso:
+    python -m benchmarks.middleware --requests 20000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+
+from fastapi import Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.config.cors import load_cors_policy, setup_cors
+from src.middlewares import CORSMiddlewareWithErrorHandling, HostValidationMiddleware
+
+CORS_ORIGINS = "https://pensiones.cl,https://www.pensiones.cl,https://app.previsional.cl,*.pensiones.cl"
+
+
+# Implementación anterior, reproducida para la comparación
+class LegacyCORS(CORSMiddleware):
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        origin = request.headers.get("origin")
+        if not origin and "*" not in self.allow_origins:
+            return await JSONResponse(status_code=403, content={"error": "Acceso CORS denegado"})(scope, receive, send)
+        if origin and origin not in self.allow_origins and "*" not in self.allow_origins:
+            return await JSONResponse(status_code=403, content={"error": "Acceso CORS denegado"})(scope, receive, send)
+        return await super().__call__(scope, receive, send)
+
+
+def legacy_allowed_hosts():
+    origins = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
+    return [origin.replace("https://", "") for origin in origins if origin != "*"]
+
+
+async def legacy_validate_host(request: Request, call_next):
+    host = request.headers.get("host", "").split(":")[0]
+    if host in ["localhost", "127.0.0.1"] or "*" in os.getenv("CORS_ORIGINS", ""):
+        return await call_next(request)
+    if host not in legacy_allowed_hosts():
+        return JSONResponse(status_code=403, content={"error": "Acceso denegado"})
+    return await call_next(request)
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": json.dumps({"ok": True}).encode()})
+
+
+def cors_options() -> dict:
+    return {"allow_credentials": True, "allow_methods": ["POST", "GET"], "allow_headers": ["*"], "max_age": 3600}
+
+
+def legacy_stack():
+    origins, regex = setup_cors()
+    app = LegacyCORS(endpoint, allow_origins=origins, allow_origin_regex=regex, **cors_options())
+    return BaseHTTPMiddleware(app, dispatch=legacy_validate_host)
+
+
+def policy_stack():
+    policy = load_cors_policy()
+    app = CORSMiddlewareWithErrorHandling(endpoint, policy=policy, **cors_options())
+    return HostValidationMiddleware(app, policy=policy)
+
+
+def scope_for(host: str, origin: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "https",
+        "path": "/chat",
+        "raw_path": b"/chat",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", host.encode()),
+            (b"origin", origin.encode()),
+            (b"content-type", b"application/json"),
+            (b"user-agent", b"benchmark"),
+        ],
+        "client": ("10.0.0.1", 1234),
+        "server": (host, 443),
+    }
+
+
+async def call(app, scope: dict) -> int:
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, requests: int) -> float:
+    scope = scope_for("www.pensiones.cl", "https://www.pensiones.cl")
+    for _ in range(200):
+        await call(app, scope)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, scope)
+    return (time.perf_counter() - start) / requests
+
+
+async def main(args: argparse.Namespace) -> None:
+    os.environ["CORS_ORIGINS"] = CORS_ORIGINS
+    with contextlib.redirect_stdout(io.StringIO()):
+        stacks = {"antes": legacy_stack(), "después": policy_stack()}
+
+    print(f"\n📊 {args.requests} peticiones POST /chat con origen permitido")
+    print(f"{'pila':<10}{'µs/petición':>14}")
+    for label, app in stacks.items():
+        print(f"{label:<10}{await measure(app, args.requests) * 1e6:>14.1f}")
+
+    cases = [
+        ("www.pensiones.cl", "https://www.pensiones.cl"),
+        ("portal.pensiones.cl", "https://portal.pensiones.cl"),
+        ("otro.cl", "https://otro.cl"),
+    ]
+    print(f"\n{'host / origen':<32}{'antes':>8}{'después':>10}")
+    for host, origin in cases:
+        statuses = [await call(app, scope_for(host, origin)) for app in stacks.values()]
+        print(f"{host:<32}{statuses[0]:>8}{statuses[1]:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""Latencia y costo por ruta: un solo modelo vs. niveles de modelo (``TierRouter``).
+
+Envía los mensajes etiquetados de ``benchmarks.routing`` (saludos y preguntas
+previsionales) con ``--concurrency`` peticiones simultáneas; una de cada
+``--long-history-every`` peticiones trae un historial de ``--history-words``
+palabras. Los dobles de modelo tardan una latencia fija más una por token de
+salida y responden ``--answer-words`` palabras; las respuestas con contexto se
+cortan en ``max_tokens`` como en el proveedor:
+
+- ``un modelo``: todas las respuestas con el modelo completo (``full``).
+- ``niveles``: las respuestas sin contexto y con historial corto van al
+  modelo liviano (``light``), el resto al completo.
+
+Los tokens y el costo salen de ``agent_llm_tier_tokens_total`` y los precios
+(USD por millón de tokens) de ``--*-price-*``.
+
+Uso:
+    python -m benchmarks.model_tiers --repeat 4 --concurrency 8
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks.graph_setup import initial_state
+from benchmarks.routing import LABELLED_MESSAGES
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.graph.agent import create_agent_graph, session_config
+from src.graph.prompts import answer_token_cap
+from src.graph.resilience import UpstreamPolicy
+from src.graph.routing import pension_router
+from src.graph.tiers import TierRouter
+from src.observability.metrics import LLM_TIER_DURATION, LLM_TIER_TOKENS
+
+TIERS = ("full", "light")
+TYPES = ("prompt", "completion")
+
+
+def tier_tokens() -> dict:
+    return {(tier, kind): LLM_TIER_TOKENS.value(tier, kind) for tier in TIERS for kind in TYPES}
+
+
+def models(args: argparse.Namespace) -> tuple[StubChatModel, StubChatModel]:
+    answer = " ".join(["palabra"] * args.answer_words)
+    full = StubChatModel(latency=args.full_latency, output_token_latency=args.full_token_latency, answer=answer)
+    light = StubChatModel(latency=args.light_latency, output_token_latency=args.light_token_latency, answer=answer)
+    return full, light
+
+
+async def run(label: str, tiers: TierRouter, args: argparse.Namespace) -> dict:
+    # Sin cobertura ni plazos: solo se compara el modelo elegido
+    upstream = UpstreamPolicy(request_timeout=None, retrieval_timeout=None, hedge=None, failure_threshold=0)
+    agent = await create_agent_graph(StubRetriever(documents=make_documents()), tiers.full.llm, upstream=upstream, tiers=tiers)
+    history = " ".join(["historial"] * args.history_words)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = {"sin contexto": [], "con contexto": []}
+    before = tier_tokens()
+    calls = {tier: LLM_TIER_DURATION.count(tier) for tier in TIERS}
+
+    async def one(i: int, message: str) -> None:
+        state = initial_state(message)
+        state["chat_history"] = history if i % args.long_history_every == 0 else ""
+        async with semaphore:
+            start = time.perf_counter()
+            await agent.ainvoke(state, config=session_config(None))
+            route = "con contexto" if pension_router.needs_context(message) else "sin contexto"
+            latencies[route].append(time.perf_counter() - start)
+
+    messages = [message for message, _ in LABELLED_MESSAGES] * args.repeat
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, message) for i, message in enumerate(messages)))
+    elapsed = time.perf_counter() - start
+
+    tokens = {key: value - before[key] for key, value in tier_tokens().items()}
+    prices = {
+        ("full", "prompt"): args.full_price_in, ("full", "completion"): args.full_price_out,
+        ("light", "prompt"): args.light_price_in, ("light", "completion"): args.light_price_out,
+    }
+    return {
+        "label": label,
+        "requests": len(messages),
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "calls": {tier: LLM_TIER_DURATION.count(tier) - calls[tier] for tier in TIERS},
+        "tokens": tokens,
+        "cost": sum(tokens[key] * prices[key] for key in tokens) / 1e6,
+    }
+
+
+def report(results: list[dict], args: argparse.Namespace) -> None:
+    print(f"\n📊 {results[0]['requests']} peticiones (concurrencia {args.concurrency}), respuestas de {args.answer_words} palabras, "
+          f"tope de salida con contexto {answer_token_cap()} tokens + fuentes")
+    print(f"{'modelos':<12}{'ruta':<14}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for r in results:
+        for route, values in r["latencies"].items():
+            values = np.asarray(values)
+            print(f"{r['label']:<12}{route:<14}{np.percentile(values, 50) * 1000:>10.0f}{np.percentile(values, 95) * 1000:>10.0f}")
+
+    print(f"\n{'modelos':<12}{'light':>8}{'prompt full':>13}{'prompt light':>14}{'salida full':>13}{'salida light':>14}{'USD/1000 pet.':>15}{'pet./s':>8}")
+    for r in results:
+        tokens, share = r["tokens"], r["calls"]["light"] / max(sum(r["calls"].values()), 1)
+        print(f"{r['label']:<12}{share:>8.0%}{tokens['full', 'prompt']:>13.0f}{tokens['light', 'prompt']:>14.0f}"
+              f"{tokens['full', 'completion']:>13.0f}{tokens['light', 'completion']:>14.0f}"
+              f"{r['cost'] / r['requests'] * 1000:>15.3f}{r['requests'] / r['elapsed']:>8.1f}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    full, light = models(args)
+    results = [
+        await run("un modelo", TierRouter(full), args),
+        await run("niveles", TierRouter(full, light, light_max_history_tokens=args.light_max_history_tokens), args),
+    ]
+    report(results, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--answer-words", type=int, default=320)
+    parser.add_argument("--history-words", type=int, default=600)
+    parser.add_argument("--long-history-every", type=int, default=5)
+    parser.add_argument("--light-max-history-tokens", type=int, default=400)
+    parser.add_argument("--full-latency", type=float, default=0.3)
+    parser.add_argument("--full-token-latency", type=float, default=0.0005)
+    parser.add_argument("--light-latency", type=float, default=0.1)
+    parser.add_argument("--light-token-latency", type=float, default=0.0002)
+    parser.add_argument("--full-price-in", type=float, default=2.5)
+    parser.add_argument("--full-price-out", type=float, default=10.0)
+    parser.add_argument("--light-price-in", type=float, default=0.15)
+    parser.add_argument("--light-price-out", type=float, default=0.6)
+    asyncio.run(main(parser.parse_args()))
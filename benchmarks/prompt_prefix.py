@@ -0,0 +1,89 @@
+"""Prefijo estable del prompt entre peticiones y costo de formatearlo.
+
+El caché de prompts del proveedor solo reutiliza el prefijo idéntico byte a
+byte entre llamadas. Se comparan peticiones con distintos usuarios, horas y
+contextos: el diseño anterior (datos del usuario al inicio del prompt) contra
+las plantillas actuales (instrucciones estáticas primero), y las actuales con
+un mismo agente, día y minuto, como en un despliegue real.
+
+El proveedor solo cachea prefijos desde ``PROVIDER_CACHE_MIN_TOKENS``; el
+script indica si el prefijo estable llega a ese mínimo.
+
+Uso:
+    python -m benchmarks.prompt_prefix --requests 200
+"""
+import argparse
+import os
+import random
+import time
+
+from src.graph.prompts import (
+    CONTEXT_INSTRUCTIONS, CONTEXT_PROMPT, SESSION_TEMPLATE, CONTEXT_QUESTION_TEMPLATE, PROVIDER_CACHE_MIN_TOKENS
+)
+from src.tools.tokens import count_tokens
+
+
+def request_fields(rng: random.Random, same_minute: bool = False) -> dict:
+    if same_minute:
+        return {**request_fields(rng), "agent_name": "Alexandra", "date": "2025-03-14", "time": "10:42"}
+    return {
+        "agent_name": rng.choice(["Alexandra", "Mateo"]),
+        "user_name": rng.choice(["Ana", "Pedro", "Rosa", "Luis"]),
+        "user_gender": rng.choice(["femenino", "masculino"]),
+        "user_age": rng.randint(20, 80),
+        "user_education": rng.choice(["media", "técnico", "universitario"]),
+        "date": "2025-03-%02d" % rng.randint(1, 28),
+        "time": "%02d:%02d" % (rng.randint(0, 23), rng.randint(0, 59)),
+        "timezone": "America/Santiago",
+        "chat_history": "No hay historial previo.",
+        "question": f"¿Cómo me afecta la reforma? ({rng.random():.6f})",
+        "context": f"[link_1] Reforma de pensiones | previsionsocial.gob.cl\n{rng.random():.6f}",
+        "sources": '<a href="https://previsionsocial.gob.cl" target="_blank">link_1</a>',
+    }
+
+
+def previous_layout(fields: dict) -> str:
+    """Orden anterior: presentación breve, datos de la petición y luego las instrucciones"""
+    intro, _, instructions = CONTEXT_INSTRUCTIONS.partition("\n\n")
+    dynamic = SESSION_TEMPLATE.format(**fields) + "\n\n" + CONTEXT_QUESTION_TEMPLATE.format(**fields)
+    return f"{intro}\n\n{dynamic}\n\n{instructions}"
+
+
+def current_layout(fields: dict) -> str:
+    return "\n\n".join(message.content for message in CONTEXT_PROMPT.format_messages(**fields))
+
+
+def common_prefix(texts: list[str]) -> str:
+    return os.path.commonprefix(texts)
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(3)
+    requests = [request_fields(rng) for _ in range(args.requests)]
+    same_minute = [request_fields(rng, same_minute=True) for _ in range(args.requests)]
+
+    print(f"\n📊 {args.requests} peticiones con usuarios, horas y contextos distintos")
+    stable = 0
+    for label, render, batch in (
+        ("Anterior", previous_layout, requests),
+        ("Actual", current_layout, requests),
+        ("Actual, mismo agente y minuto", current_layout, same_minute),
+    ):
+        start = time.perf_counter()
+        prompts = [render(fields) for fields in batch]
+        elapsed = (time.perf_counter() - start) / len(batch)
+        stable = count_tokens(common_prefix(prompts))
+        total = sum(count_tokens(prompt) for prompt in prompts) / len(prompts)
+        print(f"  - {label}: prefijo estable {stable} de {total:.0f} tokens, "
+              f"formateo {elapsed * 1e6:.1f} µs/petición")
+    if stable < PROVIDER_CACHE_MIN_TOKENS:
+        print(f"⚠️ El prefijo estable no llega a los {PROVIDER_CACHE_MIN_TOKENS} tokens que el proveedor exige para cachear: "
+              f"cached_prefix_tokens seguirá en 0 hasta que las instrucciones crezcan")
+    else:
+        print(f"✅ El prefijo estable supera los {PROVIDER_CACHE_MIN_TOKENS} tokens del caché del proveedor")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    main(parser.parse_args())
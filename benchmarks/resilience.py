@@ -0,0 +1,152 @@
+"""Plazos, cobertura de latencia y circuitos con fallas inyectadas en los dobles.
+
+Cada escenario compara el grafo sin política (``UpstreamPolicy`` sin plazos,
+sin cobertura y sin circuitos, como antes) con la política activa:
+
+1. ``búsqueda lenta``: ``--retrieval-slow-rate`` de las búsquedas tarda
+   ``--stall`` segundos. Con plazo se responde sin contexto al vencer
+   ``RETRIEVAL_TIMEOUT``.
+2. ``cola del LLM``: ``--llm-slow-rate`` de las llamadas tarda ``--stall``
+   segundos. La cobertura lanza una segunda llamada pasado el p95.
+3. ``LLM caído``: cada llamada falla tras ``--error-latency`` segundos (un
+   timeout de conexión). Con el circuito abierto las peticiones fallan de
+   inmediato con 503; al volver el proveedor, la llamada de prueba lo cierra.
+
+Uso:
+    python -m benchmarks.resilience --requests 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from benchmarks.graph_setup import initial_state
+from benchmarks.stubs import Faults, StubChatModel, StubRetriever, make_documents
+from src.graph.agent import create_agent_graph, session_config
+from src.graph.resilience import LatencyTracker, UpstreamError, UpstreamPolicy
+from src.observability.metrics import LLM_HEDGES
+
+QUESTION = "¿Cómo cambia mi pensión con la reforma previsional?"
+
+
+def no_policy() -> UpstreamPolicy:
+    return UpstreamPolicy(request_timeout=None, retrieval_timeout=None, hedge=None, failure_threshold=0)
+
+
+def policy(args: argparse.Namespace) -> UpstreamPolicy:
+    return UpstreamPolicy(
+        request_timeout=args.request_timeout,
+        retrieval_timeout=args.retrieval_timeout,
+        hedge=LatencyTracker(percentile=0.95, min_samples=20, min_delay=args.hedge_min_delay),
+        failure_threshold=5,
+        reset_timeout=args.reset_timeout,
+    )
+
+
+async def load(agent, upstream: UpstreamPolicy, requests: int, concurrency: int) -> dict:
+    """Envía ``requests`` preguntas y clasifica cada resultado"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, outcomes = [], {"ok": 0, "sin contexto": 0}
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await agent.ainvoke(initial_state(QUESTION), config=session_config(None, upstream.deadline()))
+                outcome = "ok" if result.get("sources") else "sin contexto"
+            except UpstreamError as e:
+                outcome = str(e.status_code)
+            except ConnectionError:
+                outcome = "500"
+            latencies.append(time.perf_counter() - start)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    values = np.asarray(latencies)
+    return {"p50": np.percentile(values, 50), "p99": np.percentile(values, 99), "max": values.max(), "outcomes": outcomes}
+
+
+def report(title: str, rows: list[tuple[str, dict]], extra: str = "") -> None:
+    print(f"\n📊 {title}")
+    print(f"{'política':<14}{'p50 (ms)':>10}{'p99 (ms)':>10}{'máx (ms)':>10}  resultados")
+    for label, r in rows:
+        print(f"{label:<14}{r['p50'] * 1000:>10.0f}{r['p99'] * 1000:>10.0f}{r['max'] * 1000:>10.0f}  {r['outcomes']}")
+    if extra:
+        print(extra)
+
+
+async def slow_retrieval(args: argparse.Namespace) -> None:
+    rows = []
+    for label, upstream in (("sin política", no_policy()), ("con política", policy(args))):
+        retriever = StubRetriever(
+            documents=make_documents(),
+            latency=args.retrieval_latency,
+            faults=Faults(slow_rate=args.retrieval_slow_rate, slow_latency=args.stall, seed=args.seed),
+        )
+        agent = await create_agent_graph(retriever, StubChatModel(latency=args.llm_latency), upstream=upstream)
+        rows.append((label, await load(agent, upstream, args.requests, args.concurrency)))
+    report(f"Búsqueda lenta: {args.retrieval_slow_rate:.0%} tarda {args.stall:g} s (plazo de búsqueda {args.retrieval_timeout:g} s)", rows)
+
+
+async def llm_tail(args: argparse.Namespace) -> None:
+    rows = []
+    extra = ""
+    for label, upstream in (("sin política", no_policy()), ("con política", policy(args))):
+        llm = StubChatModel(latency=args.llm_latency, faults=Faults(slow_rate=args.llm_slow_rate, slow_latency=args.stall, seed=args.seed))
+        agent = await create_agent_graph(StubRetriever(documents=make_documents()), llm, upstream=upstream)
+        launched = LLM_HEDGES.value("launched")
+        rows.append((label, await load(agent, upstream, args.requests, args.concurrency)))
+        if upstream.hedge:
+            hedges = LLM_HEDGES.value("launched") - launched
+            extra = (f"  - Cobertura tras {upstream.hedge.threshold() * 1000:.0f} ms: {hedges:.0f} llamadas extra "
+                     f"({hedges / args.requests:.1%} de las peticiones), ganó la de respaldo "
+                     f"{LLM_HEDGES.value('backup'):.0f} veces")
+    report(f"Cola del LLM: {args.llm_slow_rate:.0%} de las llamadas tarda {args.stall:g} s", rows, extra)
+
+
+async def llm_down(args: argparse.Namespace) -> None:
+    rows = []
+    extra = ""
+    for label, upstream in (("sin política", no_policy()), ("con política", policy(args))):
+        faults = Faults(down=True, error_latency=args.error_latency)
+        llm = StubChatModel(latency=args.llm_latency, faults=faults)
+        agent = await create_agent_graph(StubRetriever(documents=make_documents()), llm, upstream=upstream)
+        rows.append((label, await load(agent, upstream, args.requests, args.concurrency)))
+        if upstream.llm_breaker.failure_threshold:
+            calls = len(llm.prompts)
+            # El proveedor vuelve: tras el reset, una llamada de prueba cierra el circuito
+            faults.down = False
+            await asyncio.sleep(args.reset_timeout)
+            recovered = await load(agent, upstream, args.concurrency, args.concurrency)
+            extra = (f"  - Llamadas al LLM caído: {calls} de {args.requests} peticiones\n"
+                     f"  - Tras {args.reset_timeout:g} s con el proveedor de vuelta: {recovered['outcomes']}, "
+                     f"circuito {upstream.llm_breaker.state}")
+    report(f"LLM caído: cada llamada falla tras {args.error_latency:g} s", rows, extra)
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Una advertencia por búsqueda degradada no aporta al resultado
+    logging.getLogger("src.graph.resilience").setLevel(logging.ERROR)
+    await slow_retrieval(args)
+    await llm_tail(args)
+    await llm_down(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--retrieval-latency", type=float, default=0.03)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--retrieval-slow-rate", type=float, default=0.05)
+    parser.add_argument("--llm-slow-rate", type=float, default=0.05)
+    parser.add_argument("--stall", type=float, default=3.0)
+    parser.add_argument("--error-latency", type=float, default=1.0)
+    parser.add_argument("--request-timeout", type=float, default=10.0)
+    parser.add_argument("--retrieval-timeout", type=float, default=0.3)
+    parser.add_argument("--hedge-min-delay", type=float, default=0.15)
+    parser.add_argument("--reset-timeout", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
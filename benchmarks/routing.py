@@ -0,0 +1,86 @@
+"""Precisión y tiempo por mensaje del ruteo: búsqueda lineal de substrings vs. regex compilada.
+
+Uso:
+    python -m benchmarks.routing --repeat 2000
+"""
+import argparse
+import time
+
+from src.graph.routing import load_keywords, pension_router
+
+# (mensaje, necesita contexto)
+LABELLED_MESSAGES = [
+    ("Hola, ¿cómo estás?", False),
+    ("Espero que tengas un buen día", False),
+    ("Gracias por la ayuda, adiós", False),
+    ("¿Quién eres?", False),
+    ("Buenas tardes", False),
+    ("Espectacular, muchas gracias", False),
+    ("¿Me puedes repetir lo último?", False),
+    ("Perfecto, eso era todo", False),
+    ("Respeto tu opinión", False),
+    ("¿Qué hora es en Santiago?", False),
+    ("Es posible que lo espere mañana", False),
+    ("Disponible en la tarde", False),
+    ("¿Cuándo empieza la reforma de pensiones?", True),
+    ("edad de jubilación", True),
+    ("¿Cuál es la edad de jubilacion para mujeres?", True),
+    ("Quiero saber de mi pension", True),
+    ("¿Cómo funciona la cotizacion del empleador?", True),
+    ("¿Qué es el APV?", True),
+    ("¿Las AFPs van a desaparecer?", True),
+    ("¿Qué hace la SP?", True),
+    ("¿Qué es la PGU?", True),
+    ("Diferencia entre renta vitalicia y retiro programado", True),
+    ("¿Puedo pedir una jubilación anticipada?", True),
+    ("¿Cómo obtengo mi certificado de cotizaciones?", True),
+    ("¿Qué es el pilar solidario?", True),
+    ("¿Qué beneficios tiene el IPS?", True),
+    ("Soy trabajadora independiente, ¿debo cotizar?", True),
+    ("¿Qué pasa con la pensión de sobrevivencia?", True),
+    ("¿Hay bonos para adultos mayores?", True),
+    ("¿Cuánto es la compensación por expectativa de vida?", True),
+    ("¿Qué cambia para los pensionados actuales?", True),
+    ("¿El seguro social es parte de la previsión?", True),
+    ("Mi empleador no paga mis cotizaciones", True),
+    ("¿Qué es el fondo autónomo de protección previsional?", True),
+    ("¿Qué es la capitalizacion individual?", True),
+    ("Tengo dudas sobre la vejez y el ahorro", True),
+]
+
+
+def legacy_needs_context(message: str, keywords: list[str]) -> bool:
+    """Ruteo anterior: substrings sobre el mensaje en minúsculas"""
+    query = message.lower()
+    return any(phrase in query for phrase in keywords)
+
+
+def evaluate(label: str, predict, repeat: int) -> None:
+    predictions = [predict(message) for message, _ in LABELLED_MESSAGES]
+    correct = sum(prediction == expected for prediction, (_, expected) in zip(predictions, LABELLED_MESSAGES))
+    false_positives = [m for p, (m, e) in zip(predictions, LABELLED_MESSAGES) if p and not e]
+    missed = [m for p, (m, e) in zip(predictions, LABELLED_MESSAGES) if e and not p]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message, _ in LABELLED_MESSAGES:
+            predict(message)
+    per_message = (time.perf_counter() - start) / (repeat * len(LABELLED_MESSAGES))
+
+    print(f"{label}")
+    print(f"  - Precisión:          {correct}/{len(LABELLED_MESSAGES)} ({correct / len(LABELLED_MESSAGES):.0%})")
+    print(f"  - Tiempo por mensaje: {per_message * 1e6:.2f} µs")
+    print(f"  - Falsos positivos:   {false_positives}")
+    print(f"  - Omitidos:           {missed}")
+
+
+def main(args: argparse.Namespace) -> None:
+    keywords = [keyword.lower() for keyword in load_keywords()]
+    evaluate("🐢 Substrings (anterior)", lambda message: legacy_needs_context(message, keywords), args.repeat)
+    evaluate("🚀 Regex compilada", pension_router.needs_context, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    main(parser.parse_args())
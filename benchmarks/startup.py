@@ -0,0 +1,119 @@
+"""Tiempo de importación y arranque en frío de la API.
+
+1. Importa ``src.main`` en un proceso nuevo: ya no hay llamadas a
+   proveedores al importar, así que funciona sin red ni claves.
+2. Arranca la aplicación con proveedores simulados (latencias de
+   ``--llm``, ``--vectorstore``, ``--redis`` y ``--bm25`` segundos) y mide
+   cuándo responden ``/healthz`` y ``/readyz``. Se compara con crear los
+   mismos componentes uno tras otro antes de aceptar conexiones, como se
+   hacía al importar el módulo.
+
+Uso:
+    python -m benchmarks.startup --vectorstore 1.5 --redis 0.3
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.config.memory import ChatHistoryStore
+from src.config.redis_setup import InMemoryRedis
+from src.graph.agent import create_agent_graph
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import src.main; print(time.perf_counter() - start)"
+
+
+def import_time() -> float:
+    env = {**os.environ, "CORS_ORIGINS": "*", "LOG_LEVEL": "WARNING"}
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def factories(args: argparse.Namespace) -> dict:
+    """Fábricas con la latencia de cada proveedor; las síncronas bloquean como los SDK"""
+
+    def setup_llm():
+        time.sleep(args.llm)
+        return StubChatModel()
+
+    def setup_vectorstore():
+        time.sleep(args.vectorstore)
+        return SimpleNamespace(embeddings=DeterministicFakeEmbedding(size=64))
+
+    async def setup_memory_store(summarizer=None):
+        await asyncio.sleep(args.redis)
+        return ChatHistoryStore(InMemoryRedis())
+
+    def setup_retriever(vectorstore):
+        time.sleep(args.bm25)
+        return StubRetriever(documents=make_documents())
+
+    return {
+        "setup_llm": setup_llm,
+        "setup_vectorstore": setup_vectorstore,
+        "setup_memory_store": setup_memory_store,
+        "setup_retriever": setup_retriever,
+    }
+
+
+async def sequential(args: argparse.Namespace) -> float:
+    """Antes: todo se crea en orden antes de que el proceso acepte conexiones"""
+    stubs = factories(args)
+    start = time.perf_counter()
+    llm = stubs["setup_llm"]()
+    vectorstore = stubs["setup_vectorstore"]()
+    retriever = stubs["setup_retriever"](vectorstore)
+    await create_agent_graph(retriever, llm)
+    await stubs["setup_memory_store"]()
+    return time.perf_counter() - start
+
+
+async def background(args: argparse.Namespace) -> tuple[float, float]:
+    """Después: el lifespan lanza la inicialización y el proceso responde de inmediato"""
+    import src.main as main
+
+    for name, factory in factories(args).items():
+        setattr(main, name, factory)
+
+    start = time.perf_counter()
+    live = ready = None
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            while ready is None:
+                if live is None and (await client.get("/healthz")).status_code == 200:
+                    live = time.perf_counter() - start
+                if (await client.get("/readyz")).status_code == 200:
+                    ready = time.perf_counter() - start
+                await asyncio.sleep(0.005)
+    return live, ready
+
+
+async def main(args: argparse.Namespace) -> None:
+    os.environ["CORS_ORIGINS"] = "*"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    print(f"\n📦 Importar src.main: {import_time() * 1000:.0f} ms (sin llamadas de red)")
+
+    before = await sequential(args)
+    live, ready = await background(args)
+    print(f"\n📊 Arranque en frío: LLM {args.llm}s, vector store {args.vectorstore}s, Redis {args.redis}s, BM25 {args.bm25}s")
+    print(f"{'modo':<14}{'/healthz (s)':>14}{'/readyz (s)':>14}")
+    print(f"{'secuencial':<14}{before:>14.2f}{before:>14.2f}")
+    print(f"{'lifespan':<14}{live:>14.2f}{ready:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", type=float, default=0.05)
+    parser.add_argument("--vectorstore", type=float, default=1.5)
+    parser.add_argument("--redis", type=float, default=0.3)
+    parser.add_argument("--bm25", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
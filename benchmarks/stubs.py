@@ -0,0 +1,194 @@
+"""Dobles locales para los benchmarks: sin red, con latencia configurable."""
+import asyncio
+import random
+import time
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.messages import AIMessage
+from langchain_core.retrievers import BaseRetriever
+
+from src.tools.tokens import count_tokens
+
+
+def make_documents(count: int = 4) -> List[Document]:
+    """Genera documentos con los mismos metadatos que lee ``retrieve_context``"""
+    return [
+        Document(
+            page_content=f"La reforma de pensiones establece cambios en el punto {i}.",
+            metadata={
+                "title": f"Documento {i}",
+                "url_source": f"https://previsionsocial.gob.cl/doc-{i}",
+                "source_domain": "previsionsocial.gob.cl",
+                "estimated_published_time": "2025-02-18",
+            },
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+class Faults:
+    """Fallas inyectadas en un doble: errores al azar, respuestas lentas o caída total.
+
+    ``error_latency`` es lo que tarda en fallar (p. ej. un timeout de conexión).
+    ``injected`` cuenta las fallas y respuestas lentas inyectadas.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        down: bool = False,
+        error_latency: float = 0.0,
+        seed: int = 0,
+    ):
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.down = down
+        self.error_latency = error_latency
+        self.random = random.Random(seed)
+        self.injected = {"errors": 0, "slow": 0}
+
+    async def apply(self) -> None:
+        if self.down or self.random.random() < self.error_rate:
+            self.injected["errors"] += 1
+            if self.error_latency:
+                await asyncio.sleep(self.error_latency)
+            raise ConnectionError("falla inyectada")
+        if self.random.random() < self.slow_rate:
+            self.injected["slow"] += 1
+            await asyncio.sleep(self.slow_latency)
+
+
+class StubRetriever(BaseRetriever):
+    """Retriever que devuelve documentos fijos tras una latencia simulada.
+
+    Con ``blocking=True`` la versión asíncrona duerme con ``time.sleep``, igual
+    que una llamada síncrona dentro de un nodo async. ``calls`` cuenta las búsquedas
+    y ``faults`` inyecta fallas en la versión asíncrona.
+    """
+
+    latency: float = 0.0
+    blocking: bool = False
+    documents: List[Document] = []
+    calls: int = 0
+    faults: Any = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return list(self.documents)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        self.calls += 1
+        if self.faults:
+            await self.faults.apply()
+        if self.latency and self.blocking:
+            time.sleep(self.latency)
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+        return list(self.documents)
+
+
+class StubChatModel:
+    """Modelo de chat que responde un texto fijo tras una latencia simulada.
+
+    ``token_latency`` agrega latencia por token del prompt, para modelar que
+    los prompts más largos tardan más y ``output_token_latency`` por token de la
+    respuesta, que se corta en ``max_tokens`` como en el proveedor. Los prompts
+    recibidos quedan en ``prompts`` y ``faults`` inyecta fallas en ``ainvoke``.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        answer: str = "Respuesta de prueba.",
+        blocking: bool = False,
+        token_latency: float = 0.0,
+        faults: Faults | None = None,
+        output_token_latency: float = 0.0,
+    ):
+        self.latency = latency
+        self.faults = faults
+        self.answer = answer
+        self.blocking = blocking
+        self.token_latency = token_latency
+        self.output_token_latency = output_token_latency
+        self.model_name = "stub"
+        self.prompts: list = []
+
+    def _answer(self, max_tokens: int | None) -> str:
+        if max_tokens is None or count_tokens(self.answer) <= max_tokens:
+            return self.answer
+        # Aproximación de 4 caracteres por token, como ``count_tokens`` sin tiktoken
+        return self.answer[: max_tokens * 4]
+
+    def _message(self, answer: str) -> AIMessage:
+        # Como el proveedor, ``finish_reason`` indica si la respuesta se cortó en ``max_tokens``
+        return AIMessage(content=answer, response_metadata={"finish_reason": "length" if answer != self.answer else "stop"})
+
+    def _delay(self, prompt, answer: str) -> float:
+        # Los nodos envían una lista de mensajes; se guarda el texto concatenado
+        if not isinstance(prompt, str):
+            prompt = "\n\n".join(message.content for message in prompt)
+        self.prompts.append(prompt)
+        delay = self.latency
+        if self.token_latency:
+            delay += self.token_latency * count_tokens(prompt)
+        if self.output_token_latency:
+            delay += self.output_token_latency * count_tokens(answer)
+        return delay
+
+    def invoke(self, prompt, config=None, max_tokens: int | None = None, **kwargs) -> AIMessage:
+        answer = self._answer(max_tokens)
+        delay = self._delay(prompt, answer)
+        if delay:
+            time.sleep(delay)
+        return self._message(answer)
+
+    async def ainvoke(self, prompt, config=None, max_tokens: int | None = None, **kwargs) -> AIMessage:
+        answer = self._answer(max_tokens)
+        delay = self._delay(prompt, answer)
+        if self.faults:
+            await self.faults.apply()
+        if delay and self.blocking:
+            time.sleep(delay)
+        elif delay:
+            await asyncio.sleep(delay)
+        return self._message(answer)
+
+
+class StubEmbeddings(Embeddings):
+    """Embeddings deterministas con latencia simulada por llamada al proveedor"""
+
+    def __init__(self, size: int = 1536, latency: float = 0.0):
+        self._fake = DeterministicFakeEmbedding(size=size)
+        self.latency = latency
+        self.calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._fake.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._fake.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,133 @@
+"""Throughput de /chat según la cantidad de workers.
+
+Levanta un servidor con ``--workers N`` que sirve el grafo real con búsqueda
+híbrida (BM25 sobre un corpus sintético) y un LLM simulado, y lo carga con
+``--concurrency`` peticiones simultáneas. El trabajo por petición que no es
+espera (ruteo, BM25, empaquetado, prompts, serialización) ocupa CPU, así que
+el throughput escala con los workers hasta la cantidad de núcleos.
+
+Uso:
+    python -m benchmarks.workers --workers 1 2 4 --requests 400
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+
+from benchmarks.graph_setup import initial_state
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.graph.agent import create_agent_graph, session_config
+from src.retrieval.bm25 import BM25Builder, BM25Index
+from src.retrieval.hybrid import HybridRetriever
+
+TOPICS = ["pensión garantizada universal", "aporte del empleador", "seguro social", "retiro programado", "renta vitalicia", "bono por años cotizados"]
+
+
+def build_corpus(path: Path, chunks: int) -> None:
+    builder = BM25Builder()
+    for i in range(chunks):
+        topic = TOPICS[i % len(TOPICS)]
+        text = f"La reforma previsional modifica la {topic} en el artículo {i}. " * 8
+        builder.add(text, {"chunk_id": f"c-{i}", "title": f"Artículo {i}", "url_source": f"https://previsionsocial.gob.cl/a-{i}"})
+    builder.write(path)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    retriever = HybridRetriever(
+        vector_retriever=StubRetriever(documents=make_documents()),
+        bm25=BM25Index.load(os.environ["BENCH_BM25_PATH"], mmap=True),
+        k=4,
+        fetch_k=10,
+    )
+    llm = StubChatModel(latency=float(os.getenv("BENCH_LLM_LATENCY", "0.05")))
+    app.state.agent = await create_agent_graph(retriever, llm)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post("/chat")
+async def chat(request: Request):
+    body = await request.json()
+    result = await request.app.state.agent.ainvoke(initial_state(body["user_message"]), config=session_config(None))
+    return {"response": result["messages"][-1].content}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.post("/chat", json={"user_message": "¿Qué es la pensión garantizada universal?"})
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+async def load(workers: int, args: argparse.Namespace, env: dict) -> float:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.workers:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_ready(client)
+            # Calentar todos los workers
+            await asyncio.gather(*(client.post("/chat", json={"user_message": TOPICS[i % len(TOPICS)]}) for i in range(workers * 8)))
+
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one(i: int) -> None:
+                async with semaphore:
+                    response = await client.post("/chat", json={"user_message": f"¿Cómo cambia la {TOPICS[i % len(TOPICS)]} con la reforma?"})
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.requests)))
+            return args.requests / (time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        build_corpus(Path(tmp), args.chunks)
+        env = {**os.environ, "BENCH_BM25_PATH": tmp, "BENCH_LLM_LATENCY": str(args.llm_latency), "LOG_LEVEL": "WARNING"}
+
+        results = [(workers, await load(workers, args, env)) for workers in args.workers]
+
+    base = results[0][1]
+    print(f"\n📊 {args.requests} peticiones, concurrencia {args.concurrency}, {args.chunks} chunks BM25, {os.cpu_count()} núcleos")
+    print(f"{'workers':<10}{'req/s':>10}{'escala':>10}")
+    for workers, throughput in results:
+        print(f"{workers:<10}{throughput:>10.1f}{throughput / base:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,155 @@
+"""Memoria write-behind: latencia de /chat y verificación de orden bajo concurrencia.
+
+1. Latencia: turnos contra el grafo, guardando el turno en línea (nodo
+   ``remember`` con ``asave_turn``) o encolándolo en ``HistoryWriter``.
+2. Verificación: cada sesión envía sus turnos uno tras otro, como un usuario,
+   con escrituras que fallan al azar (``--failure-rate``). Antes de cada turno
+   el historial leído debe contener todos los anteriores, y al cerrar (drenando
+   la cola) cada sesión debe tener exactamente sus turnos, en orden.
+3. Resumen lento: en modo ``summary`` cada turno dispara un resumen que tarda
+   ``--summary-latency`` segundos. La lectura del historial antes de cada
+   turno no debe esperar los resúmenes de otras sesiones.
+
+Sale con código 1 si la verificación encuentra turnos perdidos o desordenados,
+para poder usarlo como control antes de integrar un cambio.
+
+Uso:
+    python -m benchmarks.write_behind --sessions 50 --turns 8 --failure-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.graph_setup import initial_state
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.config.memory import ChatHistoryStore, HistorySummarizer, HistoryWriter, format_chat_history, get_memory
+from src.config.redis_setup import InMemoryRedis
+from src.graph.agent import create_agent_graph, session_config
+
+
+class FlakyStore(ChatHistoryStore):
+    """Almacén cuyas escrituras en lote fallan al azar antes de llegar a Redis"""
+
+    def __init__(self, *args, failure_rate: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failure_rate = failure_rate
+        self.failures = 0
+
+    async def append_turns(self, turns):
+        if random.random() < self.failure_rate:
+            self.failures += 1
+            raise ConnectionError("conexión a Redis interrumpida")
+        await super().append_turns(turns)
+
+
+async def latency(agent, store: ChatHistoryStore, turns: int) -> float:
+    """Mediana de la latencia de un turno, de a una petición a la vez"""
+    samples = []
+    for i in range(turns + 1):
+        start = time.perf_counter()
+        await agent.ainvoke(initial_state("Hola"), config=session_config(get_memory(store, f"lat-{i}")))
+        samples.append(time.perf_counter() - start)
+    samples = sorted(samples[1:])  # el primero calienta el tokenizador y el grafo
+    return samples[len(samples) // 2]
+
+
+async def verify(agent, args: argparse.Namespace) -> tuple[int, int, dict]:
+    store = FlakyStore(InMemoryRedis(latency=args.redis_latency), failure_rate=args.failure_rate)
+    store.writer = HistoryWriter(store, max_pending=args.sessions, retry_delay=0.001, max_retries=20)
+    store.writer.start()
+    stale_reads = 0
+
+    async def user(session: int) -> None:
+        nonlocal stale_reads
+        memory = get_memory(store, f"s-{session}")
+        for turn in range(args.turns):
+            # Leer el historial como lo hace el grafo: debe incluir los turnos anteriores
+            history = await memory.aload_history()
+            if len(history.messages) != 2 * turn:
+                stale_reads += 1
+            state = initial_state(f"s{session} t{turn}")
+            state["chat_history"] = format_chat_history(history)
+            await agent.ainvoke(state, config=session_config(memory))
+            await asyncio.sleep(random.random() * 0.002)
+
+    await asyncio.gather(*(user(i) for i in range(args.sessions)))
+    await store.writer.close()
+
+    errors = 0
+    for session in range(args.sessions):
+        history = await store.load(f"s-{session}")
+        questions = [message.content for message in history.messages if isinstance(message, HumanMessage)]
+        if questions != [f"s{session} t{turn}" for turn in range(args.turns)]:
+            errors += 1
+    return errors, stale_reads, {**store.writer.metrics, "failures": store.failures}
+
+
+async def history_reads(args: argparse.Namespace, summarizer: HistorySummarizer | None) -> float:
+    """p99 de la lectura del historial (incluida la espera de escrituras) con sesiones concurrentes"""
+    store = ChatHistoryStore(InMemoryRedis(latency=args.redis_latency), summarizer=summarizer)
+    store.writer = HistoryWriter(store)
+    store.writer.start()
+    samples = []
+
+    async def user(session: int) -> None:
+        memory = get_memory(store, f"r-{session}")
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            await memory.aload_history()
+            samples.append(time.perf_counter() - start)
+            await asyncio.sleep(args.llm_latency)
+            await memory.arecord_turn(f"r{session} t{turn}", "Respuesta de prueba.")
+
+    await asyncio.gather(*(user(i) for i in range(args.sessions)))
+    await store.writer.close()
+    samples.sort()
+    return samples[int(len(samples) * 0.99)]
+
+
+async def main(args: argparse.Namespace) -> bool:
+    random.seed(args.seed)
+    agent = await create_agent_graph(StubRetriever(documents=make_documents()), StubChatModel(latency=args.llm_latency))
+
+    inline = ChatHistoryStore(InMemoryRedis(latency=args.redis_latency))
+    behind = ChatHistoryStore(InMemoryRedis(latency=args.redis_latency))
+    behind.writer = HistoryWriter(behind)
+    behind.writer.start()
+    results = [("en línea", await latency(agent, inline, args.turns * 5)), ("write-behind", await latency(agent, behind, args.turns * 5))]
+    await behind.writer.close()
+
+    print(f"\n📊 Redis {args.redis_latency * 1000:.0f} ms por viaje, LLM {args.llm_latency * 1000:.0f} ms")
+    print(f"{'remember':<14}{'p50 (ms)':>10}")
+    for label, p50 in results:
+        print(f"{label:<14}{p50 * 1000:>10.1f}")
+
+    errors, stale_reads, metrics = await verify(agent, args)
+    print(f"\n🔎 {args.sessions} sesiones x {args.turns} turnos, {args.failure_rate:.0%} de escrituras fallidas")
+    print(f"  - Escrituras: {metrics}")
+    print(f"  - Lecturas sin los turnos anteriores: {stale_reads}")
+    print(f"  - Sesiones con turnos perdidos o desordenados: {errors}")
+    ok = not errors and not stale_reads and not metrics["dropped"]
+    print("✅ Sin pérdidas ni reordenamientos" if ok else "❌ Verificación fallida")
+
+    # Resumen tras cada turno, más lento que el turno completo
+    summarizer = HistorySummarizer(StubChatModel(answer="Resumen.", latency=args.summary_latency), max_turns=1)
+    buffer_p99, summary_p99 = await history_reads(args, None), await history_reads(args, summarizer)
+    print(f"\n📊 Lectura del historial p99, {args.sessions} sesiones con resúmenes de {args.summary_latency * 1000:.0f} ms")
+    print(f"  - Sin resumen:  {buffer_p99 * 1000:.1f} ms")
+    print(f"  - Con resumen:  {summary_p99 * 1000:.1f} ms")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--redis-latency", type=float, default=0.01)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--summary-latency", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
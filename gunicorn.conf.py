@@ -0,0 +1,20 @@
+"""Configuración de gunicorn para el modo multi-worker (Docker y ``make run-workers``)"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+
+# Un worker por núcleo; con más de uno, Redis es obligatorio (ver REDIS_REQUIRED).
+# Cada worker tiene su propio caché semántico (se invalida en todos por Redis),
+# su coalescencia de peticiones y sus métricas en /metrics y /cache/stats
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Importar la aplicación una sola vez en el proceso maestro: los workers
+# heredan el código ya cargado por copy-on-write. Los clientes, pools e
+# índices se crean en el lifespan de cada worker, después del fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+# Un worker que no responde al heartbeat en este tiempo se reinicia
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
@@ -0,0 +1,99 @@
+import os
+import logging
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+from src.cache.embedding_cache import normalize_text
+from src.cache.semantic_cache import DEFAULT_PROFILE_FIELDS, response_partition
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def query_key(text: str) -> str:
+    """Clave de coalescencia de una pregunta: Unicode NFC, espacios y mayúsculas normalizados"""
+    return normalize_text(text).lower()
+
+class SingleFlight:
+    """Comparte una sola ejecución entre llamadas concurrentes con la misma clave.
+
+    La primera llamada ejecuta la operación; las que llegan mientras sigue en
+    curso esperan el mismo resultado (o la misma excepción). Si una petición
+    se cancela, la operación compartida continúa para las demás.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.metrics = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def do(self, key: str, operation: Callable[[], Awaitable[T]]) -> T:
+        self.metrics["calls"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.metrics["coalesced"] += 1
+        else:
+            self.metrics["executions"] += 1
+            task = asyncio.ensure_future(operation())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Marcar la excepción como leída si todas las peticiones se cancelaron
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {**self.metrics, "in_flight": len(self._inflight)}
+
+class RequestCoalescer:
+    """Coalescencia de la búsqueda y, opcionalmente, de respuestas independientes del perfil.
+
+    Las respuestas solo se comparten entre sesiones sin historial y con la
+    misma partición que usa el caché semántico (contexto, agente y campos de
+    perfil que cambian la respuesta).
+    """
+
+    def __init__(
+        self,
+        coalesce_responses: bool = False,
+        profile_fields: tuple[str, ...] = DEFAULT_PROFILE_FIELDS,
+        age_bucket: int = 10
+    ):
+        self.retrieval = SingleFlight()
+        self.responses = SingleFlight() if coalesce_responses else None
+        self.profile_fields = profile_fields
+        self.age_bucket = age_bucket
+
+    def response_key(self, state: dict) -> str | None:
+        """Clave de la respuesta; ``None`` si depende de la sesión y no debe compartirse"""
+        if self.responses is None:
+            return None
+        partition = response_partition(state, self.profile_fields, self.age_bucket)
+        if partition is None:
+            return None
+        return f"{partition}:{query_key(state['messages'][-1].content)}"
+
+    def stats(self) -> dict:
+        return {
+            "retrieval": self.retrieval.stats(),
+            "responses": self.responses.stats() if self.responses else {"enabled": False}
+        }
+
+def setup_request_coalescer() -> RequestCoalescer | None:
+    """Crea la coalescencia de peticiones si ``REQUEST_COALESCING`` está activo"""
+    if os.getenv("REQUEST_COALESCING", "true").lower() not in ("1", "true", "yes"):
+        return None
+
+    profile_fields = tuple(
+        name.strip()
+        for name in os.getenv("RESPONSE_COALESCING_PROFILE_FIELDS", ",".join(DEFAULT_PROFILE_FIELDS)).split(",")
+        if name.strip()
+    )
+    coalescer = RequestCoalescer(
+        coalesce_responses=os.getenv("RESPONSE_COALESCING", "false").lower() in ("1", "true", "yes"),
+        profile_fields=profile_fields
+    )
+    logger.info("Coalescencia de peticiones activada (respuestas: %s)", "sí" if coalescer.responses else "no")
+    return coalescer
@@ -0,0 +1,273 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Protocol
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Normaliza el texto para la clave del caché (Unicode NFC y espacios)"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+class EmbeddingStore(Protocol):
+    """Almacén persistente de vectores indexado por clave"""
+
+    def get_many(self, keys: list[str]) -> list[bytes | None]: ...
+
+    def set_many(self, items: dict[str, bytes]) -> None: ...
+
+class SQLiteEmbeddingStore:
+    """Almacén persistente en un archivo SQLite local"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> list[bytes | None]:
+        found: dict[str, bytes] = {}
+        with self._lock:
+            # SQLite limita la cantidad de parámetros por consulta
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def set_many(self, items: dict[str, bytes]) -> None:
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", items.items())
+            self._conn.commit()
+
+class RedisEmbeddingStore:
+    """Almacén persistente en Redis, compartido entre procesos.
+
+    Si Redis no responde (``timeout`` segundos como máximo), la lectura cuenta
+    como fallo del caché y la escritura se omite: los embeddings se piden al
+    proveedor en vez de fallar la búsqueda.
+    """
+
+    def __init__(self, url: str, ttl: int | None = None, key_prefix: str = "emb:", timeout: float = 0.5):
+        import redis
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._ttl = ttl
+        self._prefix = key_prefix
+        self._available = True
+        self.errors = 0
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        # Un aviso por caída, no uno por consulta
+        if self._available:
+            logger.warning("Caché de embeddings en Redis no disponible (%s): %s", operation, error)
+        self._available = False
+
+    def _recovered(self) -> None:
+        if not self._available:
+            logger.info("Caché de embeddings en Redis disponible de nuevo")
+        self._available = True
+
+    def get_many(self, keys: list[str]) -> list[bytes | None]:
+        try:
+            values = self._client.mget([f"{self._prefix}{key}" for key in keys])
+        except self._errors as e:
+            self._failed("lectura", e)
+            return [None] * len(keys)
+        self._recovered()
+        return values
+
+    def set_many(self, items: dict[str, bytes]) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(f"{self._prefix}{key}", value, ex=self._ttl)
+        try:
+            pipe.execute()
+        except self._errors as e:
+            self._failed("escritura", e)
+            return
+        self._recovered()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings con caché LRU en memoria delante de un almacén persistente.
+
+    La clave es el hash del modelo más el texto normalizado. ``embed_documents``
+    resuelve todos los textos en lote y solo envía al proveedor los que no
+    están en ningún nivel del caché, en una única llamada.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        store: EmbeddingStore | None = None,
+        max_items: int = 10000
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = store
+        self.max_items = max_items
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {
+            "memory_hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "provider_calls": 0,
+            "saved_provider_calls": 0
+        }
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _from_memory(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        return found
+
+    def _remember(self, vectors: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _from_store(self, keys: list[str]) -> dict[str, list[float]]:
+        if not self.store or not keys:
+            return {}
+        found = {
+            key: np.frombuffer(raw, dtype=np.float32).tolist()
+            for key, raw in zip(keys, self.store.get_many(keys))
+            if raw is not None
+        }
+        self._remember(found)
+        return found
+
+    def _to_store(self, vectors: dict[str, list[float]]) -> None:
+        if self.store and vectors:
+            self.store.set_many({key: np.asarray(vector, dtype=np.float32).tobytes() for key, vector in vectors.items()})
+
+    def _plan(self, texts: list[str]) -> tuple[list[str], dict[str, list[float]], list[str]]:
+        """Separa los textos entre aciertos de memoria y claves pendientes"""
+        keys = [self.key(text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        found = self._from_memory(unique)
+        self.metrics["memory_hits"] += len(found)
+        return keys, found, [key for key in unique if key not in found]
+
+    def _finish(self, keys: list[str], found: dict[str, list[float]], provider_used: bool) -> list[list[float]]:
+        if not provider_used:
+            self.metrics["saved_provider_calls"] += 1
+        return [found[key] for key in keys]
+
+    def _pending_texts(self, texts: list[str], keys: list[str], pending: list[str]) -> list[str]:
+        first_text = {}
+        for text, key in zip(texts, keys):
+            first_text.setdefault(key, text)
+        return [first_text[key] for key in pending]
+
+    def _resolve(self, texts: list[str], embed: Callable[[list[str]], list[list[float]]]) -> list[list[float]]:
+        keys, found, pending = self._plan(texts)
+        stored = self._from_store(pending)
+        self.metrics["store_hits"] += len(stored)
+        found.update(stored)
+        pending = [key for key in pending if key not in stored]
+
+        if pending:
+            self.metrics["misses"] += len(pending)
+            self.metrics["provider_calls"] += 1
+            fresh = dict(zip(pending, embed(self._pending_texts(texts, keys, pending))))
+            self._remember(fresh)
+            self._to_store(fresh)
+            found.update(fresh)
+        return self._finish(keys, found, bool(pending))
+
+    async def _aresolve(self, texts: list[str], embed) -> list[list[float]]:
+        keys, found, pending = self._plan(texts)
+        stored = await asyncio.to_thread(self._from_store, pending) if pending and self.store else {}
+        self.metrics["store_hits"] += len(stored)
+        found.update(stored)
+        pending = [key for key in pending if key not in stored]
+
+        if pending:
+            self.metrics["misses"] += len(pending)
+            self.metrics["provider_calls"] += 1
+            fresh = dict(zip(pending, await embed(self._pending_texts(texts, keys, pending))))
+            self._remember(fresh)
+            if self.store:
+                await asyncio.to_thread(self._to_store, fresh)
+            found.update(fresh)
+        return self._finish(keys, found, bool(pending))
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._resolve(texts, self.underlying.embed_documents)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._resolve([text], lambda pending: [self.underlying.embed_query(pending[0])])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self._aresolve(texts, self.underlying.aembed_documents)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        async def embed(pending: list[str]) -> list[list[float]]:
+            return [await self.underlying.aembed_query(pending[0])]
+        return (await self._aresolve([text], embed))[0]
+
+    def stats(self) -> dict:
+        hits = self.metrics["memory_hits"] + self.metrics["store_hits"]
+        lookups = hits + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "store_errors": getattr(self.store, "errors", 0),
+            "memory_items": len(self._memory),
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+def setup_embedding_cache(embeddings: Embeddings, model_name: str) -> Embeddings:
+    """Envuelve el modelo de embeddings con el caché según ``EMBEDDING_CACHE_BACKEND``.
+
+    Valores: ``sqlite`` (por defecto), ``redis``, ``memory`` o ``none``.
+    """
+    backend = os.getenv("EMBEDDING_CACHE_BACKEND", "sqlite").lower()
+    if backend == "none":
+        return embeddings
+
+    store = None
+    if backend == "sqlite":
+        store = SQLiteEmbeddingStore(os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite"))
+    elif backend == "redis":
+        ttl = os.getenv("EMBEDDING_CACHE_TTL")
+        store = RedisEmbeddingStore(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            ttl=int(ttl) if ttl else None,
+            timeout=float(os.getenv("EMBEDDING_CACHE_REDIS_TIMEOUT", "0.5"))
+        )
+
+    logger.info("Caché de embeddings activado (%s)", backend)
+    return CachedEmbeddings(
+        embeddings,
+        model_name=model_name,
+        store=store,
+        max_items=int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "10000"))
+    )
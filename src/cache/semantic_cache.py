@@ -0,0 +1,244 @@
+import os
+import logging
+import time
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Campos del perfil que cambian la respuesta y por lo tanto separan el caché
+DEFAULT_PROFILE_FIELDS = ("genero", "edad", "nivelEstudios")
+
+def bucket_profile(user_data: dict, profile_fields: tuple[str, ...], age_bucket: int = 10) -> dict:
+    """Campos del perfil que cambian la respuesta"""
+    profile = {}
+    for name in profile_fields:
+        value = user_data.get(name)
+        # Agrupar la edad por tramos para no fragmentar el caché por año
+        if name == "edad" and isinstance(value, dict) and age_bucket:
+            value = int(value.get("anos") or 0) // age_bucket
+        profile[name] = value
+    return profile
+
+def response_partition(
+    state: dict,
+    profile_fields: tuple[str, ...] = DEFAULT_PROFILE_FIELDS,
+    age_bucket: int = 10,
+    with_history: bool = False
+) -> str | None:
+    """Partición de respuestas equivalentes; ``None`` si la respuesta depende del historial"""
+    chat_history = state.get("chat_history")
+    if chat_history and not with_history:
+        return None
+
+    policy = {
+        "route": "retrieve" if state.get("context") else "respond",
+        "context": hashlib.sha256((state.get("context") or "").encode("utf-8")).hexdigest(),
+        "agent_name": state.get("agent_name"),
+        "profile": bucket_profile(state.get("user_data") or {}, profile_fields, age_bucket),
+        "history": hashlib.sha256(str(chat_history or "").encode("utf-8")).hexdigest()
+    }
+    return hashlib.sha256(json.dumps(policy, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class CacheGeneration:
+    """Generación del caché compartida en Redis, para invalidar todos los workers.
+
+    ``bump`` la incrementa; cada worker la compara con la suya a lo más cada
+    ``interval`` segundos y, si cambió, vacía su caché local.
+    """
+
+    def __init__(self, client, key: str = "cache:semantic:generation", interval: float = 1.0):
+        self.client = client
+        self.key = key
+        self.interval = interval
+        self._seen = None
+        self._checked_at = 0.0
+
+    async def bump(self) -> None:
+        self._seen = await self.client.incr(self.key)
+        self._checked_at = time.monotonic()
+
+    async def changed(self) -> bool:
+        """``True`` si otro worker invalidó el caché desde la última revisión"""
+        now = time.monotonic()
+        if now - self._checked_at < self.interval:
+            return False
+        self._checked_at = now
+        try:
+            current = int(await self.client.get(self.key) or 0)
+        except (RedisError, OSError) as e:
+            logger.debug("No se pudo leer la generación del caché: %s", e)
+            return False
+        changed = self._seen is not None and current != self._seen
+        self._seen = current
+        return changed
+
+@dataclass
+class CacheQuery:
+    """Consulta preparada: partición de la política y embedding normalizado de la pregunta"""
+    partition: str
+    vector: np.ndarray
+
+@dataclass
+class CacheEntry:
+    vector: np.ndarray
+    answer: str
+    partition: str
+    created_at: float = field(default_factory=time.monotonic)
+
+class SemanticResponseCache:
+    """Caché de respuestas por similitud semántica de la pregunta.
+
+    Una respuesta se reutiliza solo si la nueva pregunta cae en la misma
+    partición (ruta, contexto recuperado, agente, perfil del usuario e
+    historial) y su embedding supera ``threshold`` de similitud coseno con una
+    pregunta anterior. Las entradas expiran tras ``ttl`` segundos y se
+    descartan por LRU al superar ``max_entries``.
+
+    Cada worker tiene su propio caché; con ``generation`` una invalidación
+    llega a todos ellos.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = 0.95,
+        ttl: int = 3600,
+        max_entries: int = 1000,
+        profile_fields: tuple[str, ...] = DEFAULT_PROFILE_FIELDS,
+        cache_with_history: bool = False,
+        age_bucket: int = 10,
+        generation: CacheGeneration | None = None
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.profile_fields = profile_fields
+        self.cache_with_history = cache_with_history
+        self.age_bucket = age_bucket
+        self.generation = generation
+        self._entries: OrderedDict[int, CacheEntry] = OrderedDict()
+        self._partitions: dict[str, list[int]] = {}
+        self._next_id = 0
+        self.metrics = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+    def partition_key(self, state: dict) -> str | None:
+        """Calcula la partición de la política; ``None`` si la respuesta no es cacheable"""
+        return response_partition(state, self.profile_fields, self.age_bucket, self.cache_with_history)
+
+    async def prepare(self, state: dict) -> CacheQuery | None:
+        """Prepara la consulta al caché con un único embedding de la pregunta"""
+        if self.generation and await self.generation.changed():
+            logger.info("Caché semántico invalidado por otro worker (%d entradas)", self.invalidate())
+        partition = self.partition_key(state)
+        if partition is None:
+            self.metrics["bypassed"] += 1
+            return None
+
+        vector = np.asarray(await self.embeddings.aembed_query(state["messages"][-1].content), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return CacheQuery(partition=partition, vector=vector / norm if norm else vector)
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        ids = self._partitions.get(entry.partition, [])
+        ids.remove(entry_id)
+        if not ids:
+            self._partitions.pop(entry.partition, None)
+
+    def get(self, query: CacheQuery) -> str | None:
+        """Retorna la respuesta más similar de la partición si supera el umbral"""
+        now = time.monotonic()
+        ids = list(self._partitions.get(query.partition, []))
+        for entry_id in ids:
+            if now - self._entries[entry_id].created_at > self.ttl:
+                self._remove(entry_id)
+                self.metrics["expirations"] += 1
+
+        ids = self._partitions.get(query.partition, [])
+        if ids:
+            matrix = np.stack([self._entries[entry_id].vector for entry_id in ids])
+            scores = matrix @ query.vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                entry_id = ids[best]
+                self._entries.move_to_end(entry_id)
+                self.metrics["hits"] += 1
+                return self._entries[entry_id].answer
+
+        self.metrics["misses"] += 1
+        return None
+
+    def put(self, query: CacheQuery, answer: str) -> None:
+        """Guarda una respuesta y aplica la política LRU"""
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = CacheEntry(vector=query.vector, answer=answer, partition=query.partition)
+        self._partitions.setdefault(query.partition, []).append(entry_id)
+        self.metrics["stores"] += 1
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.metrics["evictions"] += 1
+
+    def invalidate(self) -> int:
+        """Vacía el caché, por ejemplo tras re-ingestar la base de conocimiento"""
+        removed = len(self._entries)
+        self._entries.clear()
+        self._partitions.clear()
+        return removed
+
+    async def invalidate_all(self) -> tuple[int, bool]:
+        """Vacía este caché y, con ``generation``, el de los demás workers.
+
+        Retorna las entradas eliminadas en este worker y si la invalidación
+        llegó a los demás (``False`` sin Redis).
+        """
+        broadcast = False
+        if self.generation:
+            try:
+                await self.generation.bump()
+                broadcast = True
+            except (RedisError, OSError) as e:
+                logger.warning("No se pudo propagar la invalidación del caché, solo se vacía este worker: %s", e)
+        return self.invalidate(), broadcast
+
+    def stats(self) -> dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "entries": len(self._entries),
+            "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0
+        }
+
+def setup_semantic_cache(embeddings: Embeddings, client=None) -> SemanticResponseCache | None:
+    """Crea el caché semántico si ``SEMANTIC_CACHE_ENABLED`` está activo.
+
+    Con ``client`` (Redis) las invalidaciones se propagan a todos los workers,
+    que lo notan en a lo más ``SEMANTIC_CACHE_SYNC_INTERVAL`` segundos.
+    """
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+
+    profile_fields = tuple(
+        name.strip()
+        for name in os.getenv("SEMANTIC_CACHE_PROFILE_FIELDS", ",".join(DEFAULT_PROFILE_FIELDS)).split(",")
+        if name.strip()
+    )
+    cache = SemanticResponseCache(
+        embeddings,
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+        ttl=int(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000")),
+        profile_fields=profile_fields,
+        cache_with_history=os.getenv("SEMANTIC_CACHE_WITH_HISTORY", "false").lower() in ("1", "true", "yes"),
+        generation=CacheGeneration(client, interval=float(os.getenv("SEMANTIC_CACHE_SYNC_INTERVAL", "1"))) if client else None
+    )
+    logger.info("Caché semántico activado (umbral %s, TTL %ss, máx. %d)", cache.threshold, cache.ttl, cache.max_entries)
+    return cache
@@ -1,28 +1,69 @@
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from graph.agent import create_agent_graph, AgentState
+from src.graph.agent import create_agent_graph, session_config, AgentState
 from langchain_core.messages import HumanMessage, AIMessage
-from src.config.pinecone_setup import setup_pinecone
+from src.config.vectorstore_setup import setup_vectorstore, setup_retriever, close_retriever
+from src.config.llm_setup import setup_llm, setup_model_tiers
+from src.config.http_clients import close_http_clients
 import uuid
-from src.config.memory import get_memory
+import json
+import argparse
+from src.config.memory import get_memory, setup_memory_store, setup_summarizer, format_chat_history
+from src.graph.batch import BatchReport, parse_batch, run_batch, batch_settings
+from src.observability.logs import setup_logging, bind_request_context
 import os
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Asistente Previsional en la terminal")
+    parser.add_argument("--batch", help="archivo JSONL de preguntas a responder sin modo interactivo")
+    parser.add_argument("--output", help="archivo JSONL de resultados (por defecto <batch>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, help="ítems del lote en paralelo")
+    parser.add_argument("--rpm", type=float, help="máximo de peticiones por minuto al proveedor")
+    return parser.parse_args()
+
+async def answer_batch(graph, vectorstore, args: argparse.Namespace) -> None:
+    """Responde un lote JSONL y escribe los resultados a medida que terminan"""
+    with open(args.batch, encoding="utf-8") as f:
+        items = parse_batch(f)
+    settings = batch_settings()
+    if args.concurrency:
+        settings["concurrency"] = args.concurrency
+    if args.rpm:
+        settings["requests_per_minute"] = args.rpm
+    embeddings = vectorstore.embeddings
+    output = args.output or f"{os.path.splitext(args.batch)[0]}.results.jsonl"
+    report = BatchReport()
+
+    print(f"\n📋 Respondiendo {len(items)} preguntas (concurrencia {settings['concurrency']})...")
+    with open(output, "w", encoding="utf-8") as f:
+        async for result in run_batch(
+            graph,
+            items,
+            embeddings=embeddings,
+            report=report,
+            **settings
+        ):
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            f.flush()
+
+    summary = report.summary()
+    print(f"\n✅ Lote completado: {output}")
+    print(f"  - Ítems: {summary['items']} ({summary['errors']} con error, {summary['retries']} reintentos)")
+    print(f"  - Throughput: {summary['items_per_second']} ítems/s en {summary['elapsed_s']} s")
+    print(f"  - Latencia por ítem: p50 {summary['latency_ms']['p50']} ms, p95 {summary['latency_ms']['p95']} ms")
+
 async def main():
     # Cargar variables de entorno
     load_dotenv()
+    args = parse_args()
+    setup_logging()
     
     print("\n🔧 Inicializando sistema...")
     
-    # Configurar Pinecone y LLM
-    pinecone_index = setup_pinecone()
-    llm = ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL"),
-        temperature=0.2,
-        base_url=os.getenv("OPENAI_BASE_URL"),
-        api_key=os.getenv("OPENAI_API_KEY")
-        )
-    
-    print("Modelo LLM: ", llm.model_name)
+    # Configurar el vector store y LLM
+    vectorstore = setup_vectorstore()
+    # Mismo LLM que la API: comparte el pool HTTP con los embeddings
+    llm = setup_llm()
+    tiers = setup_model_tiers(llm)
     
     # Generar un session_id único
     session_id = str(uuid.uuid4())
@@ -30,16 +71,26 @@ async def main():
     
     # Configurar la memoria con Redis
     print("📦 Configurando memoria...")
-    memory = get_memory(session_id)
+    memory_store = await setup_memory_store(setup_summarizer(tiers.cheapest))
+    memory = get_memory(memory_store, session_id)
+    bind_request_context(session_id=session_id)
     
     # Inicializar el grafo
     print("🔄 Inicializando grafo de conversación...")
+    retriever = setup_retriever(vectorstore)
     graph = await create_agent_graph(
-        retriever=pinecone_index.as_retriever(),
+        retriever=retriever,
         llm=llm,
-        memory=memory
+        tiers=tiers
     )
     
+    if args.batch:
+        await answer_batch(graph, vectorstore, args)
+        await memory_store.close()
+        close_retriever(retriever)
+        await close_http_clients()
+        return
+    
     print("\n✨ ¡Bienvenido al Asistente Previsional! ✨")
     print("Escribe 'salir' para terminar")
     print("Escribe 'memoria' para ver el historial de la conversación\n")
@@ -53,7 +104,7 @@ async def main():
             
         if pregunta.lower() == 'memoria':
             print("\n💭 Historial de conversación:")
-            print(memory.load_memory_variables({})["chat_history"])
+            print(format_chat_history(await memory.aload_history()))
             continue
             
         try:
@@ -62,14 +113,14 @@ async def main():
             initial_state: AgentState = {
                 "messages": [HumanMessage(content=pregunta)],
                 "context": None,
-                "chat_history": memory.load_memory_variables({}).get("chat_history", ""),
+                "chat_history": format_chat_history(await memory.aload_history()),
                 "next_step": None,
                 "time_info": None,
                 "sources": None,
                 "agent_name": "Alexandra"  # Nombre por defecto para el CLI
             }
             
-            async for output in graph.astream(initial_state):
+            async for output in graph.astream(initial_state, config=session_config(memory)):
                 for key, value in output.items():
                     if value["messages"] and isinstance(value["messages"][-1], AIMessage):
                         print(f"\n🤖 {value['messages'][-1].content}")
@@ -78,6 +129,11 @@ async def main():
                 
         except Exception as e:
             print("\n❌ Error:", str(e))
+    
+    # Escribir los turnos pendientes antes de salir
+    await memory_store.close()
+    close_retriever(retriever)
+    await close_http_clients()
 
 if __name__ == "__main__":
     import asyncio
@@ -1,5 +1,11 @@
 import os
+import logging
+import re
 import json
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
 
 def setup_cors():
     """Configura y procesa los orígenes CORS permitidos"""
@@ -17,11 +23,10 @@ def setup_cors():
         else:
             CORS_ORIGINS = [origin.strip() for origin in cors_env.split(",") if origin.strip()]
             
-        print(f"📝 CORS_ORIGINS cargados: {CORS_ORIGINS}")
+        logger.info("CORS_ORIGINS cargados: %s", CORS_ORIGINS)
         
     except json.JSONDecodeError as e:
-        print(f"⚠️ Error parseando CORS_ORIGINS: {cors_env}")
-        print(f"⚠️ Error detallado: {str(e)}")
+        logger.warning("Error parseando CORS_ORIGINS: %s (%s)", cors_env, e)
         CORS_ORIGINS = [origin.strip() for origin in cors_env.split(",") if origin.strip()]
 
     if not CORS_ORIGINS:
@@ -41,8 +46,56 @@ def setup_cors():
         else:
             processed_origins.append(origin)
 
-    print(f"🔒 Orígenes CORS permitidos: {processed_origins}")
+    logger.info("Orígenes CORS permitidos: %s", processed_origins)
     if allow_origin_regex:
-        print(f"🔒 Patrón de subdominio permitido: {allow_origin_regex}")
+        logger.info("Patrón de subdominio permitido: %s", allow_origin_regex)
+
+    return processed_origins, allow_origin_regex 
+
+# Hosts siempre permitidos para desarrollo local
+LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1"})
+
+@dataclass(frozen=True)
+class CORSPolicy:
+    """Política de orígenes y hosts calculada una sola vez al iniciar.
+
+    La comparten el middleware de CORS y el de validación de host; las
+    consultas por petición son búsquedas en conjuntos y un regex compilado
+    para los comodines ``*.dominio``.
+    """
+    allow_all: bool
+    origins: frozenset[str]
+    hosts: frozenset[str]
+    origin_regex: re.Pattern | None = None
+    host_regex: re.Pattern | None = None
+
+    @classmethod
+    def from_origins(cls, processed_origins: list[str], allow_origin_regex: str | None = None) -> "CORSPolicy":
+        if "*" in processed_origins:
+            return cls(allow_all=True, origins=frozenset(), hosts=frozenset())
+        hosts = {urlsplit(origin).hostname or origin for origin in processed_origins}
+        host_regex = None
+        if allow_origin_regex:
+            # El host de los subdominios permitidos, sin el esquema del patrón de orígenes
+            host_regex = re.compile(allow_origin_regex.split("://", 1)[-1])
+        return cls(
+            allow_all=False,
+            origins=frozenset(processed_origins),
+            hosts=frozenset(hosts),
+            origin_regex=re.compile(allow_origin_regex) if allow_origin_regex else None,
+            host_regex=host_regex
+        )
+
+    def allows_origin(self, origin: str) -> bool:
+        if self.allow_all or origin in self.origins:
+            return True
+        return bool(self.origin_regex and self.origin_regex.fullmatch(origin))
+
+    def allows_host(self, host: str) -> bool:
+        if self.allow_all or host in self.hosts or host in LOCAL_HOSTS:
+            return True
+        return bool(self.host_regex and self.host_regex.fullmatch(host))
 
-    return processed_origins, allow_origin_regex 
\ No newline at end of file
+def load_cors_policy() -> CORSPolicy:
+    """Lee ``CORS_ORIGINS`` y construye la política compartida por los middlewares"""
+    return CORSPolicy.from_origins(*setup_cors())
@@ -1,25 +1,34 @@
 import os
-from langchain_openai import OpenAIEmbeddings
-from dotenv import load_dotenv
+import logging
+from src.cache.embedding_cache import setup_embedding_cache
+from src.config.http_clients import setup_http_clients
 
-# Forzar recarga del .env
-load_dotenv(override=True)
+logger = logging.getLogger(__name__)
 
 def setup_embeddings():
     """Configura y retorna el modelo de embeddings"""
+    # Importación diferida, igual que en setup_llm
+    from langchain_openai import OpenAIEmbeddings
+
     try:
-        print("🔄 Configurando modelo de embeddings...")
+        logger.info("Configurando modelo de embeddings")
         
-        # Configurar embeddings
+        # Configurar embeddings con el mismo pool HTTP que el LLM
+        http = setup_http_clients()
         embeddings = OpenAIEmbeddings(
             model=os.getenv("OPENAI_EMBEDDING_MODEL"),
             base_url=os.getenv("OPENAI_EMBEDDING_BASE_URL"),
-            api_key=os.getenv("OPENAI_EMBEDDING_API_KEY")
+            api_key=os.getenv("OPENAI_EMBEDDING_API_KEY"),
+            http_client=http.sync,
+            http_async_client=http.async_client,
+            timeout=http.timeout
         )
         
-        print(f"✅ Modelo de embeddings configurado: {embeddings.model}")
-        return embeddings
+        logger.info("Modelo de embeddings configurado: %s", embeddings.model)
+        
+        # Evitar re-embeber textos ya vistos (consultas repetidas, re-ingestas)
+        return setup_embedding_cache(embeddings, model_name=embeddings.model)
         
     except Exception as e:
-        print(f"❌ Error configurando embeddings: {str(e)}")
+        logger.error("Error configurando embeddings: %s", e)
         raise 
\ No newline at end of file
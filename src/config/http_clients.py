@@ -0,0 +1,115 @@
+import os
+import logging
+from functools import lru_cache
+import httpx
+from src.observability.metrics import HTTP_REQUESTS, HTTP_CONNECTIONS, HTTP_TLS_HANDSHAKES
+
+logger = logging.getLogger(__name__)
+
+def _connection_trace(client: str, host: str):
+    """Callback de ``httpcore`` que cuenta conexiones y handshakes nuevos"""
+    def trace(event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            HTTP_CONNECTIONS.inc(1, client, host)
+        elif event_name == "connection.start_tls.complete":
+            HTTP_TLS_HANDSHAKES.inc(1, client, host)
+    return trace
+
+def _on_request(request: httpx.Request) -> None:
+    HTTP_REQUESTS.inc(1, "sync", request.url.host)
+    request.extensions["trace"] = _connection_trace("sync", request.url.host)
+
+async def _aon_request(request: httpx.Request) -> None:
+    HTTP_REQUESTS.inc(1, "async", request.url.host)
+    trace = _connection_trace("async", request.url.host)
+
+    # El transporte asíncrono espera una corrutina
+    async def atrace(event_name: str, info: dict) -> None:
+        trace(event_name, info)
+
+    request.extensions["trace"] = atrace
+
+class ProviderHTTPClients:
+    """Clientes HTTP (síncrono y asíncrono) compartidos por los SDK de los proveedores.
+
+    El LLM y los embeddings usan el mismo pool de conexiones con límites y
+    timeouts explícitos, así que una petición a un host ya visitado reutiliza
+    una conexión abierta (sin TCP ni TLS) en vez de abrir una por cliente.
+    Las peticiones, conexiones nuevas y handshakes TLS se exportan en ``/metrics``.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        timeout: float = 60.0,
+        http2: bool = False
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.http2 = http2
+        self.sync = httpx.Client(
+            limits=self.limits, timeout=self.timeout, http2=http2, event_hooks={"request": [_on_request]}
+        )
+        self.async_client = httpx.AsyncClient(
+            limits=self.limits, timeout=self.timeout, http2=http2, event_hooks={"request": [_aon_request]}
+        )
+
+    def stats(self) -> dict:
+        """Peticiones, conexiones nuevas y tasa de reutilización por cliente"""
+        stats = {}
+        for client in ("sync", "async"):
+            requests = sum(v for (c, _), v in HTTP_REQUESTS._values.items() if c == client)
+            connections = sum(v for (c, _), v in HTTP_CONNECTIONS._values.items() if c == client)
+            stats[client] = {
+                "requests": int(requests),
+                "connections": int(connections),
+                "reuse_ratio": round(1 - connections / requests, 3) if requests else None
+            }
+        return stats
+
+    async def aclose(self) -> None:
+        await self.async_client.aclose()
+        self.sync.close()
+
+def _http2_enabled() -> bool:
+    if os.getenv("HTTP2", "false").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP2 activo pero el paquete h2 no está instalado (pip install 'agente-pension[http2]'), usando HTTP/1.1")
+        return False
+    return True
+
+@lru_cache(maxsize=1)
+def setup_http_clients() -> ProviderHTTPClients:
+    """Crea (una vez por proceso) los clientes HTTP compartidos por los proveedores.
+
+    Límites con ``HTTP_MAX_CONNECTIONS``, ``HTTP_MAX_KEEPALIVE_CONNECTIONS`` y
+    ``HTTP_KEEPALIVE_EXPIRY``; timeouts con ``HTTP_CONNECT_TIMEOUT`` y
+    ``HTTP_TIMEOUT``; ``HTTP2`` multiplexa las peticiones en menos conexiones.
+    """
+    clients = ProviderHTTPClients(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+        connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        timeout=float(os.getenv("HTTP_TIMEOUT", "60")),
+        http2=_http2_enabled()
+    )
+    logger.info("Pool HTTP de proveedores: %d conexiones, %d en reposo%s", clients.limits.max_connections,
+                clients.limits.max_keepalive_connections, " (HTTP/2)" if clients.http2 else "")
+    return clients
+
+async def close_http_clients() -> None:
+    """Cierra los clientes compartidos si se llegaron a crear"""
+    if setup_http_clients.cache_info().currsize:
+        await setup_http_clients().aclose()
+        setup_http_clients.cache_clear()
@@ -1,26 +1,53 @@
 import os
-from langchain_openai import ChatOpenAI
-from dotenv import load_dotenv
+import logging
+from src.config.http_clients import setup_http_clients
+from src.graph.tiers import TierRouter
 
-# Forzar recarga del .env
-load_dotenv(override=True)
+logger = logging.getLogger(__name__)
+
+def setup_llm(model: str | None = None):
+    """Configura y retorna el modelo de lenguaje (``OPENAI_MODEL`` por defecto)"""
+    # Importación diferida: el SDK de OpenAI tarda en cargarse y no se necesita al importar la API
+    from langchain_openai import ChatOpenAI
 
-def setup_llm():
-    """Configura y retorna el modelo de lenguaje"""
     try:
-        print("🔄 Configurando modelo de lenguaje...")
+        logger.info("Configurando modelo de lenguaje")
         
-        # Configurar LLM
+        # Configurar LLM con el pool HTTP compartido
+        http = setup_http_clients()
         llm = ChatOpenAI(
-            model=os.getenv("OPENAI_MODEL"),
+            model=model or os.getenv("OPENAI_MODEL"),
             temperature=0.2,
             base_url=os.getenv("OPENAI_BASE_URL"),
-            api_key=os.getenv("OPENAI_API_KEY")
+            api_key=os.getenv("OPENAI_API_KEY"),
+            # Reportar el uso de tokens (incluido el prefijo en caché) también al transmitir
+            stream_usage=True,
+            http_client=http.sync,
+            http_async_client=http.async_client,
+            timeout=http.timeout
         )
         
-        print(f"✅ Modelo LLM configurado: {llm.model_name}")
+        logger.info("Modelo LLM configurado: %s", llm.model_name)
         return llm
         
     except Exception as e:
-        print(f"❌ Error configurando LLM: {str(e)}")
-        raise 
\ No newline at end of file
+        logger.error("Error configurando LLM: %s", e)
+        raise
+
+def setup_model_tiers(llm) -> TierRouter:
+    """Configura los niveles de modelo a partir del LLM principal.
+
+    Con ``OPENAI_MODEL_LIGHT`` las respuestas sin contexto (y, según
+    ``LLM_LIGHT_MAX_CONTEXT_TOKENS``, las de poco contexto) usan ese modelo
+    mientras el historial no supere ``LLM_LIGHT_MAX_HISTORY_TOKENS``.
+    """
+    light_model = os.getenv("OPENAI_MODEL_LIGHT")
+    router = TierRouter(
+        full=llm,
+        light=setup_llm(light_model) if light_model else None,
+        light_max_history_tokens=int(os.getenv("LLM_LIGHT_MAX_HISTORY_TOKENS", "400")),
+        light_max_context_tokens=int(os.getenv("LLM_LIGHT_MAX_CONTEXT_TOKENS", "0"))
+    )
+    if router.light:
+        logger.info("Niveles de modelo: light=%s, full=%s", light_model, llm.model_name)
+    return router
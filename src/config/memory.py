@@ -1,51 +1,420 @@
 import os
-from langchain.memory import ConversationBufferMemory
-from langchain_community.chat_message_histories import RedisChatMessageHistory
-from dotenv import load_dotenv
-import redis
-
-# Cargar variables de entorno
-load_dotenv()
-
-def get_memory(session_id: str) -> ConversationBufferMemory:
-    try:
-        # Obtén la URL de conexión desde la variable de entorno
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-        
-        print(f"🔌 Conectando a Redis: {redis_url}")
-        
-        # Verificar conexión a Redis
-        redis_client = redis.from_url(redis_url)
-        redis_client.ping()  # Esto lanzará una excepción si no puede conectar
-        
-        # Crea una instancia de RedisChatMessageHistory con el ID de sesión
-        chat_history = RedisChatMessageHistory(
-            session_id=session_id,
-            url=redis_url,
-            key_prefix="chat:",  # Opcional: prefijo para las claves
-            ttl=3600  # Opcional: tiempo de vida en segundos
-        )
-        
-        # Crea la memoria del agente utilizando el historial almacenado en Redis
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            chat_memory=chat_history,
-            return_messages=True
-        )
-        
-        print("✅ Conexión a Redis establecida")
-        return memory
-        
-    except redis.ConnectionError as e:
-        print(f"❌ Error de conexión a Redis: {e}")
-        print("⚠️ Usando memoria local como fallback")
-        
-        # Fallback a memoria local si Redis no está disponible
-        return ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
+import json
+import asyncio
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, messages_from_dict, message_to_dict
+from src.config.redis_setup import setup_redis
+from src.tools.tokens import count_tokens
+from src.observability.metrics import timed, MEMORY_DURATION, MEMORY_DROPPED_TURNS
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ConversationHistory:
+    """Historial de una sesión: resumen de los turnos antiguos y mensajes recientes"""
+    summary: str = ""
+    messages: list[BaseMessage] = field(default_factory=list)
+
+def format_chat_history(history: ConversationHistory) -> str:
+    """Convierte el historial en el texto que reciben los prompts"""
+    lines = []
+    if history.summary:
+        lines.append(f"Resumen de la conversación anterior: {history.summary}")
+    for message in history.messages:
+        role = "Usuario" if isinstance(message, HumanMessage) else "Asistente"
+        lines.append(f"{role}: {message.content}")
+    return "\n".join(lines) if lines else "No hay historial previo."
+
+class ChatHistoryStore:
+    """Historial de conversaciones sobre un cliente Redis asíncrono compartido.
+
+    Usa el mismo formato que ``RedisChatMessageHistory`` (lista con ``LPUSH`` de
+    mensajes serializados en JSON), por lo que las sesiones existentes siguen
+    siendo legibles. El resumen de los turnos antiguos se guarda en una clave
+    aparte (``<prefijo><sesión>:summary``).
+    """
+
+    def __init__(self, client, key_prefix: str = "chat:", ttl: int | None = 3600, summarizer=None):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.summarizer = summarizer
+        # Escritura en segundo plano (``HistoryWriter``); sin ella se guarda en línea
+        self.writer: "HistoryWriter | None" = None
+
+    def key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+
+    def summary_key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}:summary"
+
+    def lock_key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}:compacting"
+
+    @asynccontextmanager
+    async def compaction_lock(self, session_id: str, timeout: int = 60) -> AsyncIterator[bool]:
+        """Candado por sesión en Redis para que un solo proceso (o worker) la resuma a la vez.
+
+        Entrega ``False`` si otro lo tiene; vence tras ``timeout`` segundos por si
+        el dueño se cae sin liberarlo.
+        """
+        key = self.lock_key(session_id)
+        token = uuid.uuid4().hex
+        acquired = bool(await self.client.set(key, token, ex=timeout, nx=True))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                current = await self.client.get(key)
+                if current is not None and self._decode_summary(current) == token:
+                    await self.client.delete(key)
+
+    @staticmethod
+    def _decode(items: list) -> list[BaseMessage]:
+        # LPUSH deja el mensaje más reciente al inicio de la lista
+        return messages_from_dict([
+            json.loads(item.decode("utf-8") if isinstance(item, bytes) else item)
+            for item in reversed(items)
+        ])
+
+    @staticmethod
+    def _decode_summary(raw) -> str:
+        if raw is None:
+            return ""
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    async def load(self, session_id: str) -> ConversationHistory:
+        """Carga el resumen y los mensajes de la sesión en un viaje a Redis"""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self.summary_key(session_id))
+        pipe.lrange(self.key(session_id), 0, -1)
+        summary, items = await pipe.execute()
+        return ConversationHistory(summary=self._decode_summary(summary), messages=self._decode(items))
+
+    async def append_turn(self, session_id: str, user_input: str, output: str) -> ConversationHistory:
+        """Guarda un turno, renueva el TTL y retorna el historial en un solo viaje a Redis"""
+        key = self.key(session_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lpush(
+            key,
+            json.dumps(message_to_dict(HumanMessage(content=user_input))),
+            json.dumps(message_to_dict(AIMessage(content=output)))
         )
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+            pipe.expire(self.summary_key(session_id), self.ttl)
+        pipe.get(self.summary_key(session_id))
+        pipe.lrange(key, 0, -1)
+        results = await pipe.execute()
+        return ConversationHistory(summary=self._decode_summary(results[-2]), messages=self._decode(results[-1]))
+
+    async def append_turns(self, turns: list[tuple[str, str, str]]) -> None:
+        """Guarda turnos ``(sesión, pregunta, respuesta)`` de varias sesiones en un solo viaje, en orden"""
+        pipe = self.client.pipeline(transaction=True)
+        for session_id, user_input, output in turns:
+            pipe.lpush(
+                self.key(session_id),
+                json.dumps(message_to_dict(HumanMessage(content=user_input))),
+                json.dumps(message_to_dict(AIMessage(content=output)))
+            )
+        if self.ttl:
+            for session_id in dict.fromkeys(session_id for session_id, _, _ in turns):
+                pipe.expire(self.key(session_id), self.ttl)
+                pipe.expire(self.summary_key(session_id), self.ttl)
+        await pipe.execute()
+
+    async def compact(self, session_id: str, summary: str, folded: int) -> None:
+        """Guarda el nuevo resumen y elimina los ``folded`` mensajes más antiguos"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(self.summary_key(session_id), summary, ex=self.ttl)
+        # Los más antiguos están al final de la lista; así no se pierden turnos recién agregados
+        pipe.ltrim(self.key(session_id), 0, -(folded + 1))
+        await pipe.execute()
+
+    async def clear(self, session_id: str) -> None:
+        await self.client.delete(self.key(session_id), self.summary_key(session_id))
+
+    async def close(self) -> None:
+        if self.writer:
+            await self.writer.close()
+        await self.client.aclose()
+
+class HistorySummarizer:
+    """Mantiene el historial dentro de un presupuesto de tokens con un resumen incremental.
+
+    Conserva literalmente los últimos ``max_turns`` turnos que quepan en
+    ``token_budget`` y pliega los anteriores en el resumen de la sesión con
+    una llamada al LLM.
+    """
+
+    prompt = """Resume la conversación entre un usuario y un asistente experto en pensiones de Chile.
+    Conserva los datos que el usuario entregó sobre su situación, las preguntas que hizo y las conclusiones principales.
+    Escribe en español, en un máximo de {max_words} palabras.
+
+    Resumen actual:
+    {summary}
+
+    Mensajes nuevos a incorporar:
+    {messages}
+
+    Resumen actualizado:"""
+
+    def __init__(self, llm, token_budget: int = 1500, max_turns: int = 6, max_words: int = 150):
+        self.llm = llm
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.max_words = max_words
+
+    def split(self, messages: list[BaseMessage]) -> int:
+        """Cantidad de mensajes antiguos (en turnos completos) que deben plegarse al resumen"""
+        kept_tokens = 0
+        kept = 0
+        # Recorrer de a turnos (usuario + asistente) desde el más reciente
+        for end in range(len(messages), 0, -2):
+            turn = messages[max(0, end - 2):end]
+            turn_tokens = sum(count_tokens(message.content) for message in turn)
+            if kept // 2 >= self.max_turns or kept_tokens + turn_tokens > self.token_budget:
+                break
+            kept_tokens += turn_tokens
+            kept += len(turn)
+        return len(messages) - kept
+
+    async def compact(self, store: ChatHistoryStore, session_id: str, history: ConversationHistory) -> ConversationHistory:
+        """Pliega los turnos antiguos si hace falta.
+
+        ``history`` debe leerse con el candado de la sesión tomado
+        (``compaction_lock``): ``LTRIM`` elimina ``folded`` mensajes contando
+        desde el más antiguo.
+        """
+        folded = self.split(history.messages)
+        if folded <= 0:
+            return history
+
+        old_messages = format_chat_history(ConversationHistory(messages=history.messages[:folded]))
+        response = await self.llm.ainvoke(self.prompt.format(
+            max_words=self.max_words,
+            summary=history.summary or "Sin resumen previo.",
+            messages=old_messages
+        ))
+        summary = response.content.strip()
+        await store.compact(session_id, summary, folded)
+        return ConversationHistory(summary=summary, messages=history.messages[folded:])
+
+class HistoryWriter:
+    """Guarda los turnos en segundo plano para que la respuesta no espere a Redis.
+
+    Los turnos entran a una cola acotada (``submit`` espera si está llena) y
+    un único consumidor los escribe en lotes de hasta ``batch_size`` con un
+    pipeline, en orden de llegada, así que cada sesión conserva su orden. Un
+    lote que falla se reintenta con espera exponencial; tras ``max_retries``
+    se descarta y se cuenta en ``agent_memory_dropped_turns_total``. ``wait``
+    espera las escrituras pendientes de una sesión antes de leer su historial.
+
+    En modo ``summary`` el resumen corre en una tarea por sesión, fuera del
+    consumidor y con hasta ``max_compactions`` llamadas al LLM a la vez: un
+    resumen lento no frena las escrituras ni las lecturas de otras sesiones.
+    """
+
+    def __init__(
+        self,
+        store: ChatHistoryStore,
+        max_pending: int = 1000,
+        batch_size: int = 64,
+        max_retries: int = 5,
+        retry_delay: float = 0.05,
+        drain_timeout: float = 10.0,
+        max_compactions: int = 4
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.drain_timeout = drain_timeout
+        self._queue: asyncio.Queue[tuple[str, str, str]] = asyncio.Queue(maxsize=max_pending)
+        self._pending: dict[str, int] = {}
+        self._written = asyncio.Condition()
+        self._task: asyncio.Task | None = None
+        # Un resumen en curso por sesión; si llegan turnos mientras corre, se repite al terminar
+        self._compactions: dict[str, asyncio.Task] = {}
+        self._recompact: set[str] = set()
+        self._compaction_slots = asyncio.Semaphore(max_compactions)
+        self.metrics = {"submitted": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0, "summarized": 0}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, session_id: str, user_input: str, output: str) -> None:
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self.metrics["submitted"] += 1
+        await self._queue.put((session_id, user_input, output))
+
+    async def wait(self, session_id: str) -> None:
+        """Espera a que se escriban (o descarten) los turnos pendientes de la sesión"""
+        if not self._pending.get(session_id):
+            return
+        async with self._written:
+            await self._written.wait_for(lambda: not self._pending.get(session_id))
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: list[tuple[str, str, str]]) -> None:
+        written = False
+        delay = self.retry_delay
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with timed(MEMORY_DURATION, "save", "memory.save"):
+                        await self.store.append_turns(batch)
+                    written = True
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        logger.error("Se descartan %d turnos tras %d intentos: %s", len(batch), attempt + 1, e)
+                        break
+                    self.metrics["retries"] += 1
+                    logger.warning("Error guardando %d turnos (intento %d): %s", len(batch), attempt + 1, e)
+                    await asyncio.sleep(delay)
+                    delay *= 2
+        finally:
+            if written:
+                self.metrics["written"] += len(batch)
+                self.metrics["batches"] += 1
+            else:
+                self.metrics["dropped"] += len(batch)
+                MEMORY_DROPPED_TURNS.inc(len(batch))
+            for session_id, _, _ in batch:
+                self._pending[session_id] -= 1
+                if not self._pending[session_id]:
+                    del self._pending[session_id]
+            async with self._written:
+                self._written.notify_all()
+
+        # El resumen de los turnos antiguos no bloquea la respuesta ni el consumidor
+        if written and self.store.summarizer:
+            for session_id in dict.fromkeys(session_id for session_id, _, _ in batch):
+                self._schedule_compaction(session_id)
+
+    def _schedule_compaction(self, session_id: str) -> None:
+        if session_id in self._compactions:
+            self._recompact.add(session_id)
+            return
+        self._compactions[session_id] = asyncio.create_task(self._compact(session_id))
+
+    async def _compact(self, session_id: str) -> None:
+        try:
+            while True:
+                self._recompact.discard(session_id)
+                try:
+                    async with self._compaction_slots, self.store.compaction_lock(session_id) as acquired:
+                        # Si otro worker está resumiendo la sesión, el próximo turno la vuelve a revisar
+                        if acquired:
+                            with timed(MEMORY_DURATION, "summarize", "memory.summarize"):
+                                await self.store.summarizer.compact(self.store, session_id, await self.store.load(session_id))
+                            self.metrics["summarized"] += 1
+                except Exception:
+                    logger.exception("Error resumiendo el historial de la sesión")
+                if session_id not in self._recompact:
+                    break
+        finally:
+            self._recompact.discard(session_id)
+            del self._compactions[session_id]
+
+    async def close(self) -> None:
+        """Escribe los turnos pendientes (hasta ``drain_timeout`` segundos) y detiene el consumidor"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error("Quedaron %d turnos sin guardar al cerrar", self._queue.qsize())
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+        # Los resúmenes en curso terminan dentro del mismo plazo; si no, se retoman en el próximo turno
+        compactions = list(self._compactions.values())
+        if compactions:
+            _, pending = await asyncio.wait(compactions, timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*compactions, return_exceptions=True)
+
+class SessionMemory:
+    """Memoria de una sesión ligada al almacén compartido"""
+
+    def __init__(self, store: ChatHistoryStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+
+    async def aload_history(self) -> ConversationHistory:
+        # Leer después de los turnos de la sesión que aún se están escribiendo
+        if self.store.writer:
+            await self.store.writer.wait(self.session_id)
+        with timed(MEMORY_DURATION, "load", "memory.load"):
+            return await self.store.load(self.session_id)
+
+    async def arecord_turn(self, user_input: str, output: str) -> None:
+        """Registra el turno en segundo plano si hay ``HistoryWriter``; si no, lo guarda en línea"""
+        if self.store.writer:
+            await self.store.writer.submit(self.session_id, user_input, output)
+        else:
+            await self.asave_turn(user_input, output)
+
+    async def asave_turn(self, user_input: str, output: str) -> ConversationHistory:
+        with timed(MEMORY_DURATION, "save", "memory.save"):
+            history = await self.store.append_turn(self.session_id, user_input, output)
+        if self.store.summarizer and self.store.summarizer.split(history.messages) > 0:
+            # El turno ya quedó guardado: si el resumen falla se reintenta en el próximo
+            try:
+                async with self.store.compaction_lock(self.session_id) as acquired:
+                    if acquired:
+                        with timed(MEMORY_DURATION, "summarize", "memory.summarize"):
+                            history = await self.store.summarizer.compact(self.store, self.session_id, await self.store.load(self.session_id))
+            except Exception:
+                logger.exception("Error resumiendo el historial de la sesión")
+        return history
+
+def setup_summarizer(llm) -> HistorySummarizer | None:
+    """Crea el resumidor si ``CHAT_MEMORY_MODE=summary``"""
+    if os.getenv("CHAT_MEMORY_MODE", "buffer").lower() != "summary":
+        return None
+    summarizer = HistorySummarizer(
+        llm,
+        token_budget=int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500")),
+        max_turns=int(os.getenv("CHAT_HISTORY_MAX_TURNS", "6"))
+    )
+    logger.info("Memoria con resumen: %d turnos / %d tokens literales", summarizer.max_turns, summarizer.token_budget)
+    return summarizer
+
+async def setup_memory_store(summarizer: HistorySummarizer | None = None) -> ChatHistoryStore:
+    """Crea el almacén de historial una sola vez al iniciar la aplicación"""
+    client = await setup_redis()
+    ttl = int(os.getenv("CHAT_HISTORY_TTL", "3600"))
+    store = ChatHistoryStore(client, key_prefix="chat:", ttl=ttl, summarizer=summarizer)
     
-    except Exception as e:
-        print(f"❌ Error inesperado: {e}")
-        raise
+    # Guardar los turnos después de responder, en lotes. ``wait`` solo ve la cola
+    # de este proceso: con varios workers requiere sesiones con afinidad (sticky)
+    default = "false" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "true"
+    if os.getenv("CHAT_HISTORY_WRITE_BEHIND", default).lower() in ("1", "true", "yes"):
+        store.writer = HistoryWriter(store, max_pending=int(os.getenv("CHAT_HISTORY_WRITE_QUEUE_SIZE", "1000")))
+        store.writer.start()
+    return store
+
+def get_memory(store: ChatHistoryStore, session_id: str) -> SessionMemory:
+    """Obtiene la memoria de la sesión sin abrir conexiones nuevas"""
+    with timed(MEMORY_DURATION, "get", "memory.get"):
+        return SessionMemory(store, session_id)
@@ -1,11 +1,21 @@
 import os
+import logging
 from pinecone import Pinecone as PineconeClient
 from langchain_pinecone import Pinecone
 from src.config.embeddings_setup import setup_embeddings
-from dotenv import load_dotenv
 
-# Forzar recarga del .env
-load_dotenv(override=True)
+logger = logging.getLogger(__name__)
+
+def pinecone_index(pc: PineconeClient, index_name: str, pool_size: int):
+    """Índice de Pinecone cuyo pool de urllib3 tiene ``pool_size`` conexiones desde que se crea.
+
+    Las versiones recientes del SDK reciben el tamaño como argumento de
+    ``Index``; pinecone-client 5 lo toma de la configuración del cliente, que
+    el índice copia al construir su pool.
+    """
+    config = getattr(pc, "_openapi_config", None) or pc.openapi_config
+    config.connection_pool_maxsize = pool_size
+    return pc.Index(index_name, pool_threads=pool_size, connection_pool_maxsize=pool_size)
 
 def setup_pinecone():
     """Configura y retorna el vector store de Pinecone"""
@@ -20,10 +30,12 @@ def setup_pinecone():
         if not api_key.startswith("pcsk_"):
             raise ValueError("❌ PINECONE_API_KEY inválida o mal formateada (debe empezar con 'pcsk_')")
             
-        print(f"🔄 Configurando conexión a Pinecone...")
+        logger.info("Configurando conexión a Pinecone")
         
-        # Intentar inicializar el cliente
-        pc = PineconeClient(api_key=api_key)
+        # El SDK de Pinecone usa urllib3 y no los clientes httpx compartidos:
+        # solo se alinea el tamaño de su pool con HTTP_MAX_KEEPALIVE_CONNECTIONS
+        pool_size = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        pc = PineconeClient(api_key=api_key, pool_threads=pool_size)
         
         # Verificar conexión
         pc.list_indexes()
@@ -31,14 +43,11 @@ def setup_pinecone():
         # Setup embeddings
         embedding = setup_embeddings()
         
-        # Create vector store
-        vectorstore = Pinecone.from_existing_index(
-            index_name=index_name,
-            embedding=embedding
-        )
-        print("✅ Conexión a Pinecone establecida")
+        # Reutilizar el cliente ya verificado en vez de crear otro
+        vectorstore = Pinecone(index=pinecone_index(pc, index_name, pool_size), embedding=embedding)
+        logger.info("Conexión a Pinecone establecida")
         return vectorstore
         
     except Exception as e:
-        print(f"❌ Error configurando Pinecone: {str(e)}")
+        logger.error("Error configurando Pinecone: %s", e)
         raise 
\ No newline at end of file
@@ -0,0 +1,238 @@
+import os
+import logging
+import asyncio
+import time
+from collections import OrderedDict
+from redis.asyncio import Redis, ConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+class InMemoryRedis:
+    """Sustituto en proceso de un cliente ``redis.asyncio`` (al estilo fakeredis).
+
+    Implementa solo los comandos que usa la aplicación. Cada llamada directa o
+    cada ``pipeline().execute()`` cuenta como un viaje de ida y vuelta, y puede
+    simular latencia de red con ``latency`` (segundos).
+
+    Como fallback de producción queda acotado: las escrituras eliminan las
+    claves vencidas cada ``sweep_interval`` segundos y, con ``max_keys``, se
+    descartan las claves usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, latency: float = 0.0, max_keys: int | None = None, sweep_interval: float = 60.0):
+        self.latency = latency
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self.round_trips = 0
+        self.evicted = 0
+        self._data: OrderedDict[str, object] = OrderedDict()
+        self._expires: dict[str, float] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    async def _round_trip(self) -> None:
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        if key not in self._data:
+            return False
+        self._data.move_to_end(key)
+        return True
+
+    def _written(self) -> None:
+        """Tras una escritura: limpia las claves vencidas y aplica ``max_keys``"""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            for key, expires_at in list(self._expires.items()):
+                if expires_at <= now:
+                    self._data.pop(key, None)
+                    del self._expires[key]
+            self._next_sweep = now + self.sweep_interval
+        if self.max_keys and len(self._data) > self.max_keys:
+            if not self.evicted:
+                logger.warning("Memoria local llena (%d claves): se descartan las sesiones menos recientes", self.max_keys)
+            while len(self._data) > self.max_keys:
+                key, _ = self._data.popitem(last=False)
+                self._expires.pop(key, None)
+                self.evicted += 1
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode("utf-8")
+
+    # Comandos síncronos: los usan tanto las llamadas directas como el pipeline
+    def _lpush(self, key: str, *values) -> int:
+        self._alive(key)  # descarta la clave si ya expiró
+        items = self._data.setdefault(key, [])
+        for value in values:
+            items.insert(0, self._encode(value))
+        self._written()
+        return len(items)
+
+    def _lrange(self, key: str, start: int, end: int) -> list[bytes]:
+        if not self._alive(key):
+            return []
+        items = self._data[key]
+        length = len(items)
+        start = max(length + start, 0) if start < 0 else start
+        end = length + end if end < 0 else min(end, length - 1)
+        return list(items[start:end + 1])
+
+    def _ltrim(self, key: str, start: int, end: int) -> bool:
+        if self._alive(key):
+            self._data[key] = self._lrange(key, start, end)
+        return True
+
+    def _expire(self, key: str, seconds: int) -> bool:
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.monotonic() + seconds
+        return True
+
+    def _get(self, key: str) -> bytes | None:
+        return self._data.get(key) if self._alive(key) else None
+
+    def _set(self, key: str, value, ex: int | None = None, nx: bool = False) -> bool | None:
+        if nx and self._alive(key):
+            return None
+        self._data[key] = self._encode(value)
+        self._data.move_to_end(key)
+        self._expires.pop(key, None)
+        if ex:
+            self._expires[key] = time.monotonic() + ex
+        self._written()
+        return True
+
+    def _incr(self, key: str) -> int:
+        value = int(self._get(key) or 0) + 1
+        self._data[key] = self._encode(value)
+        self._data.move_to_end(key)
+        self._written()
+        return value
+
+    def _delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    async def ping(self) -> bool:
+        await self._round_trip()
+        return True
+
+    async def lpush(self, key: str, *values) -> int:
+        await self._round_trip()
+        return self._lpush(key, *values)
+
+    async def lrange(self, key: str, start: int, end: int) -> list[bytes]:
+        await self._round_trip()
+        return self._lrange(key, start, end)
+
+    async def ltrim(self, key: str, start: int, end: int) -> bool:
+        await self._round_trip()
+        return self._ltrim(key, start, end)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        await self._round_trip()
+        return self._expire(key, seconds)
+
+    async def get(self, key: str) -> bytes | None:
+        await self._round_trip()
+        return self._get(key)
+
+    async def set(self, key: str, value, ex: int | None = None, nx: bool = False) -> bool | None:
+        await self._round_trip()
+        return self._set(key, value, ex=ex, nx=nx)
+
+    async def incr(self, key: str) -> int:
+        await self._round_trip()
+        return self._incr(key)
+
+    async def delete(self, *keys: str) -> int:
+        await self._round_trip()
+        return self._delete(*keys)
+
+    def pipeline(self, transaction: bool = True) -> "InMemoryPipeline":
+        return InMemoryPipeline(self)
+
+    async def aclose(self) -> None:
+        return None
+
+class InMemoryPipeline:
+    """Pipeline de ``InMemoryRedis``: acumula comandos y los ejecuta en un solo viaje"""
+
+    def __init__(self, client: InMemoryRedis):
+        self._client = client
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if not hasattr(self._client, f"_{name}"):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> list:
+        await self._client._round_trip()
+        results = [getattr(self._client, f"_{name}")(*args, **kwargs) for name, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+    async def __aenter__(self) -> "InMemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._commands = []
+
+def redis_required() -> bool:
+    """``REDIS_REQUIRED``; por defecto activo si ``WEB_CONCURRENCY`` indica más de un worker"""
+    default = "true" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "false"
+    return os.getenv("REDIS_REQUIRED", default).lower() in ("1", "true", "yes")
+
+async def setup_redis() -> Redis | InMemoryRedis:
+    """Crea el cliente Redis asíncrono con un pool de conexiones compartido.
+
+    Si Redis no responde, retorna un ``InMemoryRedis`` como fallback, salvo
+    que Redis sea obligatorio (``redis_required``): ahí se propaga el error
+    para que la inicialización lo reintente.
+    """
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+
+    logger.info("Conectando a Redis: %s", redis_url)
+
+    pool = ConnectionPool.from_url(
+        redis_url,
+        max_connections=max_connections,
+        socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "2")),
+        health_check_interval=30
+    )
+    client = Redis(connection_pool=pool)
+
+    try:
+        await client.ping()
+        logger.info("Conexión a Redis establecida (pool de %d conexiones)", max_connections)
+        return client
+
+    except (RedisConnectionError, RedisTimeoutError, OSError) as e:
+        logger.error("Error de conexión a Redis: %s", e)
+        await client.aclose()
+        if redis_required():
+            # Con varios workers la memoria local no se comparte: mejor no estar listo
+            raise
+        logger.warning("Usando memoria local como fallback")
+        return InMemoryRedis(max_keys=int(os.getenv("REDIS_FALLBACK_MAX_KEYS", "10000")))
@@ -0,0 +1,83 @@
+import os
+import time
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+class Startup:
+    """Estado de la inicialización en segundo plano de los componentes de la API.
+
+    Cada componente se crea con ``component``: las fábricas síncronas corren
+    en un hilo para no bloquear el event loop (p. ej. las llamadas de red a
+    Pinecone) y las que fallan se reintentan con espera exponencial, de modo
+    que un proveedor lento retrasa la disponibilidad en vez de tumbar el proceso.
+    """
+
+    def __init__(self, retry_delay: float = 2.0, max_retry_delay: float = 60.0):
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.started = time.perf_counter()
+        self.components: dict[str, dict] = {}
+        self.ready = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    async def component(self, name: str, factory: Callable[..., Any], *args, **kwargs) -> Any:
+        """Crea un componente, reintentando hasta que la fábrica tenga éxito"""
+        status = self.components[name] = {"status": "pending", "attempts": 0}
+        delay = self.retry_delay
+        start = time.perf_counter()
+        while True:
+            status["attempts"] += 1
+            try:
+                if inspect.iscoroutinefunction(factory):
+                    value = await factory(*args, **kwargs)
+                else:
+                    value = await asyncio.to_thread(factory, *args, **kwargs)
+            except Exception as e:
+                status.update(status="retrying", error=f"{type(e).__name__}: {e}")
+                logger.warning("No se pudo inicializar %s (intento %d), reintentando en %.1f s: %s", name, status["attempts"], delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            status.update(status="ready", seconds=round(time.perf_counter() - start, 3))
+            status.pop("error", None)
+            return value
+
+    def run(self, initialize: Callable[[], Any]) -> asyncio.Task:
+        """Lanza ``initialize`` en segundo plano y marca la API lista al terminar"""
+        async def wrapper():
+            try:
+                await initialize()
+            except Exception:
+                logger.exception("La inicialización de la API falló")
+                return
+            self.ready.set()
+            logger.info("API lista en %.2f s", time.perf_counter() - self.started)
+
+        self.task = asyncio.create_task(wrapper())
+        return self.task
+
+    async def stop(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "uptime_s": round(time.perf_counter() - self.started, 3),
+            "components": self.components
+        }
+
+def setup_startup() -> Startup:
+    """Crea el estado de inicialización con ``STARTUP_RETRY_DELAY`` y ``STARTUP_MAX_RETRY_DELAY``"""
+    return Startup(
+        retry_delay=float(os.getenv("STARTUP_RETRY_DELAY", "2")),
+        max_retry_delay=float(os.getenv("STARTUP_MAX_RETRY_DELAY", "60"))
+    )
@@ -0,0 +1,90 @@
+import os
+import logging
+import json
+from pathlib import Path
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from src.config.embeddings_setup import setup_embeddings
+from src.vectorstores.local_index import LocalVectorStore, MANIFEST_FILE
+from src.retrieval.bm25 import BM25Index, BM25ProcessPool
+from src.retrieval.hybrid import HybridRetriever
+
+logger = logging.getLogger(__name__)
+
+def setup_local_index() -> LocalVectorStore:
+    """Carga el índice local desde un snapshot en disco (mapeado en memoria)"""
+    try:
+        path = os.getenv("LOCAL_INDEX_PATH", "data/local_index")
+        use_ivf = os.getenv("LOCAL_INDEX_APPROXIMATE", "false").lower() in ("1", "true", "yes")
+        nprobe = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+        
+        logger.info("Cargando índice local desde %s", path)
+        
+        embedding = setup_embeddings()
+        vectorstore = LocalVectorStore.load(path, embedding, mmap=True, use_ivf=use_ivf, nprobe=nprobe)
+        
+        # Advertir si el snapshot fue creado con otro modelo de embeddings
+        manifest_path = Path(path) / MANIFEST_FILE
+        if manifest_path.exists():
+            model = json.loads(manifest_path.read_text(encoding="utf-8")).get("embedding_model")
+            if model and model != os.getenv("OPENAI_EMBEDDING_MODEL"):
+                logger.warning("El snapshot usa el modelo %s y el actual es %s", model, os.getenv("OPENAI_EMBEDDING_MODEL"))
+        
+        mode = f"aproximado (IVF, nprobe={nprobe})" if vectorstore.use_ivf else "exacto"
+        logger.info("Índice local cargado: %d documentos, búsqueda %s", len(vectorstore.documents), mode)
+        return vectorstore
+        
+    except Exception as e:
+        logger.error("Error cargando índice local: %s", e)
+        raise
+
+def setup_vectorstore() -> VectorStore:
+    """Configura el vector store según ``VECTORSTORE_BACKEND`` (``pinecone`` o ``local``)"""
+    backend = os.getenv("VECTORSTORE_BACKEND", "pinecone").lower()
+    
+    if backend == "local":
+        return setup_local_index()
+    if backend == "pinecone":
+        from src.config.pinecone_setup import setup_pinecone
+        return setup_pinecone()
+    
+    raise ValueError(f"❌ VECTORSTORE_BACKEND desconocido: {backend}")
+
+def setup_retriever(vectorstore: VectorStore) -> BaseRetriever:
+    """Configura el retriever según ``RETRIEVAL_MODE`` (``vector`` o ``hybrid``).
+
+    El modo híbrido requiere el índice BM25 generado por la ingesta.
+    """
+    mode = os.getenv("RETRIEVAL_MODE", "vector").lower()
+    k = int(os.getenv("RETRIEVAL_K", "4"))
+    
+    if mode != "hybrid":
+        return vectorstore.as_retriever(search_kwargs={"k": k})
+    
+    path = os.getenv("BM25_INDEX_PATH", "data/bm25_index")
+    if not Path(path).exists():
+        logger.warning("Índice BM25 no encontrado en %s, usando solo búsqueda vectorial", path)
+        return vectorstore.as_retriever(search_kwargs={"k": k})
+    
+    fetch_k = int(os.getenv("HYBRID_FETCH_K", "10"))
+    bm25 = BM25Index.load(path, mmap=True)
+    logger.info("Búsqueda híbrida activada: BM25 (%d chunks) + vectorial, k=%d", len(bm25.documents), k)
+    
+    # Búsqueda léxica en procesos aparte (opcional, para corpus grandes)
+    process_workers = int(os.getenv("BM25_PROCESS_WORKERS", "0"))
+    search_pool = BM25ProcessPool(path, process_workers) if process_workers > 0 else None
+    if search_pool:
+        logger.info("BM25 en %d procesos aparte", process_workers)
+    return HybridRetriever(
+        vector_retriever=vectorstore.as_retriever(search_kwargs={"k": fetch_k}),
+        bm25=bm25,
+        k=k,
+        fetch_k=fetch_k,
+        search_pool=search_pool
+    )
+
+def close_retriever(retriever) -> None:
+    """Detiene los procesos de BM25 del retriever híbrido, si los tiene"""
+    search_pool = getattr(retriever, "search_pool", None)
+    if search_pool is not None:
+        search_pool.close()
@@ -1,11 +1,28 @@
 from typing import TypedDict, Annotated, Sequence, Dict, Any, Literal
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, Graph
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
 from langchain_core.retrievers import BaseRetriever
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from redis.exceptions import RedisError
+from src.cache.semantic_cache import SemanticResponseCache
+from src.cache.coalescing import RequestCoalescer, query_key
+from src.graph.routing import pension_router
+from src.graph.context import ContextPacker, setup_context_packer
+from src.graph.prompts import CONTEXT_PROMPT, SIMPLE_PROMPT, prompt_usage, answer_token_cap
+from src.graph.resilience import Deadline, UpstreamPolicy, setup_upstream_policy
+from src.graph.tiers import TierRouter
+from src.config.memory import format_chat_history
+from src.tools.tokens import count_tokens
+from src.observability.metrics import instrument_node, timed, ROUTING_DECISIONS, DOCUMENTS_RETRIEVED, DOCUMENTS_PACKED, LLM_TIER_DURATION, LLM_TRUNCATED, MEMORY_DROPPED_TURNS
 from datetime import datetime
+import asyncio
+import logging
 import pytz
 
+logger = logging.getLogger(__name__)
+
 class TimeInfo(TypedDict):
     current_time: str
     timezone: str
@@ -24,10 +41,12 @@ class UserData(TypedDict):
 class AgentState(TypedDict):
     messages: Sequence[BaseMessage]
     context: str | None
+    context_tokens: int | None
     chat_history: str | None
     next_step: Literal["retrieve", "respond"] | None
     time_info: TimeInfo | None
-    sources: list[str] | None
+    sources: str | None
+    documents: list[Document] | None
     agent_name: str | None
     user_data: UserData | None
 
@@ -37,312 +56,283 @@ def get_formatted_time() -> TimeInfo:
     now = datetime.now(chile_tz)
     
     return {
-        "current_time": now.strftime("%H:%M:%S"),
+        # Sin segundos: el prompt cambia una vez por minuto y no en cada petición
+        "current_time": now.strftime("%H:%M"),
         "timezone": "America/Santiago",
         "formatted_date": now.strftime("%Y-%m-%d")
     }
 
 def print_state(state: Dict[str, Any]) -> None:
-    """Imprime el estado actual del grafo de manera formateada"""
-    print("\n" + "="*50)
-    print("🔄 Estado actual del grafo:")
+    """Registra el estado actual del grafo en nivel DEBUG"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    lines = ["Estado actual del grafo:"]
     
-    # Imprimir datos del usuario
+    # Datos del usuario
     if "user_data" in state:
-        print("\n👤 Datos del usuario:")
         user_data = state["user_data"]
-        print(f"  - Nombre: {user_data.get('nombre', 'No especificado')}")
-        print(f"  - Género: {user_data.get('genero', 'No especificado')}")
-        print(f"  - Edad: {user_data.get('edad', {}).get('anos', 'No especificada')} años")
-        print(f"  - Nivel de estudios: {user_data.get('nivelEstudios', 'No especificado')}")
-    
-    # Imprimir mensajes
-    if "messages" in state:
-        print("\n📝 Mensajes:")
-        for msg in state["messages"]:
-            role = "👤 Usuario" if isinstance(msg, HumanMessage) else "🤖 Asistente"
-            print(f"{role}: {msg.content}")
+        lines.append(f"  Usuario: {user_data.get('nombre', 'No especificado')}, {user_data.get('genero', 'No especificado')}, "
+                     f"{user_data.get('edad', {}).get('anos', 'No especificada')} años, {user_data.get('nivelEstudios', 'No especificado')}")
     
-    # Imprimir contexto si existe
-    if "context" in state and state["context"]:
-        print("\n📚 Contexto recuperado:")
-        print(state["context"][:200] + "..." if len(state["context"]) > 200 else state["context"])
+    # Mensajes
+    for msg in state.get("messages", []):
+        role = "Usuario" if isinstance(msg, HumanMessage) else "Asistente"
+        lines.append(f"  {role}: {msg.content}")
     
-    # Imprimir historial si existe
-    if "chat_history" in state and state["chat_history"]:
-        print("\n💭 Historial de chat:")
-        print(state["chat_history"][:200] + "..." if len(state["chat_history"]) > 200 else state["chat_history"])
+    # Contexto e historial, abreviados
+    for label, key in (("Contexto", "context"), ("Historial", "chat_history")):
+        if state.get(key):
+            lines.append(f"  {label}: {state[key][:200]}{'...' if len(state[key]) > 200 else ''}")
     
-    print("="*50 + "\n")
+    logger.debug("\n".join(lines))
 
 def evaluate_need_for_context(state: AgentState) -> AgentState:
     """Evalúa si es necesario buscar información adicional dependiendo del contenido de la consulta."""
-    query = state["messages"][-1].content.lower()
-
-    # Palabras clave relacionadas con temas previsionales y pensiones
-    pension_keywords = [
-        # Palabras base
-        "pensión", "pensiones", "previsional", "previsión", "previsión social",
-        "reforma", "jubilación", "jubilacion", "jubilado", "pensionado", "fondo autonomo","bono",
-        # Ahorro y aportes
-        "ahorro previsional", "ahorro obligatorio", "aportes previsionales voluntarios", "aporte", 
-        "cotización obligatoria", "cotizaciones voluntarias", "cotizaciones", "apv",
-        
-        # Entidades y siglas
-        "afp", "afps", "administradora de fondos de pensiones", "fapp",
-        "ips", "instituto de previsión social",
-        "sp", "superintendencia de pensiones", 
-        # Modelos y tipos de pensión
-        "capitalización individual", "modelo de reparto", "retiro de fondos", "renta vitalicia",
-        "retiro programado", "pilar solidario", "pilar contributivo", "pilar no contributivo",
-        
-        # Situaciones y beneficios
-        "expectativa de vida", "pensión básica solidaria", "pensión de vejez", 
-        "pensión de invalidez", "pensión de sobrevivencia", 
-        "compensacion", "beneficios previsionales", "dictamen de pensiones",
-        
-        # Otros términos relevantes
-        "edad de jubilación", "edad legal de jubilación", "jubilación anticipada", 
-        "trabajador", "empleador", "cotizante", "certificado de cotizaciones", 
-        "vejez"
-    ]
+    query = state["messages"][-1].content
 
-    if any(phrase in query for phrase in pension_keywords):
+    # Palabras clave de temas previsionales en src/config/routing_keywords.json
+    if pension_router.needs_context(query):
         state["next_step"] = "retrieve"
     else:
         state["next_step"] = "respond"
+    ROUTING_DECISIONS.inc(1, state["next_step"])
+    logger.debug("Ruta elegida: %s", state["next_step"])
         
     return state
 
-def create_retrieval_chain(retriever: BaseRetriever):
-    def retrieve_context(state: AgentState) -> AgentState:
-        """Busca información relevante en Pinecone basada en el último mensaje"""
-        print("\n🔍 Buscando información relevante...")
-        query = state["messages"][-1].content
-        
-        # Buscar en Pinecone
-        print("🔎 Consultando base de conocimiento...")
-        docs = retriever.get_relevant_documents(query)
-        
-        # Formatear el contexto con metadatos relevantes y referencias numeradas
-        formatted_docs = []
-        sources = []
-        
-        for i, doc in enumerate(docs, 1):
-            # Crear entrada formateada con metadatos y referencia
-            formatted_entry = f"""
-                [link_{i}]
-                Título: {doc.metadata.get('title', 'Sin título')}
-                Fecha de publicación: {doc.metadata.get('estimated_published_time', 'Fecha no especificada')}
-                Fuente: {doc.metadata.get('source_domain', 'Dominio no especificado')}
-                Contenido:
-                {doc.page_content}
-            """
-            formatted_docs.append(formatted_entry)
-            
-            # Crear entrada de fuente con enlace HTML
-            url = doc.metadata.get('url_source', '#')
-            source = f'<a href="{url}" target="_blank">link_{i}</a>'
-            sources.append(source)
-        
-        # Guardar en el estado
-        state["context"] = "\n\n".join(formatted_docs)
-        # Unir las fuentes con comas si hay más de una
-        state["sources"] = ", ".join(sources) if len(sources) > 1 else sources[0] if sources else ""
-        
-        print(f"✅ Encontrados {len(docs)} documentos relevantes")
-        return state
-    return retrieve_context
-
-def create_response_chain(llm: ChatOpenAI):
-    context_template = """Eres un asistente experto en jubilacion y pensiones.
-    Conoces mucho sobre los temas previsionales y puedes dar una explicacion general de los temas previsionales.
-    Siempre que puedas, da consejos y recomendaciones generales sobre los temas previsionales.
-    Tienes amplio conocimiento sobre la reforma previsional y las modificaciones que se han realizado.
-    
-    Tu genero esta determinado por tu nombre {agent_name}.
-    
-    Información del usuario:
-    - Nombre: {user_name}
-    - Género: {user_gender}
-    - Edad: {user_age} años
-    - Nivel de estudios: {user_education}
-    
-    Información temporal actual:
-    - Fecha: {date}
-    - Hora: {time}
-    - Zona horaria: {timezone}
-    
-    Contexto relevante:
-    {context}
-    
-    Historial de la conversación:
-    {chat_history}
-    
-    Pregunta actual: {question}
-    
-    Referencias disponibles:
-    {sources}
-
-    Instrucciones especiales:
-        - No debes inventar información, solo debes usar el contexto y las referencias.
-        - No debes realizar calculos financieros, solo debes dar una explicacion general.
-        - Si el usuario te pide un calculo de pension indica que puede ocupar la calculadora de pesiones disponible en la pagina principal.
-        - Evita llamar al usuario por su nombre ni le digas "Estimado".
-        - No es necesario que digas tu nombre al principio de la respuesta.
-        - Tu objetivo es ayudar al usuario a entender los temas previsionales.
-    
-    Instrucciones de formato y estilo:
-        1. Extensión
-        - Máximo 250 palabras
-        - Oraciones cortas y directas
+async def load_chat_history(state: AgentState, config: RunnableConfig, deadline: Deadline | None = None, timeout: float | None = None) -> str | None:
+    """Historial de la sesión para el prompt, si el estado inicial no lo trae.
 
-        2. Estructura
-        - Introducción breve (2-3 líneas)
-        - 1 a 3 subtítulos con "##"
-        - Puntos clave con "-"
-        - Conclusión breve (opcional)
+    Una sesión sin turnos previos queda con ``""``, para que el caché
+    semántico y la coalescencia la sigan tratando como sin historial. Si
+    Redis falla o no responde dentro del plazo, se responde sin historial.
+    """
+    if state.get("chat_history") is not None:
+        return state["chat_history"]
+    memory = config.get("configurable", {}).get("memory")
+    if memory is None:
+        return None
+    try:
+        history = await asyncio.wait_for(memory.aload_history(), deadline.timeout(timeout) if deadline else timeout)
+    except (RedisError, OSError, asyncio.TimeoutError) as e:
+        logger.warning("Historial no disponible, respondiendo sin él (%s: %s)", type(e).__name__, e)
+        return ""
+    return format_chat_history(history) if history.summary or history.messages else ""
 
-        3. Formato
-        - **Negrita** para conceptos clave
-        - *Cursiva* para términos importantes
-        - > para una cita (máx. 1)
-        - Una línea en blanco entre secciones
+def create_history_loading(upstream: UpstreamPolicy | None = None):
+    upstream = upstream or setup_upstream_policy()
 
-        4. Fuentes
-        - Una línea en blanco antes de "Fuentes:"
-        - Lista solo las fuentes realmente usadas
-    
-    Ejemplo de respuesta ideal:
-    
-        Introducción breve que presenta el tema principal.
+    async def load_history(state: AgentState, config: RunnableConfig) -> AgentState:
+        """Carga el historial en la ruta sin búsqueda de contexto"""
+        state["chat_history"] = await load_chat_history(state, config, request_deadline(config, upstream), upstream.history_timeout)
+        return state
+    return load_history
 
-        ## Aspectos Clave
+def request_deadline(config: RunnableConfig, upstream: UpstreamPolicy) -> Deadline:
+    """Presupuesto de la petición (``session_config``), o uno nuevo si no viene"""
+    return config.get("configurable", {}).get("deadline") or upstream.deadline()
 
-        - **Primer punto**: explicación concisa  
-        - **Segundo punto**: explicación concisa  
-        - **Tercer punto**: explicación concisa  
+def create_retrieval_chain(
+    retriever: BaseRetriever,
+    coalescer: RequestCoalescer | None = None,
+    upstream: UpstreamPolicy | None = None
+):
+    upstream = upstream or setup_upstream_policy()
 
-        > Cita relevante (si es necesaria)
+    async def search(query: str) -> list[Document]:
+        # Buscar en Pinecone
+        logger.debug("Consultando base de conocimiento: %s", query)
+        if coalescer:
+            # Las preguntas idénticas en curso comparten una sola búsqueda
+            return list(await coalescer.retrieval.do(query_key(query), lambda: retriever.ainvoke(query)))
+        return await retriever.ainvoke(query)
 
-        Fuentes:
-        {sources}
+    async def retrieve_context(state: AgentState, config: RunnableConfig) -> AgentState:
+        """Busca información relevante en Pinecone basada en el último mensaje.
 
-    Responde de manera amable, cercana y amigable al siguiente mensaje: {question}
-    """
-    
-    simple_template = """Eres un asistente experto en jubilacion y pensiones.
-    Conoces mucho sobre los temas previsionales y puedes dar una explicacion general de los temas previsionales.
-    Siempre que puedas, da consejos y recomendaciones generales sobre los temas previsionales.
-    Tienes amplio conocimiento sobre la reforma previsional y las modificaciones que se han realizado.
-    
-    Tu genero esta determinado por tu nombre {agent_name}.
+        El historial de la sesión se carga al mismo tiempo que la búsqueda. Si la
+        búsqueda vence su plazo o falla, se responde sin contexto.
+        """
+        query = state["messages"][-1].content
+        deadline = request_deadline(config, upstream)
+        docs, state["chat_history"] = await asyncio.gather(
+            upstream.retrieve(lambda: search(query), deadline),
+            load_chat_history(state, config, deadline, upstream.history_timeout)
+        )
+        docs = docs or []
+        
+        # El contexto se arma en el nodo "pack"
+        state["documents"] = docs
+        DOCUMENTS_RETRIEVED.inc(len(docs))
+        
+        logger.info("Encontrados %d documentos relevantes", len(docs))
+        return state
+    return retrieve_context
 
-    Información del usuario:
-        - Nombre: {user_name}
-        - Género: {user_gender}
-        - Edad: {user_age} años
-        - Nivel de estudios: {user_education}
-    
-    Información temporal actual:
-        - Fecha: {date}
-        - Hora: {time}
-        - Zona horaria: {timezone}
+def create_context_packing(packer: ContextPacker):
+    def pack_context(state: AgentState) -> AgentState:
+        """Deduplica y agrupa los documentos recuperados dentro del presupuesto de tokens"""
+        docs = state.get("documents") or []
+        packed = packer.pack(docs)
         
-    Historial de la conversación:
-    {chat_history}
+        # Las referencias [link_i] y las fuentes corresponden solo a lo que quedó en el contexto
+        state["context"] = packed.context
+        state["context_tokens"] = packed.tokens
+        state["sources"] = packed.sources
+        DOCUMENTS_PACKED.inc(len(packed.documents))
+        
+        logger.info("Contexto: %d de %d chunks, %d fuentes, %d tokens", len(packed.documents), len(docs), len(packed.urls), packed.tokens)
+        return state
+    return pack_context
 
-    Instrucciones especiales:
-    - No debes responder preguntas que no estén relacionadas con los temas previsionales.
-    - No puedes realizar asesoria financiera especifica, si el usuario te lo solicita, da consejos generales relacionados con el tema previsional.
-    - No debes realizar calculos financieros, solo debes dar una explicacion general.
-    - Si el usuario te pide un calculo de pension indica que puede ocupar la calculadora de pesiones disponible en la pagina principal.
-    - Evita llamar al usuario por su nombre ni le digas "Estimado".
-    - No es necesario que digas tu nombre al principio de la respuesta.
-    - No finalices tu respuesta preguntando "¿En qué puedo ayudarte más?" salvo que sea apropiado.
-    - Si detectas que la conversacion ha terminado, despidete de manera amable.
-    - No extiendas tus respuestas mas de lo necesario. Prefiere ser conciso y directo.
-    
-    Responde de manera cordial, amable, y amigable al siguiente mensaje: {question}
-    """
-    
-    def generate_response(state: AgentState) -> AgentState:
+def create_response_chain(
+    llm: BaseChatModel,
+    cache: SemanticResponseCache | None = None,
+    coalescer: RequestCoalescer | None = None,
+    upstream: UpstreamPolicy | None = None,
+    tiers: TierRouter | None = None
+):
+    upstream = upstream or setup_upstream_policy()
+    tiers = tiers or TierRouter(llm)
+
+    async def generate_response(state: AgentState, config: RunnableConfig) -> AgentState:
         """Genera una respuesta basada en el contexto y la pregunta"""
-        print("\n🤔 Generando respuesta...")
-        
         question = state["messages"][-1].content
-        chat_history = state.get("chat_history", "No hay historial previo.")
+        chat_history = state.get("chat_history") or "No hay historial previo."
         time_info = get_formatted_time()
         
         # Obtener datos del usuario
         user_data = state.get("user_data", {})
         user_age = user_data.get("edad", {}).get("anos", "No especificada")
         
-        # Si hay contexto y fuentes, usar template completo
-        if state.get("context") and state.get("sources"):
-            response = llm.invoke(context_template.format(
-                agent_name=state.get("agent_name"),
-                user_name=user_data.get("nombre", "Usuario"),
-                user_gender=user_data.get("genero", "No especificado"),
-                user_age=user_age,
-                user_education=user_data.get("nivelEstudios", "No especificado"),
-                date=time_info["formatted_date"],
-                time=time_info["current_time"],
-                timezone=time_info["timezone"],
-                context=state["context"],
-                chat_history=chat_history,
-                question=question,
-                sources=state["sources"]
-            ))
-            
-            # Asegurarnos de que la respuesta tenga el formato correcto de fuentes
-            if "Fuentes:" not in response.content:
-                response_content = response.content.strip() + f"\n\nFuentes:\n{state['sources']}"
-                response = AIMessage(content=response_content)
-        # Si no hay contexto, usar el template simple
+        # Reutilizar una respuesta equivalente del caché semántico si existe
+        cache_query = await cache.prepare(state) if cache else None
+        cached_answer = cache.get(cache_query) if cache_query else None
+        if cached_answer is not None:
+            logger.info("Respuesta obtenida del caché semántico")
+            state["messages"].append(AIMessage(content=cached_answer))
+            return state
+        
+        # Las sesiones sin historial con la misma pregunta y partición comparten la generación
+        response_key = coalescer.response_key(state) if coalescer else None
+        # Una respuesta que se cachea o se comparte llega a otros usuarios: el
+        # nombre no está en la partición, así que no se envía al modelo
+        shared = bool(cache_query or response_key)
+        
+        session = {
+            "agent_name": state.get("agent_name"),
+            "user_name": "No especificado" if shared else user_data.get("nombre", "Usuario"),
+            "user_gender": user_data.get("genero", "No especificado"),
+            "user_age": user_age,
+            "user_education": user_data.get("nivelEstudios", "No especificado"),
+            "date": time_info["formatted_date"],
+            "time": time_info["current_time"],
+            "timezone": time_info["timezone"],
+            "chat_history": chat_history,
+            "question": question
+        }
+        
+        # Si hay contexto y fuentes, usar el prompt completo; si no, el simple
+        has_context = bool(state.get("context") and state.get("sources"))
+        if has_context:
+            messages = CONTEXT_PROMPT.format_messages(**session, context=state["context"], sources=state["sources"])
+        else:
+            messages = SIMPLE_PROMPT.format_messages(**session)
+        deadline = request_deadline(config, upstream)
+        # Modelo según la ruta y el tamaño del contexto y del historial
+        tier = tiers.choose(has_context, state.get("context_tokens") or 0, count_tokens(state.get("chat_history") or ""))
+        # Solo el prompt con contexto pide una extensión máxima: ahí la salida se
+        # limita a esa extensión más el bloque de fuentes
+        limits = {"max_tokens": answer_token_cap(state["sources"])} if has_context else {}
+        async def complete() -> AIMessage:
+            with timed(LLM_TIER_DURATION, tier.name):
+                response = await upstream.complete(tier.llm, messages, deadline, tier=tier.name, **limits)
+            prompt_tokens, cached_tokens = prompt_usage.record(response, messages, tier.name)
+            logger.info("Prompt (%s): %d tokens (%d desde el prefijo en caché)", tier.name, prompt_tokens, cached_tokens)
+            if response.response_metadata.get("finish_reason") == "length":
+                LLM_TRUNCATED.inc(1, tier.name)
+                logger.warning("Respuesta cortada por el tope de salida (%s, max_tokens=%s)", tier.name, limits.get("max_tokens", "del proveedor"))
+            return response
+        
+        if response_key:
+            response = await coalescer.responses.do(response_key, complete)
+        else:
+            response = await complete()
+        
+        # Asegurarnos de que la respuesta tenga el formato correcto de fuentes
+        if has_context and "Fuentes:" not in response.content:
+            response = AIMessage(content=response.content.strip() + f"\n\nFuentes:\n{state['sources']}")
         else:
-            response = llm.invoke(simple_template.format(
-                agent_name=state.get("agent_name"),
-                user_name=user_data.get("nombre", "Usuario"),
-                user_gender=user_data.get("genero", "No especificado"),
-                user_age=user_age,
-                user_education=user_data.get("nivelEstudios", "No especificado"),
-                date=time_info["formatted_date"],
-                time=time_info["current_time"],
-                timezone=time_info["timezone"],
-                chat_history=chat_history,
-                question=question
-            ))
             response = AIMessage(content=response.content)
         
-        print("✅ Respuesta generada")
+        if cache_query:
+            cache.put(cache_query, response.content)
+        
+        logger.debug("Respuesta generada: %s", response.content)
         state["messages"].append(response)
         return state
     
     return generate_response
 
-def remember_interaction(state: AgentState, memory) -> AgentState:
-    """Guarda la interacción en la memoria y actualiza el contexto conversacional"""
-    print("\n💾 Guardando interacción en memoria...")
+async def remember_interaction(state: AgentState, config: RunnableConfig) -> AgentState:
+    """Registra la interacción en la memoria de la sesión.
+
+    La memoria de la sesión llega en ``config["configurable"]["memory"]`` para que
+    el grafo compilado pueda compartirse entre todas las peticiones. Con
+    write-behind el turno solo se encola y se guarda después de responder. Si
+    Redis falla al guardar en línea, el turno se descarta y se cuenta en
+    ``agent_memory_dropped_turns_total``.
+    """
+    memory = config.get("configurable", {}).get("memory")
+    if memory is None:
+        logger.debug("No hay memoria configurada para la sesión")
+        return state
     
     if len(state["messages"]) >= 2:
-        memory.save_context(
-            {"input": state["messages"][-2].content},
-            {"output": state["messages"][-1].content}
-        )
-        chat_history = memory.load_memory_variables({})["chat_history"]
-        state["chat_history"] = chat_history
-        print("✅ Memoria actualizada")
+        try:
+            await memory.arecord_turn(
+                state["messages"][-2].content,
+                state["messages"][-1].content
+            )
+        except (RedisError, OSError) as e:
+            # La respuesta ya está generada: se entrega aunque el turno no quede guardado
+            MEMORY_DROPPED_TURNS.inc(1)
+            logger.error("Se descarta el turno, Redis no disponible (%s: %s)", type(e).__name__, e)
+            return state
+        logger.debug("Turno registrado en memoria")
     return state
 
-async def create_agent_graph(retriever: BaseRetriever, llm: ChatOpenAI, memory) -> Graph:
+def session_config(memory, deadline: Deadline | None = None) -> RunnableConfig:
+    """Construye la configuración de ejecución con la memoria de la sesión y el
+    presupuesto de tiempo de la petición"""
+    return {"configurable": {"memory": memory, "deadline": deadline}}
+
+async def create_agent_graph(
+    retriever: BaseRetriever,
+    llm: BaseChatModel,
+    cache: SemanticResponseCache | None = None,
+    packer: ContextPacker | None = None,
+    coalescer: RequestCoalescer | None = None,
+    upstream: UpstreamPolicy | None = None,
+    tiers: TierRouter | None = None
+) -> Graph:
+    """Construye y compila el grafo del agente.
+
+    El grafo no depende de la sesión: se compila una sola vez al iniciar la
+    aplicación y la memoria se entrega en cada invocación con ``session_config``.
+    Sin ``tiers`` todas las respuestas usan ``llm``.
+    """
+    # Plazos y circuitos compartidos por todas las peticiones
+    upstream = upstream or setup_upstream_policy()
     workflow = StateGraph(AgentState)
     
-    # Agregar nodos
-    workflow.add_node("evaluate", evaluate_need_for_context)
-    workflow.add_node("retrieve", create_retrieval_chain(retriever))
-    workflow.add_node("respond", create_response_chain(llm))
-    workflow.add_node("remember", lambda state: remember_interaction(state, memory))
+    # Agregar nodos, cada uno con su histograma de duración
+    workflow.add_node("evaluate", instrument_node("evaluate", evaluate_need_for_context))
+    workflow.add_node("retrieve", instrument_node("retrieve", create_retrieval_chain(retriever, coalescer, upstream)))
+    workflow.add_node("history", instrument_node("history", create_history_loading(upstream)))
+    workflow.add_node("pack", instrument_node("pack", create_context_packing(packer or setup_context_packer())))
+    workflow.add_node("respond", instrument_node("respond", create_response_chain(llm, cache, coalescer, upstream, tiers)))
+    workflow.add_node("remember", instrument_node("remember", remember_interaction))
     
     # Definir el flujo
     workflow.set_entry_point("evaluate")
@@ -353,13 +343,16 @@ async def create_agent_graph(retriever: BaseRetriever, llm: ChatOpenAI, memory)
         lambda x: x["next_step"],
         {
             "retrieve": "retrieve",
-            "respond": "respond"
+            "respond": "history"
         }
     )
     
-    # Continuar el flujo
-    workflow.add_edge("retrieve", "respond")
+    # Continuar el flujo; en la ruta con búsqueda, "retrieve" también carga el historial
+    workflow.add_edge("history", "respond")
+    workflow.add_edge("retrieve", "pack")
+    workflow.add_edge("pack", "respond")
     workflow.add_edge("respond", "remember")
     
     # Compilar el grafo
-    return workflow.compile(debug=True) 
\ No newline at end of file
+    # La salida detallada de LangGraph escribe a stdout: solo con LOG_LEVEL=DEBUG
+    return workflow.compile(debug=logger.isEnabledFor(logging.DEBUG)) 
\ No newline at end of file
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable
+import numpy as np
+from pydantic import BaseModel, ValidationError
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import HumanMessage
+from src.cache.embedding_cache import CachedEmbeddings
+from src.graph.agent import session_config
+from src.schemas import UserData
+
+logger = logging.getLogger(__name__)
+
+class BatchItem(BaseModel):
+    """Una pregunta del lote con el perfil del usuario (formato de ``/chat``)"""
+    # Se devuelve tal cual en el resultado; los lotes suelen numerar las preguntas
+    id: str | int | None = None
+    user_message: str
+    agent_name: str = "Alexandra"
+    # Mismo perfil que ``/chat``: un ítem mal formado se rechaza al leer el lote
+    user_data: UserData | None = None
+
+def parse_batch(lines: Iterable[str]) -> list[BatchItem]:
+    """Lee un lote en formato JSONL; las líneas vacías se ignoran"""
+    items = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            items.append(BatchItem(**json.loads(line)))
+        except (json.JSONDecodeError, TypeError, ValidationError) as e:
+            raise ValueError(f"Línea {number} inválida: {e}") from e
+    return items
+
+class RateLimiter:
+    """Espacia las peticiones al proveedor y pausa a todos los workers tras un 429"""
+
+    def __init__(self, requests_per_minute: float | None = None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+def retry_after(error: Exception, default: float) -> float:
+    """Segundos de espera indicados por el proveedor en ``Retry-After``"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", default))
+    except (TypeError, ValueError):
+        return default
+
+@dataclass
+class BatchReport:
+    items: int = 0
+    errors: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "retries": self.retries,
+            "elapsed_s": round(self.elapsed, 3),
+            "items_per_second": round(self.items / self.elapsed, 3) if self.elapsed else 0.0,
+            "latency_ms": {
+                "mean": round(float(latencies.mean()) * 1000, 1),
+                "p50": round(float(np.percentile(latencies, 50)) * 1000, 1),
+                "p95": round(float(np.percentile(latencies, 95)) * 1000, 1)
+            }
+        }
+
+def initial_state(item: BatchItem) -> dict:
+    return {
+        "messages": [HumanMessage(content=item.user_message)],
+        "agent_name": item.agent_name,
+        "user_data": item.user_data.model_dump() if item.user_data else {}
+    }
+
+async def run_batch(
+    agent,
+    items: list[BatchItem],
+    embeddings: Embeddings | None = None,
+    concurrency: int = 8,
+    requests_per_minute: float | None = None,
+    max_retries: int = 3,
+    report: BatchReport | None = None
+) -> AsyncIterator[dict]:
+    """Ejecuta el lote con concurrencia acotada y emite cada resultado al terminar.
+
+    Con el caché de embeddings activo (``CachedEmbeddings``), los embeddings
+    de todas las preguntas se calculan antes en una sola llamada al proveedor
+    y la búsqueda y el caché semántico de cada ítem los reutilizan. Sin caché
+    no habría dónde reutilizarlos, así que cada ítem calcula el suyo. Los
+    ítems no usan memoria de sesión. Los resultados se emiten en orden de
+    término con su ``index``.
+    """
+    from openai import RateLimitError
+
+    report = report if report is not None else BatchReport()
+    start = time.perf_counter()
+
+    if isinstance(embeddings, CachedEmbeddings) and items:
+        await embeddings.aembed_documents(list(dict.fromkeys(item.user_message for item in items)))
+    elif embeddings is not None and items:
+        logger.info("Lote sin caché de embeddings (EMBEDDING_CACHE_BACKEND=none): un embedding por ítem")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_minute)
+
+    async def run_item(index: int, item: BatchItem) -> dict:
+        async with semaphore:
+            item_start = time.perf_counter()
+            for attempt in range(max_retries + 1):
+                await limiter.wait()
+                try:
+                    result = await agent.ainvoke(initial_state(item), config=session_config(None))
+                    response = result["messages"][-1].content
+                    error = None
+                    break
+                except RateLimitError as e:
+                    if attempt == max_retries:
+                        response, error = None, str(e)
+                        break
+                    report.retries += 1
+                    limiter.pause(retry_after(e, 2 ** attempt))
+                except Exception as e:
+                    response, error = None, str(e)
+                    break
+            latency = time.perf_counter() - item_start
+
+        report.items += 1
+        report.latencies.append(latency)
+        if error:
+            report.errors += 1
+        return {"index": index, "id": item.id, "response": response, "error": error, "latency_ms": round(latency * 1000, 1)}
+
+    tasks = [asyncio.create_task(run_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Si el cliente se desconecta, cancelar los ítems pendientes
+        for task in tasks:
+            task.cancel()
+        report.elapsed = time.perf_counter() - start
+
+def batch_settings() -> dict:
+    """Concurrencia y límite de peticiones por minuto de ``BATCH_CONCURRENCY`` y ``BATCH_REQUESTS_PER_MINUTE``"""
+    rpm = os.getenv("BATCH_REQUESTS_PER_MINUTE")
+    return {
+        "concurrency": int(os.getenv("BATCH_CONCURRENCY", "8")),
+        "requests_per_minute": float(rpm) if rpm else None
+    }
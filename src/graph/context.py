@@ -0,0 +1,131 @@
+import os
+import re
+from dataclasses import dataclass, field
+from langchain_core.documents import Document
+from src.tools.text import fold_accents
+from src.tools.tokens import count_tokens
+
+WORD_PATTERN = re.compile(r"\w+")
+
+@dataclass
+class PackedContext:
+    """Contexto listo para el prompt y las fuentes citables que contiene"""
+    context: str = ""
+    sources: str = ""
+    urls: list[str] = field(default_factory=list)
+    documents: list[Document] = field(default_factory=list)
+    tokens: int = 0
+
+def shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    """Secuencias de ``size`` palabras normalizadas, para comparar chunks"""
+    words = WORD_PATTERN.findall(fold_accents(text))
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def chunk_position(document: Document) -> int | None:
+    """Posición del chunk dentro de su documento según el ``chunk_id`` de la ingesta"""
+    chunk_id = document.metadata.get("chunk_id", "")
+    _, _, index = chunk_id.rpartition("-")
+    return int(index) if index.isdigit() else None
+
+def strip_overlap(previous: str, text: str, probe: int = 30) -> str:
+    """Quita el inicio de ``text`` que repite el final de ``previous`` (solape del splitter)"""
+    head = text[:probe]
+    if len(head) < probe:
+        return text
+    start = previous.rfind(head)
+    if start < 0:
+        return text
+    overlap = previous[start:]
+    return text[len(overlap):].lstrip() if text.startswith(overlap) else text
+
+class ContextPacker:
+    """Arma el contexto del prompt a partir de los chunks recuperados.
+
+    Descarta chunks casi duplicados, agrupa los chunks de una misma URL bajo
+    una sola referencia ``[link_i]`` y agrega chunks en orden de relevancia
+    mientras quepan en ``token_budget``. El chunk más relevante siempre se
+    incluye. Las referencias se numeran solo con las fuentes que quedan.
+    """
+
+    def __init__(self, token_budget: int = 2000, dedup_threshold: float = 0.8, max_chunks_per_source: int = 3):
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        self.max_chunks_per_source = max_chunks_per_source
+
+    def select(self, documents: list[Document]) -> list[Document]:
+        """Chunks que entran al contexto, en orden de relevancia"""
+        selected: list[Document] = []
+        seen: list[set] = []
+        per_source: dict[str, int] = {}
+        used = 0
+        for document in documents:
+            url = document.metadata.get("url_source", "#")
+            if per_source.get(url, 0) >= self.max_chunks_per_source:
+                continue
+            words = shingles(document.page_content)
+            if any(jaccard(words, other) >= self.dedup_threshold for other in seen):
+                continue
+            tokens = count_tokens(document.page_content)
+            if selected and used + tokens > self.token_budget:
+                continue
+            selected.append(document)
+            seen.append(words)
+            per_source[url] = per_source.get(url, 0) + 1
+            used += tokens
+        return selected
+
+    @staticmethod
+    def _header(index: int, document: Document) -> str:
+        metadata = document.metadata
+        return (
+            f"[link_{index}] {metadata.get('title', 'Sin título')} | "
+            f"{metadata.get('source_domain', 'Dominio no especificado')} | "
+            f"{metadata.get('estimated_published_time', 'Fecha no especificada')}"
+        )
+
+    def pack(self, documents: list[Document]) -> PackedContext:
+        selected = self.select(documents)
+        if not selected:
+            return PackedContext()
+
+        # Agrupar por URL conservando el orden de relevancia de su mejor chunk
+        groups: dict[str, list[Document]] = {}
+        for document in selected:
+            groups.setdefault(document.metadata.get("url_source", "#"), []).append(document)
+
+        entries = []
+        sources = []
+        for index, (url, chunks) in enumerate(groups.items(), 1):
+            # Dentro de una fuente, leer los chunks en el orden del documento original
+            if all(chunk_position(chunk) is not None for chunk in chunks):
+                chunks = sorted(chunks, key=chunk_position)
+            texts = []
+            for chunk in chunks:
+                text = chunk.page_content.strip()
+                texts.append(strip_overlap(texts[-1], text) if texts else text)
+            entries.append(self._header(index, chunks[0]) + "\n" + "\n".join(texts))
+            sources.append(f'<a href="{url}" target="_blank">link_{index}</a>')
+
+        context = "\n\n".join(entries)
+        return PackedContext(
+            context=context,
+            sources=", ".join(sources),
+            urls=list(groups),
+            documents=selected,
+            tokens=count_tokens(context)
+        )
+
+def setup_context_packer() -> ContextPacker:
+    """Crea el empaquetador de contexto con el presupuesto de ``CONTEXT_TOKEN_BUDGET``"""
+    return ContextPacker(
+        token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000")),
+        dedup_threshold=float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8")),
+        max_chunks_per_source=int(os.getenv("CONTEXT_MAX_CHUNKS_PER_SOURCE", "3"))
+    )
@@ -0,0 +1,185 @@
+import math
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from src.tools.tokens import count_tokens
+from src.observability.metrics import LLM_TOKENS, LLM_TIER_TOKENS
+
+# El caché de prompts de OpenAI solo se activa con prefijos idénticos desde
+# 1024 tokens; con menos, ``cached_prefix_tokens`` queda en 0
+PROVIDER_CACHE_MIN_TOKENS = 1024
+
+# Extensión máxima de la respuesta con contexto; también limita sus tokens de salida
+MAX_ANSWER_WORDS = 250
+# Tokens por palabra en español, con margen para el formato Markdown
+TOKENS_PER_WORD = 2.0
+
+# Instrucciones estáticas, sin datos de la petición. Con menos de
+# ``PROVIDER_CACHE_MIN_TOKENS`` el proveedor no las cachea (ver README).
+CONTEXT_INSTRUCTIONS = f"""Eres un asistente experto en jubilacion y pensiones.
+Conoces mucho sobre los temas previsionales y puedes dar una explicacion general de los temas previsionales.
+Siempre que puedas, da consejos y recomendaciones generales sobre los temas previsionales.
+Tienes amplio conocimiento sobre la reforma previsional y las modificaciones que se han realizado.
+
+Recibirás los datos del usuario, la fecha actual, el historial de la conversación, el contexto relevante y las referencias disponibles.
+
+Instrucciones especiales:
+    - No debes inventar información, solo debes usar el contexto y las referencias.
+    - No debes realizar calculos financieros, solo debes dar una explicacion general.
+    - Si el usuario te pide un calculo de pension indica que puede ocupar la calculadora de pesiones disponible en la pagina principal.
+    - Evita llamar al usuario por su nombre ni le digas "Estimado".
+    - No es necesario que digas tu nombre al principio de la respuesta.
+    - Tu objetivo es ayudar al usuario a entender los temas previsionales.
+
+Instrucciones de formato y estilo:
+    1. Extensión
+    - Máximo {MAX_ANSWER_WORDS} palabras
+    - Oraciones cortas y directas
+
+    2. Estructura
+    - Introducción breve (2-3 líneas)
+    - 1 a 3 subtítulos con "##"
+    - Puntos clave con "-"
+    - Conclusión breve (opcional)
+
+    3. Formato
+    - **Negrita** para conceptos clave
+    - *Cursiva* para términos importantes
+    - > para una cita (máx. 1)
+    - Una línea en blanco entre secciones
+
+    4. Fuentes
+    - Una línea en blanco antes de "Fuentes:"
+    - Lista solo las fuentes realmente usadas, copiando los enlaces de las referencias disponibles
+
+Ejemplo de respuesta ideal:
+
+    Introducción breve que presenta el tema principal.
+
+    ## Aspectos Clave
+
+    - **Primer punto**: explicación concisa
+    - **Segundo punto**: explicación concisa
+    - **Tercer punto**: explicación concisa
+
+    > Cita relevante (si es necesaria)
+
+    Fuentes:
+    <a href="https://..." target="_blank">link_1</a>, <a href="https://..." target="_blank">link_2</a>
+
+Responde de manera amable, cercana y amigable."""
+
+SIMPLE_INSTRUCTIONS = """Eres un asistente experto en jubilacion y pensiones.
+Conoces mucho sobre los temas previsionales y puedes dar una explicacion general de los temas previsionales.
+Siempre que puedas, da consejos y recomendaciones generales sobre los temas previsionales.
+Tienes amplio conocimiento sobre la reforma previsional y las modificaciones que se han realizado.
+
+Recibirás los datos del usuario, la fecha actual y el historial de la conversación.
+
+Instrucciones especiales:
+- No debes responder preguntas que no estén relacionadas con los temas previsionales.
+- No puedes realizar asesoria financiera especifica, si el usuario te lo solicita, da consejos generales relacionados con el tema previsional.
+- No debes realizar calculos financieros, solo debes dar una explicacion general.
+- Si el usuario te pide un calculo de pension indica que puede ocupar la calculadora de pesiones disponible en la pagina principal.
+- Evita llamar al usuario por su nombre ni le digas "Estimado".
+- No es necesario que digas tu nombre al principio de la respuesta.
+- No finalices tu respuesta preguntando "¿En qué puedo ayudarte más?" salvo que sea apropiado.
+- Si detectas que la conversacion ha terminado, despidete de manera amable.
+- No extiendas tus respuestas mas de lo necesario. Prefiere ser conciso y directo.
+
+Responde de manera cordial, amable, y amigable."""
+
+# Datos de la petición, después del prefijo estático. Van de los que menos
+# cambian (agente, fecha, hora al minuto) a los que cambian en cada petición;
+# alargaría el prefijo cacheable solo si las instrucciones llegaran al mínimo
+SESSION_TEMPLATE = """Tu nombre es {agent_name} y tu genero esta determinado por tu nombre.
+
+Información temporal actual:
+- Fecha: {date}
+- Zona horaria: {timezone}
+- Hora: {time}
+
+Información del usuario:
+- Nombre: {user_name}
+- Género: {user_gender}
+- Edad: {user_age} años
+- Nivel de estudios: {user_education}
+
+Historial de la conversación:
+{chat_history}"""
+
+CONTEXT_QUESTION_TEMPLATE = """Contexto relevante:
+{context}
+
+Referencias disponibles:
+{sources}
+
+Pregunta actual: {question}"""
+
+def answer_token_cap(sources: str = "") -> int:
+    """Máximo de tokens de salida de la ruta con contexto: ``MAX_ANSWER_WORDS`` más el bloque de fuentes"""
+    return math.ceil(MAX_ANSWER_WORDS * TOKENS_PER_WORD) + count_tokens(sources)
+
+class CompiledChatPrompt:
+    """Prompt de chat con un prefijo estático ya construido y plantillas dinámicas.
+
+    Los mensajes del prefijo se crean una sola vez y se reutilizan tal cual en
+    cada petición, de modo que el inicio del prompt es idéntico byte a byte.
+    Solo se formatean las plantillas de los mensajes dinámicos.
+    """
+
+    def __init__(self, static: str, dynamic: list[tuple[type[BaseMessage], str]]):
+        self.prefix = [SystemMessage(content=static)]
+        self.dynamic = dynamic
+
+    def format_messages(self, **values) -> list[BaseMessage]:
+        return self.prefix + [message_class(content=template.format(**values)) for message_class, template in self.dynamic]
+
+# Plantillas compiladas una sola vez al importar el módulo
+CONTEXT_PROMPT = CompiledChatPrompt(CONTEXT_INSTRUCTIONS, [
+    (SystemMessage, SESSION_TEMPLATE),
+    (HumanMessage, CONTEXT_QUESTION_TEMPLATE)
+])
+
+SIMPLE_PROMPT = CompiledChatPrompt(SIMPLE_INSTRUCTIONS, [
+    (SystemMessage, SESSION_TEMPLATE),
+    (HumanMessage, "{question}")
+])
+
+class PromptUsage:
+    """Tokens de prompt por llamada y cuántos vinieron del prefijo en caché del proveedor"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, response: BaseMessage, messages: list[BaseMessage], tier: str | None = None) -> tuple[int, int]:
+        usage = getattr(response, "usage_metadata", None) or {}
+        # Sin datos de uso (p. ej. modelos de prueba) se cuenta localmente
+        prompt_tokens = usage.get("input_tokens") or sum(count_tokens(message.content) for message in messages)
+        completion_tokens = usage.get("output_tokens") or count_tokens(response.content)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        LLM_TOKENS.inc(prompt_tokens, "prompt")
+        LLM_TOKENS.inc(completion_tokens, "completion")
+        LLM_TOKENS.inc(cached_tokens, "cached_prompt")
+        if tier:
+            LLM_TIER_TOKENS.inc(prompt_tokens, tier, "prompt")
+            LLM_TIER_TOKENS.inc(completion_tokens, tier, "completion")
+        return prompt_tokens, cached_tokens
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prefix_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "static_prefix_tokens": {
+                "context": count_tokens(CONTEXT_INSTRUCTIONS),
+                "simple": count_tokens(SIMPLE_INSTRUCTIONS)
+            },
+            "provider_cache_min_tokens": PROVIDER_CACHE_MIN_TOKENS
+        }
+
+prompt_usage = PromptUsage()
@@ -0,0 +1,314 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables.config import ensure_config, merge_configs
+from src.observability.metrics import UPSTREAM_FAILURES, LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class UpstreamError(Exception):
+    """Falla de un proveedor que la API traduce a un código HTTP propio en vez de un 500"""
+    status_code = 502
+    retry_after: float | None = None
+
+class DeadlineExceeded(UpstreamError):
+    status_code = 504
+
+class CircuitOpenError(UpstreamError):
+    status_code = 503
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} no disponible temporalmente")
+        self.retry_after = retry_after
+
+class Deadline:
+    """Presupuesto de tiempo de una petición, repartido entre sus etapas"""
+
+    def __init__(self, seconds: float | None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def timeout(self, cap: float | None = None) -> float | None:
+        """Tiempo para una etapa: lo que queda del presupuesto, como máximo ``cap``"""
+        remaining = self.remaining()
+        if cap is None:
+            return remaining
+        return cap if remaining is None else min(cap, remaining)
+
+class CircuitBreaker:
+    """Circuito de una dependencia: tras ``failure_threshold`` fallas seguidas
+    (errores o timeouts) rechaza las llamadas de inmediato durante
+    ``reset_timeout`` segundos, y luego deja pasar una sola de prueba.
+    Con ``failure_threshold=0`` el circuito nunca se abre.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def _allow(self) -> None:
+        state = self.state
+        if state == "closed" or (state == "half_open" and not self._probing):
+            self._probing = state == "half_open"
+            return
+        UPSTREAM_FAILURES.inc(1, self.name, "circuit_open")
+        raise CircuitOpenError(self.name, retry_after=max(self.opened_at + self.reset_timeout - time.monotonic(), 1.0))
+
+    def _record(self, ok: bool) -> None:
+        self._probing = False
+        if ok:
+            if self.opened_at is not None:
+                logger.info("Circuito de %s cerrado", self.name)
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failure_threshold and (self.opened_at is not None or self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                logger.warning("Circuito de %s abierto tras %d fallas seguidas", self.name, self.failures)
+            self.opened_at = time.monotonic()
+
+    async def call(self, operation: Callable[[], Awaitable[T]], timeout: float | None = None) -> T:
+        """Ejecuta ``operation`` con timeout, contando el resultado en el circuito"""
+        if timeout is not None and timeout <= 0:
+            raise DeadlineExceeded(f"Sin tiempo restante para {self.name}")
+        self._allow()
+        try:
+            result = await asyncio.wait_for(operation(), timeout)
+        except TimeoutError:
+            self._record(False)
+            UPSTREAM_FAILURES.inc(1, self.name, "timeout")
+            raise DeadlineExceeded(f"{self.name} no respondió en {timeout:.1f} s") from None
+        except asyncio.CancelledError:
+            # La petición se canceló: no dice nada sobre la dependencia
+            self._probing = False
+            raise
+        except Exception as e:
+            # Un 4xx (p. ej. 429 por límite de tasa) no indica que el proveedor esté caído
+            status = getattr(e, "status_code", None)
+            self._record(isinstance(status, int) and 400 <= status < 500)
+            UPSTREAM_FAILURES.inc(1, self.name, "error")
+            raise
+        self._record(True)
+        return result
+
+class LatencyTracker:
+    """Latencias recientes del LLM; el percentil define cuándo cubrir una llamada lenta"""
+
+    def __init__(self, percentile: float = 0.95, window: int = 200, min_samples: int = 20, min_delay: float = 2.0):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def threshold(self) -> float | None:
+        """Segundos tras los que se lanza la segunda petición; ``None`` sin datos suficientes"""
+        if not self.percentile or len(self.samples) < self.min_samples:
+            return None
+        return max(float(np.percentile(self.samples, self.percentile * 100)), self.min_delay)
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    backup: Callable[[], Awaitable[T]],
+    delay: float | None,
+    committed: asyncio.Event | None = None
+) -> T:
+    """Ejecuta ``primary`` y, si tras ``delay`` segundos no terminó, lanza ``backup``.
+
+    Gana la primera que termine bien y la otra se cancela. Si la principal ya
+    se comprometió (``committed``, p. ej. empezó a transmitir tokens), la de
+    respaldo se descarta y se espera a la principal.
+    """
+    first = asyncio.ensure_future(primary())
+    if delay is None:
+        return await first
+
+    commit = asyncio.ensure_future(committed.wait()) if committed else None
+    tasks = [first, commit]
+    try:
+        done, _ = await asyncio.wait({t for t in tasks if t}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+        if done:
+            return await first
+
+        LLM_HEDGES.inc(1, "launched")
+        second = asyncio.ensure_future(backup())
+        tasks.append(second)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, _ = await asyncio.wait(pending | ({commit} if commit and not commit.done() else set()), return_when=asyncio.FIRST_COMPLETED)
+            if commit is not None and commit.done() and first in pending:
+                second.cancel()
+                LLM_HEDGES.inc(1, "primary")
+                return await first
+            for task in (first, second):
+                if task in done and task in pending:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        LLM_HEDGES.inc(1, "primary" if task is first else "backup")
+                        return task.result()
+                    error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if task is not None and not task.done():
+                task.cancel()
+
+class _FirstToken(BaseCallbackHandler):
+    """Marca cuándo el LLM empieza a transmitir la respuesta"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.event = asyncio.Event()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.event.set()
+
+class UpstreamPolicy:
+    """Plazos, cobertura de latencia y circuitos de las llamadas del grafo a proveedores.
+
+    - La búsqueda tiene como máximo ``retrieval_timeout`` segundos del
+      presupuesto; si vence, falla o su circuito está abierto, el grafo
+      responde sin contexto (prompt simple) en vez de fallar.
+    - El historial de la sesión tiene como máximo ``history_timeout``
+      segundos; si Redis no responde a tiempo se responde sin historial.
+    - El LLM usa lo que queda del presupuesto. Si una llamada supera el
+      percentil ``hedge`` de las latencias recientes de su nivel de modelo
+      sin haber empezado a transmitir, se lanza una segunda y gana la
+      primera que termine.
+    - Con el circuito del LLM abierto las peticiones fallan de inmediato (503).
+    """
+
+    def __init__(
+        self,
+        request_timeout: float | None = 45.0,
+        retrieval_timeout: float | None = 5.0,
+        hedge: LatencyTracker | None = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        history_timeout: float | None = 2.0
+    ):
+        self.request_timeout = request_timeout
+        self.retrieval_timeout = retrieval_timeout
+        self.history_timeout = history_timeout
+        self.hedge = hedge
+        # Un registro de latencias por nivel de modelo; "full" usa ``hedge``
+        self.hedges: dict[str, LatencyTracker] = {"full": hedge} if hedge else {}
+        self.retrieval_breaker = CircuitBreaker("retrieval", failure_threshold, reset_timeout)
+        self.llm_breaker = CircuitBreaker("llm", failure_threshold, reset_timeout)
+
+    def deadline(self) -> Deadline:
+        return Deadline(self.request_timeout)
+
+    async def retrieve(self, search: Callable[[], Awaitable[list[Document]]], deadline: Deadline) -> list[Document] | None:
+        """Documentos de la búsqueda, o ``None`` si hay que responder sin contexto"""
+        try:
+            return await self.retrieval_breaker.call(search, deadline.timeout(self.retrieval_timeout))
+        except Exception as e:
+            logger.warning("Búsqueda no disponible, respondiendo sin contexto (%s: %s)", type(e).__name__, e)
+            return None
+
+    def hedge_for(self, tier: str) -> LatencyTracker | None:
+        if self.hedge is None:
+            return None
+        if tier not in self.hedges:
+            self.hedges[tier] = LatencyTracker(
+                self.hedge.percentile, self.hedge.samples.maxlen, self.hedge.min_samples, self.hedge.min_delay
+            )
+        return self.hedges[tier]
+
+    async def complete(
+        self,
+        llm: BaseChatModel,
+        messages: list[BaseMessage],
+        deadline: Deadline,
+        tier: str = "full",
+        **kwargs
+    ) -> AIMessage:
+        """Llama al LLM dentro del presupuesto restante, con cobertura y circuito.
+
+        ``kwargs`` (p. ej. ``max_tokens``) se envían al proveedor en cada llamada.
+        """
+        hedge = self.hedge_for(tier)
+
+        async def call() -> AIMessage:
+            start = time.perf_counter()
+            if hedge is None:
+                return await llm.ainvoke(messages, **kwargs)
+
+            first_token = _FirstToken()
+            # La principal conserva los callbacks del grafo (tokens del streaming);
+            # la de respaldo va sin ellos para no duplicar tokens en el cliente
+            config = merge_configs(ensure_config(), {"callbacks": [first_token]})
+            response = await hedged(
+                lambda: llm.ainvoke(messages, config=config, **kwargs),
+                lambda: llm.ainvoke(messages, config={"callbacks": []}, **kwargs),
+                hedge.threshold(),
+                committed=first_token.event
+            )
+            hedge.observe(time.perf_counter() - start)
+            return response
+
+        return await self.llm_breaker.call(call, deadline.timeout())
+
+    def stats(self) -> dict:
+        return {
+            "circuits": {b.name: b.state for b in (self.retrieval_breaker, self.llm_breaker)},
+            "hedge_after_s": {tier: tracker.threshold() for tier, tracker in self.hedges.items()}
+        }
+
+def _seconds(name: str, default: str) -> float | None:
+    """Segundos desde una variable de entorno; ``0`` desactiva el límite"""
+    value = float(os.getenv(name, default))
+    return value or None
+
+def setup_upstream_policy() -> UpstreamPolicy:
+    """Crea la política con ``REQUEST_TIMEOUT``, ``RETRIEVAL_TIMEOUT``, ``HISTORY_TIMEOUT``,
+    ``LLM_HEDGE_PERCENTILE``, ``LLM_HEDGE_MIN_DELAY``, ``LLM_HEDGE_MIN_SAMPLES``,
+    ``CIRCUIT_FAILURE_THRESHOLD`` y ``CIRCUIT_RESET_TIMEOUT``
+    """
+    percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    hedge = LatencyTracker(
+        percentile=percentile,
+        min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+        min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+    ) if percentile else None
+    return UpstreamPolicy(
+        request_timeout=_seconds("REQUEST_TIMEOUT", "45"),
+        retrieval_timeout=_seconds("RETRIEVAL_TIMEOUT", "5"),
+        hedge=hedge,
+        failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30")),
+        history_timeout=_seconds("HISTORY_TIMEOUT", "2")
+    )
@@ -0,0 +1,41 @@
+import os
+import re
+import json
+from pathlib import Path
+from typing import Iterable
+from src.tools.text import fold_accents
+
+DEFAULT_KEYWORDS_PATH = Path(__file__).parent.parent / "config" / "routing_keywords.json"
+
+def load_keywords(path: str | Path | None = None) -> list[str]:
+    """Lee las palabras clave desde JSON (lista o diccionario de categorías a listas)"""
+    path = Path(path or os.getenv("ROUTING_KEYWORDS_PATH") or DEFAULT_KEYWORDS_PATH)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        return [keyword for keywords in data.values() for keyword in keywords]
+    return list(data)
+
+class KeywordRouter:
+    """Detecta temas previsionales con una única expresión regular compilada.
+
+    Las palabras clave y el mensaje se comparan sin tildes ni mayúsculas, solo
+    como palabras completas ("sp" no coincide dentro de "espero") y aceptando
+    el plural ("afp" coincide con "afps").
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        folded = sorted({fold_accents(keyword).strip() for keyword in keywords if keyword.strip()}, key=len, reverse=True)
+        alternatives = [r"\s+".join(re.escape(word) for word in keyword.split()) for keyword in folded]
+        self.keywords = folded
+        self.pattern = re.compile(r"\b(?:" + "|".join(alternatives) + r")(?:e?s)?\b")
+
+    def match(self, text: str) -> str | None:
+        """Retorna la primera palabra clave encontrada en el texto"""
+        found = self.pattern.search(fold_accents(text))
+        return found.group(0) if found else None
+
+    def needs_context(self, text: str) -> bool:
+        return self.match(text) is not None
+
+# Se compila una sola vez al importar el módulo
+pension_router = KeywordRouter(load_keywords())
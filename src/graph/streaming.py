@@ -0,0 +1,67 @@
+import json
+import logging
+from typing import AsyncIterator, Any
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableConfig
+from src.graph.resilience import UpstreamError
+
+logger = logging.getLogger(__name__)
+
+def sse_event(event: str, data: Any) -> str:
+    """Formatea un evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_agent_events(agent, initial_state: dict, config: RunnableConfig) -> AsyncIterator[str]:
+    """Ejecuta el grafo y emite su progreso como eventos SSE.
+
+    Orden de los eventos:
+        - ``status``: etapa que comienza (``retrieve`` o ``respond``)
+        - ``token``: fragmentos de la respuesta a medida que el LLM los genera
+        - ``sources``: bloque de fuentes de la respuesta (si hubo contexto)
+        - ``done``: el nodo ``remember`` ya registró la respuesta final
+        - ``error``: la ejecución falló después de enviar los encabezados (con
+          ``status`` 504 si venció el plazo, 503 si el LLM tiene el circuito abierto)
+    """
+    streamed = ""
+    try:
+        async for mode, chunk in agent.astream(
+            initial_state,
+            config=config,
+            stream_mode=["updates", "messages"]
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                # Solo fragmentos del LLM: el mensaje final que el nodo agrega al
+                # estado (con las fuentes) llega completo en la actualización de "respond"
+                if metadata.get("langgraph_node") != "respond" or not isinstance(message, AIMessageChunk):
+                    continue
+                text = message.content if isinstance(message.content, str) else ""
+                if text:
+                    streamed += text
+                    yield sse_event("token", {"text": text})
+                continue
+
+            for node, update in chunk.items():
+                if node == "evaluate":
+                    yield sse_event("status", {"stage": update["next_step"]})
+                elif node == "pack":
+                    yield sse_event("status", {"stage": "respond"})
+                elif node == "respond":
+                    final_text = update["messages"][-1].content
+                    # El bloque "Fuentes:" se agrega después de la generación
+                    for prefix in (streamed, streamed.strip()):
+                        if final_text.startswith(prefix):
+                            if len(final_text) > len(prefix):
+                                yield sse_event("token", {"text": final_text[len(prefix):]})
+                            break
+                    if update.get("sources"):
+                        yield sse_event("sources", {"sources": update["sources"]})
+
+        yield sse_event("done", {})
+
+    except UpstreamError as e:
+        logger.warning("Error de proveedor en el chat (streaming, %s): %s", type(e).__name__, e)
+        yield sse_event("error", {"detail": str(e), "status": e.status_code})
+    except Exception:
+        logger.exception("Error en el chat (streaming)")
+        yield sse_event("error", {"detail": "Error interno al generar la respuesta", "status": 500})
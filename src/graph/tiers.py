@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from langchain_core.language_models import BaseChatModel
+
+@dataclass(frozen=True)
+class ModelTier:
+    """Un nivel de modelo: nombre para métricas y el cliente del LLM"""
+    name: str
+    llm: BaseChatModel
+
+class TierRouter:
+    """Elige el modelo de cada respuesta según la ruta, el contexto y el historial.
+
+    - ``light``: respuestas sin contexto (saludos, despedidas, preguntas fuera
+      de tema) y, si ``light_max_context_tokens`` lo permite, respuestas con
+      poco contexto; en ambos casos solo con un historial corto.
+    - ``full``: el resto, en particular las respuestas con varios documentos.
+
+    Sin modelo liviano todas las respuestas usan ``full``, como antes.
+    """
+
+    def __init__(
+        self,
+        full: BaseChatModel,
+        light: BaseChatModel | None = None,
+        light_max_history_tokens: int = 400,
+        light_max_context_tokens: int = 0
+    ):
+        self.full = ModelTier("full", full)
+        self.light = ModelTier("light", light) if light is not None else None
+        self.light_max_history_tokens = light_max_history_tokens
+        self.light_max_context_tokens = light_max_context_tokens
+
+    def choose(self, has_context: bool, context_tokens: int = 0, history_tokens: int = 0) -> ModelTier:
+        if self.light is None or history_tokens > self.light_max_history_tokens:
+            return self.full
+        if not has_context or context_tokens <= self.light_max_context_tokens:
+            return self.light
+        return self.full
+
+    @property
+    def cheapest(self) -> BaseChatModel:
+        """Modelo para tareas auxiliares, como resumir el historial"""
+        return (self.light or self.full).llm
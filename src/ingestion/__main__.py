@@ -0,0 +1,80 @@
+"""Ingesta del corpus (páginas de Previsión Social, artículos y videos) al vector store.
+
+Uso:
+    python -m src.ingestion --target local
+    python -m src.ingestion --target pinecone --raw-dir /ruta/al/scraper
+"""
+import os
+import asyncio
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+from src.config.embeddings_setup import setup_embeddings
+from src.ingestion.pipeline import IngestionPipeline, PineconeSink, LocalSnapshotSink
+from src.ingestion.sources import load_sources
+from src.observability.logs import setup_logging
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["pinecone", "local"], default=os.getenv("VECTORSTORE_BACKEND", "pinecone"))
+    parser.add_argument("--catalog-dir", default=".", help="carpeta con los catálogos JSON del corpus")
+    parser.add_argument("--raw-dir", default=".", help="carpeta base de los 'filepath' de artículos y videos")
+    parser.add_argument("--no-fetch", action="store_true", help="no descargar las páginas sin contenido local")
+    parser.add_argument("--manifest", help="ruta del manifiesto de hashes (por defecto, según el destino)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks por llamada de embeddings")
+    parser.add_argument("--concurrency", type=int, default=4, help="lotes de embeddings en paralelo")
+    parser.add_argument("--fetch-concurrency", type=int, default=8)
+    parser.add_argument("--full", action="store_true", help="re-embeber todo; los chunks que ya no existen se eliminan igual")
+    parser.add_argument("--build-ivf", action="store_true", help="construir el índice IVF del snapshot local")
+    parser.add_argument("--bm25-path", default=os.getenv("BM25_INDEX_PATH", "data/bm25_index"), help="carpeta del índice BM25")
+    parser.add_argument("--no-bm25", action="store_true", help="no construir el índice BM25 para la búsqueda híbrida")
+    return parser.parse_args()
+
+async def main() -> None:
+    load_dotenv()
+    args = parse_args()
+    setup_logging()
+    embeddings = setup_embeddings()
+    embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "")
+
+    if args.target == "local":
+        local_path = os.getenv("LOCAL_INDEX_PATH", "data/local_index")
+        sink = LocalSnapshotSink(local_path, embeddings, build_ivf=args.build_ivf, full=args.full)
+        manifest_path = Path(args.manifest or Path(local_path) / "ingestion_manifest.json")
+    else:
+        sink = PineconeSink(os.getenv("PINECONE_INDEX_NAME"), os.getenv("PINECONE_API_KEY", "").strip())
+        manifest_path = Path(args.manifest or "data/ingestion_manifest.pinecone.json")
+
+    pipeline = IngestionPipeline(
+        embeddings=embeddings,
+        sink=sink,
+        manifest_path=manifest_path,
+        embedding_model=embedding_model,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        full=args.full,
+        bm25_path=None if args.no_bm25 else Path(args.bm25_path)
+    )
+
+    print(f"🔄 Ingestando corpus en {args.target}...")
+    failed: set[str] = set()
+    sources = load_sources(
+        Path(args.catalog_dir),
+        Path(args.raw_dir),
+        fetch=not args.no_fetch,
+        concurrency=args.fetch_concurrency,
+        failed=failed
+    )
+    stats = await pipeline.run(sources, failed_urls=failed)
+
+    print("✅ Ingesta completada")
+    print(f"  - Documentos: {stats.documents} ({len(failed)} no disponibles)")
+    print(f"  - Chunks: {stats.chunks} ({stats.unchanged} sin cambios, {stats.embedded} embebidos, {stats.deleted} eliminados)")
+    print(f"  - Tiempo: {stats.elapsed:.1f} s ({stats.chunks_per_second:.1f} chunks/s)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
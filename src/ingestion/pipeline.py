@@ -0,0 +1,241 @@
+import logging
+import json
+import time
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Protocol
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.ingestion.sources import SourceDocument
+from src.vectorstores.local_index import LocalVectorStore, normalize_rows
+from src.retrieval.bm25 import BM25Builder, DOCUMENTS_FILE as BM25_DOCUMENTS_FILE
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    metadata: dict
+    content_hash: str
+
+@dataclass
+class IngestionStats:
+    documents: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    elapsed: float = 0.0
+    embed_time: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.embedded / self.elapsed if self.elapsed else 0.0
+
+def url_key(url: str) -> str:
+    """Prefijo estable de los ids de chunk de una URL"""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+def chunk_document(document: SourceDocument, splitter: RecursiveCharacterTextSplitter) -> list[Chunk]:
+    """Divide un documento en chunks con los metadatos que lee ``retrieve_context``"""
+    metadata = {
+        "title": document.title or "Sin título",
+        "url_source": document.url,
+        "source_domain": document.source_domain
+    }
+    # Pinecone no acepta metadatos nulos: se omite la fecha si no se conoce
+    if document.published_time:
+        metadata["estimated_published_time"] = document.published_time
+
+    chunks = []
+    for i, text in enumerate(splitter.split_text(document.text)):
+        chunk_id = f"{url_key(document.url)}-{i}"
+        content_hash = hashlib.sha256(json.dumps([text, metadata], sort_keys=True).encode("utf-8")).hexdigest()
+        chunks.append(Chunk(id=chunk_id, text=text, metadata={**metadata, "chunk_id": chunk_id}, content_hash=content_hash))
+    return chunks
+
+class VectorSink(Protocol):
+    """Destino de los vectores de la ingesta"""
+
+    async def upsert(self, chunks: list[Chunk], vectors: list[list[float]]) -> None: ...
+
+    async def delete(self, ids: list[str]) -> None: ...
+
+    async def finalize(self, manifest: dict) -> None: ...
+
+class PineconeSink:
+    """Escribe en el índice de Pinecone que lee ``setup_pinecone``"""
+
+    def __init__(self, index_name: str, api_key: str, batch_size: int = 100, namespace: str | None = None):
+        from pinecone import Pinecone as PineconeClient
+        self.index = PineconeClient(api_key=api_key).Index(index_name)
+        self.batch_size = batch_size
+        self.namespace = namespace
+
+    async def upsert(self, chunks: list[Chunk], vectors: list[list[float]]) -> None:
+        # langchain_pinecone lee el contenido desde metadata["text"]
+        records = [
+            {"id": chunk.id, "values": vector, "metadata": {**chunk.metadata, "text": chunk.text}}
+            for chunk, vector in zip(chunks, vectors)
+        ]
+        for start in range(0, len(records), self.batch_size):
+            await asyncio.to_thread(self.index.upsert, vectors=records[start:start + self.batch_size], namespace=self.namespace)
+
+    async def delete(self, ids: list[str]) -> None:
+        for start in range(0, len(ids), 1000):
+            await asyncio.to_thread(self.index.delete, ids=ids[start:start + 1000], namespace=self.namespace)
+
+    async def finalize(self, manifest: dict) -> None:
+        return None
+
+class LocalSnapshotSink:
+    """Escribe el snapshot del índice local, conservando los chunks sin cambios.
+
+    Con ``full`` (reconstrucción completa) parte de un snapshot vacío.
+    """
+
+    def __init__(self, path: str, embedding: Embeddings, build_ivf: bool = False, full: bool = False):
+        self.path = path
+        self.embedding = embedding
+        self.build_ivf = build_ivf
+        self._rows: dict[str, tuple[Document, np.ndarray]] = {}
+        if not full and (Path(path) / "vectors.npy").exists():
+            previous = LocalVectorStore.load(path, embedding, mmap=False)
+            for document, vector in zip(previous.documents, previous.vectors):
+                self._rows[document.metadata.get("chunk_id", "")] = (document, vector)
+
+    async def upsert(self, chunks: list[Chunk], vectors: list[list[float]]) -> None:
+        for chunk, vector in zip(chunks, normalize_rows(vectors)):
+            self._rows[chunk.id] = (Document(page_content=chunk.text, metadata=chunk.metadata), vector)
+
+    async def delete(self, ids: list[str]) -> None:
+        for chunk_id in ids:
+            self._rows.pop(chunk_id, None)
+
+    async def finalize(self, manifest: dict) -> None:
+        documents = [document for document, _ in self._rows.values()]
+        vectors = np.stack([vector for _, vector in self._rows.values()]) if self._rows else np.empty((0, 0), dtype=np.float32)
+        store = LocalVectorStore(self.embedding, vectors=vectors, documents=documents)
+        if self.build_ivf and documents:
+            store.build_ivf()
+        store.save(self.path, manifest={"embedding_model": manifest.get("embedding_model"), "updated_at": manifest.get("updated_at")})
+
+@dataclass
+class IngestionPipeline:
+    """Ingesta incremental: divide, embebe en lotes concurrentes y escribe en bloque.
+
+    Un manifiesto con el hash de contenido de cada chunk permite que las
+    siguientes ejecuciones solo embeban los chunks nuevos o modificados y
+    eliminen los que ya no existen.
+    """
+    embeddings: Embeddings
+    sink: VectorSink
+    manifest_path: Path
+    embedding_model: str
+    chunk_size: int = 1000
+    chunk_overlap: int = 150
+    batch_size: int = 64
+    concurrency: int = 4
+    full: bool = False
+    bm25_path: Path | None = None
+    stats: IngestionStats = field(default_factory=IngestionStats)
+
+    def load_manifest(self) -> tuple[dict, bool]:
+        """Chunks del manifiesto anterior y si sus vectores siguen sirviendo.
+
+        Con ``full`` o con otro modelo de embeddings se re-embebe todo, pero
+        los ids anteriores se conservan para eliminar los que ya no existen.
+        """
+        if not self.manifest_path.exists():
+            return {}, True
+        manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        # Con otro modelo de embeddings todos los vectores quedan obsoletos
+        if manifest.get("embedding_model") != self.embedding_model:
+            logger.warning("Cambió el modelo de embeddings: se re-embebe todo el corpus")
+            return manifest.get("chunks", {}), False
+        return manifest.get("chunks", {}), not self.full
+
+    async def _embed_and_upsert(self, batch: list[Chunk], semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            vectors = await self.embeddings.aembed_documents([chunk.text for chunk in batch])
+            self.stats.embed_time += time.perf_counter() - start
+            await self.sink.upsert(batch, vectors)
+            self.stats.embedded += len(batch)
+
+    async def run(self, sources: AsyncIterator[SourceDocument], failed_urls: set[str] | None = None) -> IngestionStats:
+        start = time.perf_counter()
+        previous, reusable = self.load_manifest()
+        current: dict[str, str] = {}
+        splitter = RecursiveCharacterTextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: list[asyncio.Task] = []
+        pending: list[Chunk] = []
+        # El índice BM25 se reconstruye con todos los chunks vigentes
+        bm25 = BM25Builder() if self.bm25_path else None
+
+        async for document in sources:
+            self.stats.documents += 1
+            for chunk in chunk_document(document, splitter):
+                self.stats.chunks += 1
+                current[chunk.id] = chunk.content_hash
+                if bm25:
+                    bm25.add(chunk.text, chunk.metadata)
+                if reusable and previous.get(chunk.id) == chunk.content_hash:
+                    self.stats.unchanged += 1
+                    continue
+                pending.append(chunk)
+                if len(pending) >= self.batch_size:
+                    tasks.append(asyncio.create_task(self._embed_and_upsert(pending, semaphore)))
+                    pending = []
+
+        if pending:
+            tasks.append(asyncio.create_task(self._embed_and_upsert(pending, semaphore)))
+        await asyncio.gather(*tasks)
+
+        # Conservar los chunks de fuentes que no se pudieron leer en esta ejecución,
+        # salvo en una reconstrucción completa: sus vectores ya no se reutilizan
+        failed_keys = {url_key(url) for url in failed_urls or set()} if reusable else set()
+        kept = []
+        for chunk_id, content_hash in previous.items():
+            if chunk_id not in current and chunk_id.rsplit("-", 1)[0] in failed_keys:
+                current[chunk_id] = content_hash
+                kept.append(chunk_id)
+        if failed_urls and not reusable:
+            logger.warning("Reconstrucción completa: se eliminan los chunks de %d fuentes no disponibles", len(failed_urls))
+        stale = [chunk_id for chunk_id in previous if chunk_id not in current]
+        if stale:
+            await self.sink.delete(stale)
+        self.stats.deleted = len(stale)
+
+        manifest = {
+            "embedding_model": self.embedding_model,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "chunks": current
+        }
+        await self.sink.finalize(manifest)
+        if bm25:
+            self._write_bm25(bm25, kept)
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        self.stats.elapsed = time.perf_counter() - start
+        return self.stats
+
+    def _write_bm25(self, bm25: BM25Builder, kept: list[str]) -> None:
+        # Recuperar el texto de los chunks conservados desde el índice anterior
+        previous_path = self.bm25_path / BM25_DOCUMENTS_FILE
+        if kept and previous_path.exists():
+            wanted = set(kept)
+            with open(previous_path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record["metadata"].get("chunk_id") in wanted:
+                        bm25.add(record["page_content"], record["metadata"])
+        bm25.write(self.bm25_path)
@@ -0,0 +1,138 @@
+import logging
+import json
+import asyncio
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+from urllib.parse import urlparse
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Catálogos del corpus en la raíz del proyecto
+PAGES_FILE = "previsionsocial_pages.json"
+ARTICLES_FILE = "successful_urls.json"
+VIDEOS_FILE = "successful_videos.json"
+
+@dataclass
+class SourceDocument:
+    """Documento fuente listo para dividir en chunks"""
+    url: str
+    title: str
+    text: str
+    published_time: str | None = None
+
+    @property
+    def source_domain(self) -> str:
+        return urlparse(self.url).netloc.removeprefix("www.")
+
+class _TextExtractor(HTMLParser):
+    """Extrae el texto visible y la fecha de publicación de una página HTML"""
+
+    SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "form", "svg"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: list[str] = []
+        self.published_time: str | None = None
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "meta":
+            attributes = dict(attrs)
+            if attributes.get("property") == "article:published_time":
+                self.published_time = attributes.get("content")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth and data.strip():
+            self.parts.append(data.strip())
+
+def html_to_text(html: str) -> tuple[str, str | None]:
+    """Convierte HTML en texto plano; retorna ``(texto, fecha_publicación)``"""
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    return "\n".join(extractor.parts), extractor.published_time
+
+def iter_catalog(root: Path) -> Iterator[dict]:
+    """Recorre las entradas de los tres catálogos del corpus"""
+    catalogs = [(PAGES_FILE, "pages"), (ARTICLES_FILE, "urls"), (VIDEOS_FILE, "videos")]
+    for filename, key in catalogs:
+        path = root / filename
+        if not path.exists():
+            logger.warning("Catálogo no encontrado: %s", path)
+            continue
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f).get(key, [])
+
+async def _fetch(client: httpx.AsyncClient, entry: dict) -> SourceDocument | None:
+    response = await client.get(entry["url"])
+    response.raise_for_status()
+    text, published_time = html_to_text(response.text)
+    return SourceDocument(url=entry["url"], title=entry.get("title", ""), text=text, published_time=published_time)
+
+async def load_sources(
+    root: Path,
+    raw_dir: Path,
+    fetch: bool = True,
+    concurrency: int = 8,
+    failed: set[str] | None = None
+) -> AsyncIterator[SourceDocument]:
+    """Entrega los documentos del corpus a medida que están disponibles.
+
+    Las entradas con ``filepath`` (artículos y transcripciones) se leen desde
+    ``raw_dir``; las páginas sin contenido local se descargan con concurrencia
+    acotada si ``fetch`` está activo. Las URLs que fallan o llegan sin texto se
+    agregan a ``failed``.
+    """
+    failed = failed if failed is not None else set()
+    to_fetch = []
+
+    for entry in iter_catalog(root):
+        if entry.get("filepath"):
+            path = raw_dir / entry["filepath"]
+            if not path.exists():
+                logger.warning("Contenido no encontrado: %s", path)
+                failed.add(entry["url"])
+                continue
+            text = path.read_text(encoding="utf-8")
+            if not text.strip():
+                logger.warning("Contenido vacío: %s", path)
+                failed.add(entry["url"])
+                continue
+            yield SourceDocument(url=entry["url"], title=entry.get("title", ""), text=text)
+        elif fetch:
+            to_fetch.append(entry)
+        else:
+            failed.add(entry["url"])
+
+    if not to_fetch:
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=20, follow_redirects=True) as client:
+        async def bounded(entry: dict) -> SourceDocument | None:
+            async with semaphore:
+                try:
+                    return await _fetch(client, entry)
+                except httpx.HTTPError as e:
+                    logger.warning("No se pudo descargar %s: %s", entry["url"], e)
+                    failed.add(entry["url"])
+                    return None
+
+        for task in asyncio.as_completed([bounded(entry) for entry in to_fetch]):
+            document = await task
+            if document is None:
+                continue
+            # Una página que llega vacía (p. ej. una caída temporal) no borra sus chunks anteriores
+            if not document.text.strip():
+                logger.warning("Página sin contenido: %s", document.url)
+                failed.add(document.url)
+                continue
+            yield document
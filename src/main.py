@@ -1,69 +1,129 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from src.config.pinecone_setup import setup_pinecone
-from src.config.memory import get_memory
-from src.graph.agent import create_agent_graph
+from src.config.vectorstore_setup import setup_vectorstore, setup_retriever, close_retriever
+from src.config.memory import get_memory, setup_memory_store, setup_summarizer
+from src.graph.agent import create_agent_graph, session_config
+from src.graph.streaming import stream_agent_events
+from src.graph.resilience import UpstreamError, setup_upstream_policy
+from src.graph.prompts import prompt_usage
+from src.observability.metrics import registry, setup_tracing
+from src.observability.logs import setup_logging, shutdown_logging, bind_request_context
+from src.graph.batch import BatchReport, parse_batch, run_batch, batch_settings
+from src.schemas import UserData
+from src.cache.semantic_cache import setup_semantic_cache
+from src.cache.coalescing import setup_request_coalescer
+from src.cache.embedding_cache import CachedEmbeddings
 from langchain_core.messages import HumanMessage
 import os
+import hmac
+import json
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from src.middlewares.cors import CORSMiddlewareWithErrorHandling
-from src.middlewares.host import validate_host
-from src.config.cors import setup_cors
+from src.middlewares.host import HostValidationMiddleware
+from src.middlewares.request_context import RequestContextMiddleware
+from src.config.cors import load_cors_policy
 from src.version import get_version_info
-from src.config.llm_setup import setup_llm
+from src.config.llm_setup import setup_llm, setup_model_tiers
+from src.config.startup import setup_startup
+from src.config.http_clients import close_http_clients
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Logging con cola no bloqueante; debe configurarse antes de compilar el grafo
+logger = setup_logging().getChild("main")
+
 # Obtener información de versión
 version_info = get_version_info()
 
+async def initialize_components(app: FastAPI) -> None:
+    """Crea los clientes de proveedores en paralelo y compila el grafo una sola vez"""
+    startup = app.state.startup
+    logger.info("Inicializando componentes")
+
+    # Configurar el modelo de lenguaje
+    llm = await startup.component("llm", setup_llm)
+    # Modelo liviano opcional para saludos, preguntas sin contexto y resúmenes
+    tiers = await startup.component("tiers", setup_model_tiers, llm)
+
+    # Vector store (Pinecone o índice local) y pool de conexiones a Redis, en paralelo
+    vectorstore, memory_store = await asyncio.gather(
+        startup.component("vectorstore", setup_vectorstore),
+        startup.component("memory", setup_memory_store, setup_summarizer(tiers.cheapest))
+    )
+    app.state.vectorstore = vectorstore
+    app.state.memory_store = memory_store
+    retriever = app.state.retriever = await startup.component("retriever", setup_retriever, vectorstore)
+
+    # Caché semántico de respuestas (opcional), con invalidación compartida por Redis
+    app.state.response_cache = setup_semantic_cache(vectorstore.embeddings, memory_store.client)
+
+    # Plazos por petición, cobertura de latencia del LLM y circuitos de los proveedores
+    app.state.upstream = setup_upstream_policy()
+
+    # Compilar el grafo del agente una sola vez para todo el proceso
+    app.state.agent = await startup.component(
+        "agent", create_agent_graph, retriever, llm, app.state.response_cache,
+        coalescer=coalescer, upstream=app.state.upstream, tiers=tiers
+    )
+    logger.info("Componentes inicializados; API lista para recibir peticiones")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Exportación de trazas de OpenTelemetry (opcional)
+    setup_tracing()
+
+    # Las llamadas a proveedores corren en segundo plano: el proceso acepta
+    # conexiones de inmediato y /readyz indica cuándo puede atender el chat
+    app.state.startup = setup_startup()
+    app.state.startup.run(lambda: initialize_components(app))
+    yield
+    await app.state.startup.stop()
+    memory_store = getattr(app.state, "memory_store", None)
+    if memory_store is not None:
+        await memory_store.close()
+    # Los procesos de BM25 (BM25_PROCESS_WORKERS) no deben sobrevivir al worker
+    close_retriever(getattr(app.state, "retriever", None))
+    await close_http_clients()
+    shutdown_logging()
+
 # Inicializar FastAPI con metadata
 app = FastAPI(
     title="Agente de Pensiones API",
     description="API del Asistente Virtual de Pensiones",
-    version=version_info["version"]
+    version=version_info["version"],
+    lifespan=lifespan
 )
 
 # Configurar logging con versión
-print(f"\n🚀 Iniciando {version_info['name']} v{version_info['version']}")
-print(f"📝 {version_info['description']}\n")
+logger.info("Iniciando %s v%s: %s", version_info["name"], version_info["version"], version_info["description"])
 
-# Configurar CORS
-processed_origins, allow_origin_regex = setup_cors()
+# Política de CORS y hosts, calculada una sola vez
+cors_policy = load_cors_policy()
 
 # Configurar CORS con el middleware personalizado
 app.add_middleware(
     CORSMiddlewareWithErrorHandling,
-    allow_origins=processed_origins,
-    allow_origin_regex=allow_origin_regex,
+    policy=cors_policy,
     allow_credentials=True,
     allow_methods=["POST", "GET"],
     allow_headers=["*"],
     max_age=3600,
 )
 
-# Añadir middleware para hosts confiables
-if "*" not in processed_origins:
-    # Guardar hosts permitidos en el estado de la app
-    app.state.allowed_hosts = [origin.replace("https://", "") for origin in processed_origins]
-    app.middleware("http")(validate_host)
-
-# Modelo para la solicitud
-class EdadData(BaseModel):
-    anos: int
-    meses: int
+# Añadir middleware para hosts confiables (se ejecuta antes que CORS)
+if not cors_policy.allow_all:
+    app.add_middleware(HostValidationMiddleware, policy=cors_policy)
 
-class UserData(BaseModel):
-    nombre: str
-    genero: str
-    edad: EdadData
-    nivelEstudios: str
+# Identificador de petición para los registros (middleware más externo)
+app.add_middleware(RequestContextMiddleware)
 
+# Modelo para la solicitud
 class ChatRequest(BaseModel):
     session_id: str
     user_message: str
@@ -71,46 +131,54 @@ class ChatRequest(BaseModel):
     agent_name: str
     user_data: UserData
 
-# Inicializar componentes globales
-print("\n🔧 Inicializando componentes...")
-
-# Configurar el modelo de lenguaje
-llm = setup_llm()
+def build_initial_state(request: ChatRequest) -> dict:
+    """Crea el estado inicial con el mensaje del usuario y sus datos"""
+    return {
+        "messages": [HumanMessage(content=request.user_message)],
+        "agent_name": request.agent_name,
+        "user_data": request.user_data.model_dump()
+    }
 
-# Configurar el vector store
-vectorstore = setup_pinecone()
-retriever = vectorstore.as_retriever()
+# Coalescencia de preguntas idénticas en curso
+coalescer = setup_request_coalescer()
 
-print("\n✨ Todos los componentes inicializados correctamente")
-print("🚀 API lista para recibir peticiones\n")
+def require_ready(request: Request) -> None:
+    """Responde 503 mientras los componentes se siguen inicializando"""
+    if not request.app.state.startup.ready.is_set():
+        raise HTTPException(status_code=503, detail="Servicio inicializándose", headers={"Retry-After": "5"})
 
 @app.get("/")
 async def read_root():
     return {"message": "Bienvenido al API del Asistente de Previsión Social"}
 
-@app.post("/chat")
-async def chat(request: ChatRequest):
+@app.get("/healthz")
+async def healthz():
+    """Liveness: el proceso responde, aunque los proveedores aún no estén listos"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz(http_request: Request):
+    """Readiness: 200 cuando el grafo y sus clientes están inicializados, 503 mientras tanto"""
+    status = http_request.app.state.startup.status()
+    # Los circuitos abiertos se informan, pero no sacan al proceso del balanceador
+    upstream = getattr(http_request.app.state, "upstream", None)
+    if upstream is not None:
+        status["upstream"] = upstream.stats()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.post("/chat", dependencies=[Depends(require_ready)])
+async def chat(request: ChatRequest, http_request: Request):
+    bind_request_context(session_id=request.session_id)
     try:
         # Obtener o crear memoria para la sesión
-        memory = get_memory(request.session_id)
-        
-        # Crear el grafo del agente para esta sesión
-        agent = await create_agent_graph(retriever, llm, memory)
+        memory = get_memory(http_request.app.state.memory_store, request.session_id)
         
-        # Crear el estado inicial con el mensaje del usuario y sus datos
-        initial_state = {
-            "messages": [HumanMessage(content=request.user_message)],
-            "agent_name": request.agent_name,
-            "user_data": {
-                "nombre": request.user_data.nombre,
-                "genero": request.user_data.genero,
-                "edad": request.user_data.edad.dict(),
-                "nivelEstudios": request.user_data.nivelEstudios
-            }
-        }
+        # Reutilizar el grafo compilado al iniciar la aplicación
+        agent = http_request.app.state.agent
         
-        # Ejecutar el agente
-        result = await agent.ainvoke(initial_state)
+        # Ejecutar el agente dentro del presupuesto de tiempo de la petición
+        deadline = http_request.app.state.upstream.deadline()
+        result = await agent.ainvoke(build_initial_state(request), config=session_config(memory, deadline))
         
         # Extraer la última respuesta
         if result and isinstance(result, dict) and "messages" in result:
@@ -124,11 +192,106 @@ async def chat(request: ChatRequest):
         
         raise HTTPException(status_code=500, detail="No se pudo generar una respuesta válida")
             
+    except HTTPException:
+        raise
+    except UpstreamError as e:
+        # Plazo vencido (504) o proveedor con el circuito abierto (503)
+        logger.warning("Error de proveedor en el chat (%s): %s", type(e).__name__, e)
+        headers = {"Retry-After": str(int(e.retry_after))} if e.retry_after else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
     except Exception as e:
-        print(f"Error en el chat: {str(e)}")
-        print(f"Tipo de error: {type(e)}")
-        print(f"Resultado recibido: {result if 'result' in locals() else 'No hay resultado'}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.exception("Error en el chat (%s)", type(e).__name__)
+        raise HTTPException(status_code=500, detail="Error interno al generar la respuesta")
+
+@app.post("/chat/stream", dependencies=[Depends(require_ready)])
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Variante de /chat que transmite la respuesta como Server-Sent Events"""
+    bind_request_context(session_id=request.session_id)
+    memory = get_memory(http_request.app.state.memory_store, request.session_id)
+    events = stream_agent_events(
+        http_request.app.state.agent,
+        build_initial_state(request),
+        session_config(memory, http_request.app.state.upstream.deadline())
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/chat/batch", dependencies=[Depends(require_ready)])
+async def chat_batch(http_request: Request, x_admin_token: str | None = Header(default=None)):
+    """Responde un lote JSONL de preguntas y transmite los resultados como JSONL.
+
+    Cada línea del cuerpo tiene ``user_message`` y opcionalmente ``id``,
+    ``agent_name`` y ``user_data``. Cada línea de la respuesta es un resultado
+    (en orden de término, con su ``index``) y la última es el resumen.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+    try:
+        items = parse_batch((await http_request.body()).decode("utf-8").splitlines())
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    embeddings = http_request.app.state.vectorstore.embeddings
+    report = BatchReport()
+
+    async def lines():
+        async for result in run_batch(
+            http_request.app.state.agent,
+            items,
+            embeddings=embeddings,
+            report=report,
+            **batch_settings()
+        ):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"summary": report.summary()}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+async def metrics(authorization: str | None = Header(default=None)):
+    """Métricas en formato de texto de Prometheus, del worker que responde.
+
+    Con ``METRICS_TOKEN`` el scrape debe enviar ``Authorization: Bearer <token>``
+    y se acepta con cualquier ``Host``; sin él, la ruta pasa por CORS y por la
+    validación de host como el resto de la API.
+    """
+    metrics_token = os.getenv("METRICS_TOKEN")
+    if metrics_token and not hmac.compare_digest((authorization or "").encode(), f"Bearer {metrics_token}".encode()):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cache/stats", dependencies=[Depends(require_ready)])
+async def cache_stats(http_request: Request):
+    response_cache = http_request.app.state.response_cache
+    embeddings = http_request.app.state.vectorstore.embeddings
+    # Cada worker tiene sus propios contadores y cachés en memoria
+    return {
+        "worker": os.getpid(),
+        "responses": response_cache.stats() if response_cache else {"enabled": False},
+        "embeddings": embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else {"enabled": False},
+        "prompts": prompt_usage.stats(),
+        "coalescing": coalescer.stats() if coalescer else {"enabled": False}
+    }
+
+@app.post("/cache/invalidate", dependencies=[Depends(require_ready)])
+async def cache_invalidate(http_request: Request, x_admin_token: str | None = Header(default=None)):
+    """Vacía el caché semántico de todos los workers, por ejemplo después de re-ingestar la base de conocimiento.
+
+    ``invalidated`` cuenta las entradas del worker que responde. Con
+    ``scope="all"`` los demás vacían el suyo en a lo más
+    ``SEMANTIC_CACHE_SYNC_INTERVAL`` segundos; con ``scope="worker"`` (Redis
+    no disponible) solo se vació el que responde.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+    response_cache = http_request.app.state.response_cache
+    removed, broadcast = await response_cache.invalidate_all() if response_cache else (0, False)
+    return {"invalidated": removed, "scope": "all" if broadcast else "worker", "worker": os.getpid()}
 
 @app.get("/version")
 async def get_version():
@@ -1,4 +1,4 @@
 from .cors import CORSMiddlewareWithErrorHandling
-from .host import validate_host
+from .host import HostValidationMiddleware
 
-__all__ = ['CORSMiddlewareWithErrorHandling', 'validate_host'] 
\ No newline at end of file
+__all__ = ['CORSMiddlewareWithErrorHandling', 'HostValidationMiddleware']
@@ -0,0 +1,41 @@
+import os
+import json
+from functools import lru_cache
+
+# Sondas de Kubernetes: no envían ``Origin`` y suelen llegar con la IP del pod
+# como ``Host``, así que no pasan por CORS ni por la validación de host
+PUBLIC_PATHS = frozenset({"/healthz", "/readyz"})
+METRICS_PATH = "/metrics"
+
+@lru_cache(maxsize=1)
+def public_paths() -> frozenset[str]:
+    """``PUBLIC_PATHS`` más ``/metrics`` si el scrape se autentica con ``METRICS_TOKEN``.
+
+    Sin token, ``/metrics`` pasa por CORS y por la validación de host como
+    cualquier otra ruta.
+    """
+    if os.getenv("METRICS_TOKEN"):
+        return PUBLIC_PATHS | {METRICS_PATH}
+    return PUBLIC_PATHS
+
+def is_public(scope) -> bool:
+    return scope.get("path") in public_paths()
+
+def header(scope, name: bytes) -> str | None:
+    """Lee un encabezado directamente del scope ASGI, sin construir un ``Request``"""
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def json_body(content: dict) -> bytes:
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+async def send_json(send, status: int, body: bytes) -> None:
+    """Envía una respuesta JSON ya serializada"""
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))]
+    })
+    await send({"type": "http.response.body", "body": body})
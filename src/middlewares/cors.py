@@ -1,35 +1,41 @@
-from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from src.config.cors import CORSPolicy
+from src.middlewares.asgi import header, is_public, json_body, send_json
+
+MISSING_ORIGIN = json_body({"error": "Acceso CORS denegado", "detail": "Origen no especificado o no permitido"})
+FORBIDDEN_ORIGIN = json_body({"error": "Acceso CORS denegado", "detail": "Origen no permitido"})
 
 class CORSMiddlewareWithErrorHandling(CORSMiddleware):
+    """CORS de Starlette que además rechaza con 403 las peticiones sin origen permitido.
+
+    Usa la ``CORSPolicy`` precalculada, incluido el patrón de subdominios
+    ``*.dominio``, y lee el origen directamente del scope ASGI. Las rutas de
+    ``public_paths()`` (sondas y, con ``METRICS_TOKEN``, métricas) no se validan.
+    """
+
+    def __init__(self, app, policy: CORSPolicy, **kwargs):
+        super().__init__(
+            app,
+            allow_origins=["*"] if policy.allow_all else sorted(policy.origins),
+            allow_origin_regex=policy.origin_regex.pattern if policy.origin_regex else None,
+            **kwargs
+        )
+        self.policy = policy
+
     async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
+        if scope["type"] != "http" or self.policy.allow_all:
             return await super().__call__(scope, receive, send)
-        
-        request = Request(scope, receive)
-        origin = request.headers.get("origin")
-        
+        if is_public(scope):
+            return await self.app(scope, receive, send)
+
+        origin = header(scope, b"origin")
+
         # Si no hay origen y no permitimos cualquier origen, bloqueamos
-        if not origin and "*" not in self.allow_origins:
-            response = JSONResponse(
-                status_code=403,
-                content={
-                    "error": "Acceso CORS denegado",
-                    "detail": "Origen no especificado o no permitido"
-                }
-            )
-            return await response(scope, receive, send)
-        
+        if not origin:
+            return await send_json(send, 403, MISSING_ORIGIN)
+
         # Si hay origen y no está permitido
-        if origin and origin not in self.allow_origins and "*" not in self.allow_origins:
-            response = JSONResponse(
-                status_code=403,
-                content={
-                    "error": "Acceso CORS denegado",
-                    "detail": "Origen no permitido"
-                }
-            )
-            return await response(scope, receive, send)
-            
-        return await super().__call__(scope, receive, send) 
\ No newline at end of file
+        if not self.policy.allows_origin(origin):
+            return await send_json(send, 403, FORBIDDEN_ORIGIN)
+
+        return await super().__call__(scope, receive, send)
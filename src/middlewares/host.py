@@ -1,41 +1,23 @@
-from fastapi import Request
-from fastapi.responses import JSONResponse
-import os
-import json
+from src.config.cors import CORSPolicy
+from src.middlewares.asgi import header, is_public, json_body, send_json
 
-def get_allowed_hosts():
-    """Obtiene los hosts permitidos desde CORS_ORIGINS"""
-    cors_env = os.getenv("CORS_ORIGINS", "")
-    try:
-        if cors_env.strip().startswith("["):
-            origins = json.loads(cors_env)
-        else:
-            origins = [origin.strip() for origin in cors_env.split(",") if origin.strip()]
-        
-        # Convertir https:// URLs a hostnames
-        hosts = [origin.replace("https://", "") for origin in origins if origin != "*"]
-        return hosts
-    except:
-        return []
+FORBIDDEN_HOST = json_body({"error": "Acceso denegado", "detail": "Host no permitido"})
 
-async def validate_host(request: Request, call_next):
-    host = request.headers.get("host", "").split(":")[0]
-    allowed_hosts = get_allowed_hosts()
-    
-    # Siempre permitir localhost para desarrollo
-    if host in ["localhost", "127.0.0.1"]:
-        return await call_next(request)
-        
-    # Si * está en CORS_ORIGINS, permitir cualquier host
-    if "*" in os.getenv("CORS_ORIGINS", ""):
-        return await call_next(request)
-    
-    if host not in allowed_hosts:
-        return JSONResponse(
-            status_code=403,
-            content={
-                "error": "Acceso denegado",
-                "detail": "Host no permitido"
-            }
-        )
-    return await call_next(request) 
\ No newline at end of file
+class HostValidationMiddleware:
+    """Rechaza con 403 las peticiones cuyo ``Host`` no corresponde a un origen permitido.
+
+    localhost y 127.0.0.1 siempre se aceptan para desarrollo; los comodines
+    ``*.dominio`` de ``CORS_ORIGINS`` aceptan sus subdominios. Las rutas de
+    ``public_paths()`` (sondas y, con ``METRICS_TOKEN``, métricas) se aceptan con cualquier host.
+    """
+
+    def __init__(self, app, policy: CORSPolicy):
+        self.app = app
+        self.policy = policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not is_public(scope):
+            host = (header(scope, b"host") or "").split(":")[0]
+            if not self.policy.allows_host(host):
+                return await send_json(send, 403, FORBIDDEN_HOST)
+        await self.app(scope, receive, send)
@@ -0,0 +1,36 @@
+import uuid
+from src.observability.logs import request_id_var, session_id_var
+
+class RequestContextMiddleware:
+    """Asigna un request_id a cada petición HTTP para correlacionar sus registros.
+
+    Reutiliza el encabezado ``X-Request-ID`` si viene en la petición y lo
+    devuelve en la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        request_token = request_id_var.set(request_id)
+        session_token = session_id_var.set(None)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-request-id", request_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(request_token)
+            session_id_var.reset(session_token)
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+# Identificadores de la petición en curso; las tareas del grafo heredan el contexto
+request_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+session_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("session_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [req=%(request_id)s session=%(session_id)s] %(message)s"
+
+_listener: QueueListener | None = None
+_stream = None
+_fork_hook_registered = False
+
+class ContextFilter(logging.Filter):
+    """Agrega request_id y session_id al registro en el hilo que lo emite"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        return True
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por registro; los campos de ``extra={"fields": {...}}`` se agregan tal cual"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "session_id": getattr(record, "session_id", None)
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+class ContextQueueHandler(QueueHandler):
+    """Encola el registro con el mensaje resuelto; el formateo y la escritura ocurren en el hilo del listener"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolver el mensaje y la traza aquí, porque los argumentos pueden cambiar después
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def bind_request_context(request_id: str | None = None, session_id: str | None = None) -> None:
+    """Asocia los identificadores a los registros emitidos desde el contexto actual"""
+    if request_id is not None:
+        request_id_var.set(request_id)
+    if session_id is not None:
+        session_id_var.set(session_id)
+
+def setup_logging(stream=None) -> logging.Logger:
+    """Configura el logger ``src`` con un handler de cola no bloqueante.
+
+    ``LOG_LEVEL`` fija el nivel (``INFO`` por defecto; ``DEBUG`` activa la
+    salida detallada del grafo) y ``LOG_FORMAT`` el formato (``text`` o ``json``).
+    La escritura al stream ocurre en un hilo aparte, fuera del event loop.
+    """
+    global _listener, _stream, _fork_hook_registered
+    logger = logging.getLogger("src")
+    if _listener is not None:
+        return logger
+    if not _fork_hook_registered:
+        # Con gunicorn --preload el hilo de escritura no sobrevive al fork
+        os.register_at_fork(after_in_child=_restart_after_fork)
+        _fork_hook_registered = True
+    _stream = stream
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+
+    logger.handlers[:] = [handler]
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return logger
+
+def _restart_after_fork() -> None:
+    """Crea una cola y un hilo de escritura propios en el proceso hijo"""
+    global _listener
+    if _listener is not None:
+        _listener = None
+        setup_logging(_stream)
+
+def shutdown_logging() -> None:
+    """Vacía la cola y detiene el hilo de escritura"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
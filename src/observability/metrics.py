@@ -0,0 +1,222 @@
+import os
+import logging
+import time
+import asyncio
+import functools
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# Límites en segundos: de operaciones de Redis (~ms) a generaciones del LLM (~s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Contador monotónico con etiquetas, en formato de Prometheus.
+
+    Los nodos que corren en ``asyncio.to_thread`` lo actualizan desde otros
+    hilos, así que cada lectura-escritura se hace bajo un lock.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *label_values) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            snapshot = list(self._values.items())
+        for values, total in sorted(snapshot):
+            yield f"{self.name}{_format_labels(self.labels, values)} {total:g}"
+
+class Histogram:
+    """Histograma con límites fijos; ``observe`` es una búsqueda binaria y dos sumas bajo un lock"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # Por combinación de etiquetas: [conteos por bucket (+Inf al final), suma, cantidad]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            snapshot = [(values, (list(counts), total, count)) for values, (counts, total, count) in self._series.items()]
+        for values, (counts, total, count) in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_label = f'le="{le}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, values, bucket_label)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, values)} {total:g}"
+            yield f"{self.name}_count{_format_labels(self.labels, values)} {count}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Exposición en formato de texto de Prometheus (versión 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+NODE_DURATION = registry.histogram("agent_node_duration_seconds", "Duración de cada nodo del grafo", ("node",))
+NODE_ERRORS = registry.counter("agent_node_errors_total", "Nodos del grafo que terminaron con excepción", ("node",))
+MEMORY_DURATION = registry.histogram("agent_memory_duration_seconds", "Duración de las operaciones de memoria de sesión", ("operation",))
+MEMORY_DROPPED_TURNS = registry.counter("agent_memory_dropped_turns_total", "Turnos que no se pudieron guardar tras agotar los reintentos")
+ROUTING_DECISIONS = registry.counter("agent_routing_decisions_total", "Decisiones del nodo evaluate", ("route",))
+DOCUMENTS_RETRIEVED = registry.counter("agent_documents_retrieved_total", "Chunks recuperados por la búsqueda")
+DOCUMENTS_PACKED = registry.counter("agent_documents_packed_total", "Chunks que entraron al contexto del prompt")
+LLM_TOKENS = registry.counter("agent_llm_tokens_total", "Tokens del LLM por tipo (prompt, completion, cached_prompt)", ("type",))
+LLM_TIER_DURATION = registry.histogram("agent_llm_tier_duration_seconds", "Duración de las llamadas al LLM por nivel de modelo", ("tier",))
+LLM_TIER_TOKENS = registry.counter("agent_llm_tier_tokens_total", "Tokens del LLM por nivel de modelo y tipo (prompt, completion)", ("tier", "type"))
+LLM_TRUNCATED = registry.counter("agent_llm_truncated_total", "Respuestas del LLM cortadas por el tope de tokens de salida (finish_reason=length)", ("tier",))
+HTTP_REQUESTS = registry.counter("agent_http_requests_total", "Peticiones HTTP a los proveedores por cliente (sync o async) y host", ("client", "host"))
+HTTP_CONNECTIONS = registry.counter("agent_http_connections_total", "Conexiones TCP nuevas hacia los proveedores; el resto de las peticiones reutilizó una del pool", ("client", "host"))
+HTTP_TLS_HANDSHAKES = registry.counter("agent_http_tls_handshakes_total", "Handshakes TLS hacia los proveedores", ("client", "host"))
+UPSTREAM_FAILURES = registry.counter("agent_upstream_failures_total", "Llamadas a proveedores fallidas por dependencia y motivo (timeout, error, circuit_open)", ("dependency", "reason"))
+LLM_HEDGES = registry.counter("agent_llm_hedges_total", "Llamadas al LLM cubiertas con una segunda petición y cuál terminó primero", ("outcome",))
+
+@lru_cache(maxsize=1)
+def _tracer():
+    """Tracer de OpenTelemetry si ``OTEL_TRACING`` está activo y el paquete está instalado"""
+    if os.getenv("OTEL_TRACING", "false").lower() not in ("1", "true", "yes"):
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning("OTEL_TRACING activo pero opentelemetry no está instalado")
+        return None
+    return trace.get_tracer("agente-pension")
+
+def setup_tracing() -> None:
+    """Configura la exportación OTLP si ``OTEL_EXPORTER_OTLP_ENDPOINT`` está definido.
+
+    Sin el SDK instalado, los spans quedan en el proveedor global (p. ej. el de
+    ``opentelemetry-instrument``) o se descartan.
+    """
+    if _tracer() is None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("Para exportar trazas instala opentelemetry-sdk y opentelemetry-exporter-otlp-proto-http")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "agente-pension")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    logger.info("Trazas OTLP hacia %s", os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+
+@contextmanager
+def timed(histogram: Histogram, label: str, span_name: str | None = None):
+    """Mide un bloque en ``histogram`` y, con OpenTelemetry activo, lo registra como span"""
+    tracer = _tracer()
+    start = time.perf_counter()
+    if tracer is None:
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start, label)
+        return
+    with tracer.start_as_current_span(span_name or label):
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start, label)
+
+def instrument_node(name: str, node):
+    """Envuelve un nodo del grafo (síncrono o asíncrono) con su histograma de duración.
+
+    Sin OpenTelemetry se mide en línea, sin el costo de un context manager.
+    """
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                if _tracer() is not None:
+                    with timed(NODE_DURATION, name, f"node.{name}"):
+                        return await node(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await node(*args, **kwargs)
+                finally:
+                    NODE_DURATION.observe(time.perf_counter() - start, name)
+            except Exception:
+                NODE_ERRORS.inc(1, name)
+                raise
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(*args, **kwargs):
+        try:
+            if _tracer() is not None:
+                with timed(NODE_DURATION, name, f"node.{name}"):
+                    return node(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return node(*args, **kwargs)
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - start, name)
+        except Exception:
+            NODE_ERRORS.inc(1, name)
+            raise
+    return wrapper
@@ -0,0 +1,183 @@
+import re
+import json
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from langchain_core.documents import Document
+from src.tools.text import fold_accents
+
+VOCABULARY_FILE = "vocabulary.json"
+OFFSETS_FILE = "postings_offsets.npy"
+DOCS_FILE = "postings_docs.npy"
+FREQUENCIES_FILE = "postings_tf.npy"
+LENGTHS_FILE = "doc_lengths.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+META_FILE = "bm25_meta.json"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Palabras vacías frecuentes en español; no aportan a la relevancia léxica
+STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuales cuando de del desde donde durante e el ella
+ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos fue ha hay la las le les lo los
+mas me mi mis mucho muy ni no nos o os otra otras otro otros para pero poco por porque que quien se ser si
+sin sobre su sus tambien te tiene tu tus un una uno unos y ya yo
+""".split())
+
+def singularize(token: str) -> str:
+    """Singularización ligera: pensiones -> pension, afps -> afp, aportes -> aporte"""
+    if len(token) > 5 and token.endswith("ones"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> list[str]:
+    return [singularize(token) for token in TOKEN_PATTERN.findall(fold_accents(text)) if token not in STOPWORDS]
+
+class BM25Builder:
+    """Construye el índice invertido BM25 a partir de los chunks de la ingesta"""
+
+    def __init__(self):
+        self.documents: list[Document] = []
+        self._term_frequencies: list[Counter] = []
+
+    def add(self, text: str, metadata: dict) -> None:
+        self.documents.append(Document(page_content=text, metadata=metadata))
+        self._term_frequencies.append(Counter(tokenize(text)))
+
+    def write(self, path: Path, k1: float = 1.5, b: float = 0.75) -> None:
+        """Escribe el índice en formato CSR para cargarlo con mmap"""
+        path.mkdir(parents=True, exist_ok=True)
+        vocabulary = sorted({term for frequencies in self._term_frequencies for term in frequencies})
+        term_ids = {term: i for i, term in enumerate(vocabulary)}
+
+        postings: list[list[tuple[int, int]]] = [[] for _ in vocabulary]
+        for doc_id, frequencies in enumerate(self._term_frequencies):
+            for term, frequency in frequencies.items():
+                postings[term_ids[term]].append((doc_id, frequency))
+
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(entries) for entries in postings])
+        docs = np.fromiter((doc for entries in postings for doc, _ in entries), dtype=np.int32, count=int(offsets[-1]))
+        frequencies = np.fromiter((tf for entries in postings for _, tf in entries), dtype=np.float32, count=int(offsets[-1]))
+        lengths = np.array([sum(tf.values()) for tf in self._term_frequencies], dtype=np.float32)
+
+        np.save(path / OFFSETS_FILE, offsets)
+        np.save(path / DOCS_FILE, docs)
+        np.save(path / FREQUENCIES_FILE, frequencies)
+        np.save(path / LENGTHS_FILE, lengths)
+        (path / VOCABULARY_FILE).write_text(json.dumps(term_ids, ensure_ascii=False), encoding="utf-8")
+        with open(path / DOCUMENTS_FILE, "w", encoding="utf-8") as f:
+            for document in self.documents:
+                f.write(json.dumps({"page_content": document.page_content, "metadata": document.metadata}, ensure_ascii=False) + "\n")
+        (path / META_FILE).write_text(json.dumps({
+            "documents": len(self.documents),
+            "average_length": float(lengths.mean()) if len(lengths) else 0.0,
+            "k1": k1,
+            "b": b
+        }), encoding="utf-8")
+
+class BM25Index:
+    """Índice BM25 precomputado; los arreglos de postings se mapean desde disco"""
+
+    def __init__(
+        self,
+        vocabulary: dict[str, int],
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        frequencies: np.ndarray,
+        lengths: np.ndarray,
+        documents: list[Document],
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.docs = docs
+        self.frequencies = frequencies
+        self.documents = documents
+        self.k1 = k1
+        average_length = float(lengths.mean()) if len(lengths) else 1.0
+        # Normalización por largo del documento, precalculada una sola vez
+        self._length_norm = k1 * (1 - b + b * np.asarray(lengths) / (average_length or 1.0))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        root = Path(path)
+        mode = "r" if mmap else None
+        meta = json.loads((root / META_FILE).read_text(encoding="utf-8"))
+        with open(root / DOCUMENTS_FILE, encoding="utf-8") as f:
+            documents = [Document(**json.loads(line)) for line in f if line.strip()]
+        return cls(
+            vocabulary=json.loads((root / VOCABULARY_FILE).read_text(encoding="utf-8")),
+            offsets=np.load(root / OFFSETS_FILE, mmap_mode=mode),
+            docs=np.load(root / DOCS_FILE, mmap_mode=mode),
+            frequencies=np.load(root / FREQUENCIES_FILE, mmap_mode=mode),
+            lengths=np.load(root / LENGTHS_FILE),
+            documents=documents,
+            k1=meta["k1"],
+            b=meta["b"]
+        )
+
+    def search(self, query: str, k: int = 4) -> list[tuple[Document, float]]:
+        """Retorna los ``k`` chunks con mayor puntaje BM25 para la consulta"""
+        return [(self.documents[i], score) for i, score in self.search_ids(query, k)]
+
+    def search_ids(self, query: str, k: int = 4) -> list[tuple[int, float]]:
+        """Como ``search``, pero con la posición de cada chunk (serializable entre procesos)"""
+        count = len(self.documents)
+        scores = np.zeros(count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            docs = np.asarray(self.docs[start:end])
+            frequencies = np.asarray(self.frequencies[start:end])
+            idf = np.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * frequencies * (self.k1 + 1) / (frequencies + self._length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        best = matched[np.argsort(-scores[matched])[:k]]
+        return [(int(i), float(scores[i])) for i in best]
+
+# Índice cargado en cada proceso del pool (ver ``BM25ProcessPool``)
+_worker_index: BM25Index | None = None
+
+def _load_worker_index(path: str) -> None:
+    global _worker_index
+    _worker_index = BM25Index.load(path, mmap=True)
+
+def _search_in_worker(query: str, k: int) -> list[tuple[int, float]]:
+    return _worker_index.search_ids(query, k)
+
+class BM25ProcessPool:
+    """Ejecuta las búsquedas BM25 en procesos aparte, fuera del GIL del servidor.
+
+    Cada proceso abre el mismo índice con mmap, así que los postings se
+    comparten a través del page cache; solo viajan la consulta y las
+    posiciones con su puntaje.
+    """
+
+    def __init__(self, path: str, workers: int):
+        self.workers = workers
+        # spawn: el servidor ya tiene hilos (logging, to_thread) y fork no es seguro
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_worker_index,
+            initargs=(path,)
+        )
+
+    async def search_ids(self, query: str, k: int) -> list[tuple[int, float]]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, _search_in_worker, query, k)
+
+    def close(self) -> None:
+        """Cancela las búsquedas en cola y espera a que terminen los procesos"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,65 @@
+import asyncio
+import hashlib
+from typing import List
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src.retrieval.bm25 import BM25Index, BM25ProcessPool
+
+def document_key(document: Document) -> str:
+    """Identifica un chunk igual en ambos índices (``chunk_id`` de la ingesta o su contenido)"""
+    chunk_id = document.metadata.get("chunk_id")
+    if chunk_id:
+        return chunk_id
+    source = document.metadata.get("url_source", "")
+    return hashlib.sha1(f"{source}\x00{document.page_content}".encode("utf-8")).hexdigest()
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int, rrf_k: int = 60) -> list[Document]:
+    """Fusiona rankings con RRF: puntaje = suma de 1 / (rrf_k + posición)"""
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, 1):
+            key = document_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, document)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in best]
+
+class HybridRetriever(BaseRetriever):
+    """Combina la búsqueda vectorial con BM25 y fusiona los resultados con RRF.
+
+    Ambas búsquedas corren en paralelo y cada una aporta ``fetch_k``
+    candidatos; se retornan los ``k`` mejores de la fusión. Con
+    ``search_pool`` la búsqueda léxica asíncrona corre en otro proceso.
+    """
+
+    vector_retriever: BaseRetriever
+    bm25: BM25Index
+    search_pool: BM25ProcessPool | None = None
+    k: int = 4
+    fetch_k: int = 10
+    rrf_k: int = 60
+
+    def _lexical(self, query: str) -> list[Document]:
+        return [document for document, _ in self.bm25.search(query, k=self.fetch_k)]
+
+    async def _alexical(self, query: str) -> list[Document]:
+        if self.search_pool is None:
+            return await asyncio.to_thread(self._lexical, query)
+        return [self.bm25.documents[i] for i, _ in await self.search_pool.search_ids(query, self.fetch_k)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return reciprocal_rank_fusion([dense, self._lexical(query)], k=self.k, rrf_k=self.rrf_k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense, lexical = await asyncio.gather(
+            self.vector_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()}),
+            self._alexical(query)
+        )
+        return reciprocal_rank_fusion([dense, lexical], k=self.k, rrf_k=self.rrf_k)
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+# Perfil del usuario, compartido por /chat y /chat/batch
+class EdadData(BaseModel):
+    anos: int
+    meses: int
+
+class UserData(BaseModel):
+    nombre: str
+    genero: str
+    edad: EdadData
+    nivelEstudios: str
@@ -0,0 +1,9 @@
+import unicodedata
+
+def fold_accents(text: str) -> str:
+    """Minúsculas sin tildes: "Pensión" y "pension" quedan iguales"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    # Separar las tildes de su letra y descartar todo lo que no sea ASCII
+    return unicodedata.normalize("NFD", text).encode("ascii", "ignore").decode("ascii")
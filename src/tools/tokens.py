@@ -0,0 +1,24 @@
+import os
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """Codificación de tiktoken; ``None`` si no está disponible (p. ej. sin red)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(os.getenv("TOKENIZER_ENCODING", "cl100k_base"))
+    except Exception as e:
+        logger.warning("Tokenizador no disponible, se estima por caracteres: %s", e)
+        return None
+
+def count_tokens(text: str) -> int:
+    """Cuenta tokens con el tokenizador de OpenAI (o ~4 caracteres por token como respaldo)"""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
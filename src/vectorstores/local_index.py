@@ -0,0 +1,238 @@
+import json
+import asyncio
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+IVF_FILE = "ivf.npz"
+MANIFEST_FILE = "manifest.json"
+
+# Filas por bloque en la búsqueda exacta: acota la memoria temporal de los scores
+SEARCH_BLOCK_ROWS = 65536
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza cada fila a norma 1 para que el producto punto sea similitud coseno"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices de los ``k`` scores más altos, ordenados de mayor a menor"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Búsqueda coseno por fuerza bruta, por bloques y en lote de consultas.
+
+    Retorna ``(indices, scores)`` con forma ``(n_consultas, k)``.
+    """
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+    for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+        block_scores = queries @ np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS]).T
+        merged_scores = np.concatenate([best_scores, block_scores], axis=1)
+        block_ids = np.arange(start, start + block_scores.shape[1])
+        merged_ids = np.concatenate([best_ids, np.broadcast_to(block_ids, block_scores.shape)], axis=1)
+        keep = np.stack([top_k(row, k) for row in merged_scores]) if len(merged_scores) else merged_ids
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_ids = np.take_along_axis(merged_ids, keep, axis=1)
+
+    return best_ids, best_scores
+
+@dataclass
+class IVFIndex:
+    """Índice aproximado de listas invertidas (IVF) sobre k-means esférico.
+
+    Cada vector pertenece a la lista de su centroide más cercano; una consulta
+    solo recorre las ``nprobe`` listas más cercanas.
+    """
+    centroids: np.ndarray
+    order: np.ndarray
+    offsets: np.ndarray
+    nprobe: int = 8
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: int | None = None, iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        count = len(vectors)
+        n_lists = min(n_lists or max(1, int(np.sqrt(count))), count)
+        rng = np.random.default_rng(seed)
+        centroids = np.asarray(vectors[rng.choice(count, size=n_lists, replace=False)], dtype=np.float32)
+
+        for _ in range(iterations):
+            assignments = cls._assign(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, np.asarray(vectors))
+            empty = ~sums.any(axis=1)
+            # Reubicar centroides vacíos en vectores al azar
+            sums[empty] = np.asarray(vectors[rng.choice(count, size=int(empty.sum()), replace=False)])
+            centroids = normalize_rows(sums)
+
+        assignments = cls._assign(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+        return cls(centroids=centroids, order=order, offsets=offsets)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS])
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        lists = top_k(self.centroids @ query, self.nprobe)
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+    def save(self, path: Path) -> None:
+        np.savez(path, centroids=self.centroids, order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: Path, nprobe: int = 8) -> "IVFIndex":
+        data = np.load(path)
+        return cls(centroids=data["centroids"], order=data["order"], offsets=data["offsets"], nprobe=nprobe)
+
+class LocalVectorStore(VectorStore):
+    """Vector store en proceso: matriz float32 (mapeada desde disco) con búsqueda coseno.
+
+    Se carga desde un snapshot con ``vectors.npy`` (filas normalizadas),
+    ``documents.jsonl`` (``page_content`` y ``metadata`` por fila) y,
+    opcionalmente, ``ivf.npz`` para la búsqueda aproximada.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        vectors: np.ndarray | None = None,
+        documents: list[Document] | None = None,
+        ivf: IVFIndex | None = None,
+        use_ivf: bool = False
+    ):
+        self._embedding = embedding
+        self.vectors = vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+        self.documents = documents or []
+        self.ivf = ivf
+        self.use_ivf = use_ivf
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embedding: Embeddings,
+        mmap: bool = True,
+        use_ivf: bool = False,
+        nprobe: int = 8
+    ) -> "LocalVectorStore":
+        root = Path(path)
+        vectors = np.load(root / VECTORS_FILE, mmap_mode="r" if mmap else None)
+        with open(root / DOCUMENTS_FILE, encoding="utf-8") as f:
+            documents = [Document(**json.loads(line)) for line in f if line.strip()]
+        if len(documents) != len(vectors):
+            raise ValueError(f"❌ Snapshot inconsistente: {len(vectors)} vectores y {len(documents)} documentos")
+        ivf = IVFIndex.load(root / IVF_FILE, nprobe=nprobe) if (root / IVF_FILE).exists() else None
+        return cls(embedding, vectors=vectors, documents=documents, ivf=ivf, use_ivf=use_ivf and ivf is not None)
+
+    def save(self, path: str, manifest: dict | None = None) -> None:
+        """Escribe el snapshot en disco"""
+        root = Path(path)
+        root.mkdir(parents=True, exist_ok=True)
+        np.save(root / VECTORS_FILE, np.asarray(self.vectors, dtype=np.float32))
+        with open(root / DOCUMENTS_FILE, "w", encoding="utf-8") as f:
+            for doc in self.documents:
+                f.write(json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False) + "\n")
+        if self.ivf is not None:
+            self.ivf.save(root / IVF_FILE)
+        with open(root / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"count": len(self.documents), "dimensions": int(self.vectors.shape[-1]), **(manifest or {})}, f, indent=2)
+
+    def build_ivf(self, n_lists: int | None = None, nprobe: int = 8) -> IVFIndex:
+        self.ivf = IVFIndex.build(self.vectors, n_lists=n_lists)
+        self.ivf.nprobe = nprobe
+        return self.ivf
+
+    def search_vectors(self, queries: np.ndarray, k: int = 4, exact: bool | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Busca los ``k`` vecinos de cada consulta; ``exact`` fuerza o evita el IVF"""
+        queries = normalize_rows(np.atleast_2d(queries))
+        if len(self.documents) == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        use_ivf = self.use_ivf if exact is None else not exact
+        if not use_ivf or self.ivf is None:
+            return exact_search(self.vectors, queries, k)
+
+        ids, scores = [], []
+        for query in queries:
+            candidates = np.sort(self.ivf.candidates(query))
+            candidate_scores = np.asarray(self.vectors[candidates]) @ query
+            best = top_k(candidate_scores, k)
+            ids.append(candidates[best])
+            scores.append(candidate_scores[best])
+        return np.stack(ids), np.stack(scores)
+
+    def similarity_search_by_vector_with_score(self, embedding: list[float], k: int = 4) -> list[tuple[Document, float]]:
+        ids, scores = self.search_vectors(np.asarray(embedding, dtype=np.float32), k=k)
+        return [(self.documents[i], float(score)) for i, score in zip(ids[0], scores[0])]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k=k)
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        embedding = await self._embedding.aembed_query(query)
+        return await asyncio.to_thread(self.similarity_search_by_vector_with_score, embedding, k)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k=k)]
+
+    def _select_relevance_score_fn(self):
+        # Similitud coseno en [-1, 1] a relevancia en [0, 1]
+        return lambda score: (score + 1) / 2
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict]] = None,
+        **kwargs: Any
+    ) -> list[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        new_vectors = normalize_rows(self._embedding.embed_documents(texts))
+        start = len(self.documents)
+        self.vectors = new_vectors if start == 0 else np.concatenate([np.asarray(self.vectors), new_vectors])
+        self.documents.extend(Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas))
+        # El IVF ya no cubre las filas nuevas
+        self.ivf = None
+        self.use_ivf = False
+        return [str(i) for i in range(start, len(self.documents))]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict]] = None,
+        **kwargs: Any
+    ) -> "LocalVectorStore":
+        store = cls(embedding)
+        store.add_texts(texts, metadatas=metadatas)
+        return store
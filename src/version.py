@@ -1,6 +1,9 @@
+import logging
 import tomli
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 def get_version_info():
     """Lee la información de versión desde pyproject.toml"""
     try:
@@ -15,7 +18,7 @@ def get_version_info():
             "description": pyproject["project"]["description"]
         }
     except Exception as e:
-        print(f"⚠️ Error leyendo versión: {str(e)}")
+        logger.warning("Error leyendo versión: %s", e)
         # Valores por defecto en caso de error
         return {
             "version": "0.0.0",
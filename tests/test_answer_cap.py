@@ -0,0 +1,47 @@
+"""Tope de tokens de salida: solo en la ruta con contexto, y las respuestas cortadas se cuentan"""
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.stubs import StubChatModel, StubRetriever, make_documents
+from src.graph.agent import create_agent_graph, session_config
+from src.graph.prompts import MAX_ANSWER_WORDS
+from src.observability.metrics import LLM_TRUNCATED
+
+
+class RecordingChatModel(StubChatModel):
+    """Modelo de prueba que guarda el ``max_tokens`` de cada llamada"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.max_tokens: list[int | None] = []
+
+    async def ainvoke(self, prompt, config=None, max_tokens: int | None = None, **kwargs):
+        self.max_tokens.append(max_tokens)
+        return await super().ainvoke(prompt, config=config, max_tokens=max_tokens, **kwargs)
+
+
+def ask(message: str, llm: RecordingChatModel) -> str:
+    async def scenario() -> str:
+        agent = await create_agent_graph(StubRetriever(documents=make_documents()), llm)
+        state = {"messages": [HumanMessage(content=message)], "agent_name": "Alexandra", "user_data": {}}
+        result = await agent.ainvoke(state, config=session_config(None))
+        return result["messages"][-1].content
+
+    return asyncio.run(scenario())
+
+
+def test_only_the_context_route_is_capped_and_truncation_is_counted():
+    long_answer = "palabra " * (MAX_ANSWER_WORDS * 8)
+    llm = RecordingChatModel(answer=long_answer)
+    truncated = LLM_TRUNCATED.value("full")
+
+    assert ask("hola", llm) == long_answer
+    assert llm.max_tokens == [None]
+    assert LLM_TRUNCATED.value("full") == truncated
+
+    answer = ask("¿Qué cambia con la reforma de pensiones?", llm)
+    assert llm.max_tokens[1] is not None
+    assert len(answer) < len(long_answer)
+    assert "Fuentes:" in answer
+    assert LLM_TRUNCATED.value("full") == truncated + 1
@@ -0,0 +1,33 @@
+"""Lectura de lotes JSONL para /chat/batch"""
+import json
+
+import pytest
+
+from src.graph.batch import initial_state, parse_batch
+
+PROFILE = {"nombre": "Ana", "genero": "femenino", "edad": {"anos": 60, "meses": 0}, "nivelEstudios": "media"}
+
+
+def test_items_keep_the_chat_profile():
+    items = parse_batch([
+        json.dumps({"id": 1, "user_message": "¿Qué es la PGU?", "user_data": PROFILE}),
+        "",
+        json.dumps({"id": "faq-2", "user_message": "¿Cuándo me pensiono?"}),
+    ])
+    assert [item.id for item in items] == [1, "faq-2"]
+    assert initial_state(items[0])["user_data"] == PROFILE
+    assert initial_state(items[1])["user_data"] == {}
+
+
+@pytest.mark.parametrize("user_data", [
+    {**PROFILE, "edad": {"anos": "sesenta", "meses": 0}},
+    {key: value for key, value in PROFILE.items() if key != "nombre"},
+    "Ana",
+])
+def test_malformed_profile_is_rejected_when_parsing(user_data):
+    lines = [
+        json.dumps({"user_message": "¿Qué es la PGU?", "user_data": PROFILE}),
+        json.dumps({"user_message": "¿Qué es la PGU?", "user_data": user_data}),
+    ]
+    with pytest.raises(ValueError, match="Línea 2 inválida"):
+        parse_batch(lines)
@@ -0,0 +1,158 @@
+"""Memoria write-behind: orden de los turnos, reintentos, drenaje al cerrar y resumen entre workers."""
+import asyncio
+import random
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.config.memory import ChatHistoryStore, HistorySummarizer, HistoryWriter, get_memory
+from src.config.redis_setup import InMemoryRedis
+
+
+class FlakyStore(ChatHistoryStore):
+    """Almacén cuyas escrituras en lote fallan las primeras ``failures`` veces (o al azar con ``failure_rate``)"""
+
+    def __init__(self, *args, failures: int = 0, failure_rate: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+        self.failure_rate = failure_rate
+        self.attempts = 0
+
+    async def append_turns(self, turns):
+        self.attempts += 1
+        if self.failures > 0 or random.random() < self.failure_rate:
+            self.failures -= 1
+            raise ConnectionError("conexión a Redis interrumpida")
+        await super().append_turns(turns)
+
+
+class SlowSummaryLLM:
+    """LLM de resumen que tarda ``latency`` segundos y cuenta sus llamadas"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, prompt, **kwargs) -> AIMessage:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return AIMessage(content=f"Resumen {self.calls}")
+
+
+def questions(history) -> list[str]:
+    return [message.content for message in history.messages if isinstance(message, HumanMessage)]
+
+
+def start_writer(store: ChatHistoryStore, **kwargs) -> HistoryWriter:
+    store.writer = HistoryWriter(store, **kwargs)
+    store.writer.start()
+    return store.writer
+
+
+def test_turns_keep_their_order_per_session():
+    async def scenario():
+        store = ChatHistoryStore(InMemoryRedis(latency=0.001))
+        writer = start_writer(store, batch_size=8)
+
+        async def user(session: int) -> None:
+            memory = get_memory(store, f"s-{session}")
+            for turn in range(10):
+                # Cada lectura ve todos los turnos anteriores de la sesión
+                assert len((await memory.aload_history()).messages) == 2 * turn
+                await memory.arecord_turn(f"s{session} t{turn}", "respuesta")
+                await asyncio.sleep(random.random() * 0.002)
+
+        await asyncio.gather(*(user(i) for i in range(20)))
+        await writer.close()
+        for session in range(20):
+            assert questions(await store.load(f"s-{session}")) == [f"s{session} t{turn}" for turn in range(10)]
+        assert writer.metrics["written"] == 200
+        assert writer.metrics["dropped"] == 0
+
+    random.seed(7)
+    asyncio.run(scenario())
+
+
+def test_failed_batches_are_retried_in_order():
+    async def scenario():
+        store = FlakyStore(InMemoryRedis(), failure_rate=0.5)
+        writer = start_writer(store, batch_size=3, max_retries=50, retry_delay=0.0001)
+        for turn in range(6):
+            for session in range(5):
+                await writer.submit(f"s-{session}", f"s{session} t{turn}", "respuesta")
+            # Dejar que el consumidor tome lotes mientras llegan turnos nuevos
+            await asyncio.sleep(0.001)
+        await writer.close()
+        for session in range(5):
+            assert questions(await store.load(f"s-{session}")) == [f"s{session} t{turn}" for turn in range(6)]
+        assert writer.metrics["retries"] > 0
+        assert writer.metrics["dropped"] == 0
+
+    random.seed(11)
+    asyncio.run(scenario())
+
+
+def test_batch_is_dropped_after_max_retries_and_readers_do_not_hang():
+    async def scenario():
+        store = FlakyStore(InMemoryRedis(), failures=10)
+        writer = start_writer(store, max_retries=2, retry_delay=0.0001)
+        memory = get_memory(store, "s")
+        await memory.arecord_turn("pregunta", "respuesta")
+        history = await asyncio.wait_for(memory.aload_history(), 1)
+        assert history.messages == []
+        assert writer.metrics["dropped"] == 1
+        assert store.attempts == 3
+        await writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_flushes_pending_turns():
+    async def scenario():
+        store = ChatHistoryStore(InMemoryRedis(latency=0.005))
+        writer = start_writer(store, batch_size=4)
+        for turn in range(40):
+            await writer.submit("s", f"t{turn}", "respuesta")
+        await store.writer.close()
+        assert questions(await store.load("s")) == [f"t{turn}" for turn in range(40)]
+        assert writer.metrics["written"] == 40
+
+    asyncio.run(scenario())
+
+
+def test_close_gives_up_after_drain_timeout():
+    async def scenario():
+        store = FlakyStore(InMemoryRedis(), failures=1000)
+        writer = start_writer(store, max_retries=1000, retry_delay=0.01, drain_timeout=0.05)
+        await writer.submit("s", "pregunta", "respuesta")
+        await asyncio.wait_for(writer.close(), 1)
+
+    asyncio.run(scenario())
+
+
+def test_two_workers_do_not_compact_the_same_session_twice():
+    async def scenario():
+        # Dos workers con su propia cola y el mismo Redis
+        redis = InMemoryRedis()
+        llm = SlowSummaryLLM(latency=0.05)
+        summarizer = HistorySummarizer(llm, max_turns=2)
+        stores = [ChatHistoryStore(redis, summarizer=summarizer) for _ in range(2)]
+        for turn in range(3):
+            await stores[0].append_turn("s", f"t{turn}", "respuesta")
+        for store in stores:
+            start_writer(store)
+        # El primer worker guarda un turno y empieza a resumir; el segundo intenta
+        # resumir la misma sesión mientras tanto
+        await stores[0].writer.submit("s", "t3", "respuesta")
+        await stores[0].writer.wait("s")
+        stores[1].writer._schedule_compaction("s")
+        for store in stores:
+            await store.writer.close()
+
+        history = await stores[0].load("s")
+        assert llm.calls == 1
+        # Se pliegan los dos turnos más antiguos una sola vez
+        assert questions(history) == ["t2", "t3"]
+        assert history.summary == "Resumen 1"
+        assert await redis.get(stores[0].lock_key("s")) is None
+
+    asyncio.run(scenario())
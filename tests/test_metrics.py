@@ -0,0 +1,65 @@
+"""Métricas: actualizaciones desde varios hilos y acceso a /metrics sin validación de host"""
+import sys
+import threading
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.config.cors import CORSPolicy
+from src.middlewares.asgi import public_paths
+from src.middlewares.host import HostValidationMiddleware
+from src.observability.metrics import Counter, Histogram
+
+
+def test_updates_from_threads_are_not_lost():
+    # Cambios de hilo muy frecuentes para que una lectura-escritura sin lock pierda sumas
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    counter = Counter("test_total", "prueba", ("label",))
+    histogram = Histogram("test_seconds", "prueba")
+
+    def work():
+        for _ in range(20000):
+            counter.inc(1, "a")
+            histogram.observe(0.01)
+
+    try:
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert counter.value("a") == 160000
+    assert histogram.count() == 160000
+
+
+@pytest.fixture
+def host_client(monkeypatch):
+    def client(metrics_token: str | None) -> TestClient:
+        if metrics_token:
+            monkeypatch.setenv("METRICS_TOKEN", metrics_token)
+        else:
+            monkeypatch.delenv("METRICS_TOKEN", raising=False)
+        public_paths.cache_clear()
+        routes = [Route(path, lambda request: PlainTextResponse("ok")) for path in ("/healthz", "/metrics")]
+        policy = CORSPolicy.from_origins(["https://tudominio.com"])
+        return TestClient(HostValidationMiddleware(Starlette(routes=routes), policy), base_url="http://10.0.0.7")
+
+    yield client
+    public_paths.cache_clear()
+
+
+def test_metrics_is_not_exempt_from_host_validation_without_token(host_client):
+    client = host_client(None)
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/metrics").status_code == 403
+
+
+def test_metrics_is_exempt_when_scrape_uses_a_token(host_client):
+    client = host_client("secreto")
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,46 @@
+"""Caché semántico: invalidación compartida entre workers a través de Redis."""
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from src.cache.semantic_cache import CacheGeneration, SemanticResponseCache
+from src.config.redis_setup import InMemoryRedis
+
+
+class FixedEmbeddings:
+    """Embeddings que asignan el mismo vector a todas las preguntas"""
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return [1.0, 0.0]
+
+
+def state(question: str) -> dict:
+    return {"messages": [HumanMessage(content=question)], "chat_history": "", "user_data": {}}
+
+
+def test_invalidation_reaches_every_worker():
+    async def scenario():
+        redis = InMemoryRedis()
+        workers = [SemanticResponseCache(FixedEmbeddings(), generation=CacheGeneration(redis, interval=0)) for _ in range(3)]
+        for cache in workers:
+            cache.put(await cache.prepare(state("¿Qué es la PGU?")), "respuesta")
+
+        removed, broadcast = await workers[0].invalidate_all()
+        assert (removed, broadcast) == (1, True)
+        # Los demás workers vacían su caché en la siguiente consulta
+        for cache in workers[1:]:
+            assert cache.get(await cache.prepare(state("¿Qué es la PGU?"))) is None
+            assert cache.stats()["entries"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_generation_is_checked_at_most_once_per_interval():
+    async def scenario():
+        redis = InMemoryRedis()
+        cache = SemanticResponseCache(FixedEmbeddings(), generation=CacheGeneration(redis, interval=60))
+        for _ in range(10):
+            await cache.prepare(state("hola"))
+        assert redis.round_trips == 1
+
+    asyncio.run(scenario())